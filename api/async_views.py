@@ -0,0 +1,197 @@
+"""
+Native async versions of the hot event endpoints, served by the ASGI
+deployment (see ``events.asgi``). Reads go through the async ORM so a worker
+keeps serving other requests while one waits on the database; writes that
+need a transaction run in a thread, and so do the cache reads and writes,
+which block for a network round-trip with Redis.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Max, aprefetch_related_objects
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.authentication import CSRFCheck
+from rest_framework.exceptions import (AuthenticationFailed, NotAuthenticated, NotFound, PermissionDenied,
+                                       Throttled, ValidationError)
+from rest_framework.settings import api_settings
+
+from authorization.authentication import BearerTokenAuthentication
+from .cache import event_cache, events_deleted_at
+from .conditional import make_validators, not_modified, set_validators
+from .filters import is_time_relative
+from .instrumentation import measure
+from .models import ATTENDEE_IDS, Event
+from .renderers import JSONRenderer
+from .replicas import reads_from_replica, reads_own_writes, replica_timeout
+from .serializers import EventSerializer
+from .views import (EventListCreateAPIView, EventRegistrationAPIView, EventRetrieveUpdateDestroyAPIView,
+                    detail_variant, list_data, list_queryset, occurrence_param, sign_up)
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    # same bytes and content type as a DRF Response
+    return HttpResponse(JSONRenderer().render(data), status=status_code, headers=headers,
+                        content_type='application/json')
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of ``APIView`` for the session and bearer token
+    authentication the API accepts.
+
+    Methods without an async handler are passed to ``sync_view_class``, so
+    the same URL keeps serving everything the synchronous API does.
+    """
+    sync_view_class = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # like APIView: CSRF is enforced below, and only for session logins
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def delegate(self, request, *args, **kwargs):
+        """
+        Handler for the methods a subclass leaves to ``sync_view_class``;
+        that view authenticates the request itself.
+        """
+        return await sync_to_async(self.sync_view_class.as_view())(request, *args, **kwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if getattr(handler, '__func__', None) is AsyncAPIView.delegate:
+            return await handler(request, *args, **kwargs)
+        try:
+            request.user = await self.authenticate(request)
+        except (AuthenticationFailed, NotAuthenticated, PermissionDenied) as e:
+            # 403 rather than 401, as DRF does when the session is tried first
+            return json_response({'detail': e.detail}, status.HTTP_403_FORBIDDEN)
+        # the buckets are in the cache, a network round-trip away with Redis
+        throttled = await sync_to_async(self.check_throttles)(request)
+        if throttled is not None:
+            return json_response({'detail': throttled.detail}, status.HTTP_429_TOO_MANY_REQUESTS,
+                                 headers={'Retry-After': str(throttled.wait)})
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except (Http404, NotFound) as e:
+            return json_response({'detail': str(e)}, status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            return json_response(e.detail, status.HTTP_400_BAD_REQUEST)
+
+    async def authenticate(self, request):
+        """
+        The session, with DRF's CSRF check on unsafe methods, or else a
+        bearer token, in the order of DEFAULT_AUTHENTICATION_CLASSES.
+        """
+        user = await request.auser()
+        if user.is_authenticated:
+            if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                reason = self.csrf_failure(request)
+                if reason:
+                    raise PermissionDenied(f'CSRF Failed: {reason}')
+            return user
+        # a cache hit doesn't touch the database, a miss does, so run it in a thread either way
+        result = await sync_to_async(BearerTokenAuthentication().authenticate)(request)
+        if result is None:
+            raise NotAuthenticated()
+        return result[0]
+
+    def check_throttles(self, request):
+        """
+        ``Throttled`` with the longest wait of the throttles that reject the
+        request, as ``APIView.check_throttles`` raises, or None.
+        """
+        waits = [throttle.wait() for throttle in (cls() for cls in api_settings.DEFAULT_THROTTLE_CLASSES)
+                 if not throttle.allow_request(request, self)]
+        if waits:
+            return Throttled(max(waits))
+        return None
+
+    @staticmethod
+    def csrf_failure(request):
+        check = CSRFCheck(lambda request: None)
+        check.process_request(request)
+        return check.process_view(request, None, (), {})
+
+
+class AsyncEventListView(AsyncAPIView):
+    sync_view_class = EventListCreateAPIView
+    throttle_scope = 'events'
+    post = AsyncAPIView.delegate
+
+    @reads_from_replica
+    async def get(self, request):
+        etag = last_modified = None
+        # as in EventListCreateAPIView.get
+        if not is_time_relative(request.GET):
+            aggregate = await Event.objects.aaggregate(last_changed=Max('updated_at'))
+            deleted_at = await sync_to_async(events_deleted_at)()
+            last_modified = max(filter(None, [aggregate['last_changed'], deleted_at]))
+            etag, last_modified = make_validators(last_modified, request.user.pk, request.get_full_path())
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+        # lazy apart from the in-process search index, which may have to load itself
+        queryset, paginator, names, fast = await sync_to_async(list_queryset)(request)
+        page = await paginator.apaginate_queryset(queryset, request)
+        data = list_data(page, names, request, fast)
+        return set_validators(json_response(data, headers=paginator.get_headers()), etag, last_modified)
+
+
+class AsyncRegistrationMixin:
+    throttle_scopes = {'POST': 'register'}
+
+    async def register(self, request, pk):
+        event = await aget_object_or_404(Event, pk=pk)
+        data, status_code = await sync_to_async(sign_up)(event, request.user, occurrence_param(request))
+        return json_response(data, status_code)
+
+
+class AsyncEventDetailView(AsyncRegistrationMixin, AsyncAPIView):
+    sync_view_class = EventRetrieveUpdateDestroyAPIView
+    throttle_scope = 'events'
+    put = patch = delete = AsyncAPIView.delegate
+
+    @reads_from_replica
+    async def get(self, request, pk):
+        names = EventSerializer.field_names(request)
+        variant = detail_variant(names)
+        version, entry = await sync_to_async(self.cached)(pk, variant)
+        if entry is not None:
+            etag, last_modified, data = entry
+            return (not_modified(request, etag, last_modified)
+                    or set_validators(json_response(data), etag, last_modified))
+
+        event = await aget_object_or_404(Event, pk=pk)
+        etag, last_modified = make_validators(event.updated_at, pk, variant)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        if 'attendees' in names:
+            await aprefetch_related_objects([event], ATTENDEE_IDS)
+        with measure():
+            data = EventSerializer(event, context={'request': request}).data
+        # a replica's copy may be behind, so it isn't kept for long
+        await sync_to_async(event_cache.set)(pk, variant, version, (etag, last_modified, data),
+                                             timeout=replica_timeout())
+        return set_validators(json_response(data), etag, last_modified)
+
+    @staticmethod
+    def cached(pk, variant):
+        # the writer's own reads skip copies a lagging replica may have cached since the write
+        return event_cache.get(pk, variant, skip=reads_own_writes())
+
+    async def post(self, request, pk):
+        return await self.register(request, pk)
+
+
+class AsyncEventRegistrationView(AsyncRegistrationMixin, AsyncAPIView):
+    sync_view_class = EventRegistrationAPIView
+    throttle_scope = 'register'
+    delete = AsyncAPIView.delegate
+
+    async def post(self, request, pk):
+        return await self.register(request, pk)
@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from . import metrics
+
+hits = metrics.counter('events_detail_cache_hits_total', 'Event detail payloads served from cache.')
+misses = metrics.counter('events_detail_cache_misses_total', 'Event detail payloads built from the database.')
+
+
+def _cache():
+    return caches[getattr(settings, 'EVENTS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(pk):
+    return f'event:{pk}:version'
+
+
+def _version(cache, pk):
+    """
+    Payload keys embed a per-event version. Invalidation bumps the version
+    instead of deleting keys, so a reader that raced a write can only store
+    its stale payload under a version nobody reads any more.
+    """
+    key = _version_key(pk)
+    version = cache.get(key)
+    if version is None:
+        # seeded from the clock so an evicted version never comes back as an old number
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+class EventPayloadCache:
+    """
+    Serialized event detail payloads, one entry per event and representation.
+    """
+
+    def get(self, pk, variant, skip=False):
+        """
+        ``(version, payload)``, the payload None on a miss; with ``skip`` it
+        is always a miss, for a reader that must see the database's copy.
+        """
+        cache = _cache()
+        version = _version(cache, pk)
+        data = None if skip else cache.get(f'event:{pk}:{version}:{variant}')
+        (misses if data is None else hits).inc()
+        return version, data
+
+    def set(self, pk, variant, version, data, timeout=None):
+        if timeout is None:
+            timeout = getattr(settings, 'EVENTS_CACHE_TIMEOUT', 300)
+        _cache().set(f'event:{pk}:{version}:{variant}', data, timeout=timeout)
+
+    def invalidate(self, pk):
+        cache = _cache()
+        try:
+            cache.incr(_version_key(pk))
+        except ValueError:
+            # nothing was ever cached for this event
+            pass
+
+
+event_cache = EventPayloadCache()
+
+
+def events_deleted_at():
+    """
+    When an event was last deleted; deletions don't move max(updated_at),
+    so the list's Last-Modified has to account for them separately.
+    """
+    cache = _cache()
+    deleted_at = cache.get('events:deleted_at')
+    if deleted_at is None:
+        # unknown after eviction: assume it just happened
+        cache.add('events:deleted_at', timezone.now(), timeout=None)
+        deleted_at = cache.get('events:deleted_at')
+    return deleted_at
+
+
+def touch_events_deleted():
+    _cache().set('events:deleted_at', timezone.now(), timeout=None)
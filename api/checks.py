@@ -0,0 +1,74 @@
+"""
+System checks for the database connection settings (see DB_CONN_MAX_AGE
+and DB_POOL in settings). The configuration checks run with every
+management command; the connection check needs ``--database``:
+    python manage.py check --database default
+"""
+import importlib.util
+
+from django.conf import settings
+from django.core import checks
+from django.db import DatabaseError, connections
+
+POSTGRESQL = 'django.db.backends.postgresql'
+
+
+def pool_errors(databases, pool_requested, async_mode):
+    """
+    Problems with the connection settings in ``databases``, a DATABASES
+    dict; ``pool_requested`` is DB_POOL and ``async_mode`` whether the
+    ASGI deployment is serving.
+    """
+    errors = []
+    for alias, config in databases.items():
+        pool = config.get('OPTIONS', {}).get('pool')
+        if pool_requested and config['ENGINE'] != POSTGRESQL:
+            errors.append(checks.Warning(
+                f"DB_POOL is set, but database '{alias}' is not PostgreSQL, so it has no pool.",
+                hint='Its connections are persistent (DB_CONN_MAX_AGE) instead.', id='api.W001'))
+        if pool and not (importlib.util.find_spec('psycopg') and importlib.util.find_spec('psycopg_pool')):
+            errors.append(checks.Error(
+                f"Database '{alias}' has a connection pool, which needs psycopg 3 and psycopg-pool.",
+                hint='pip install "psycopg[binary,pool]", or unset DB_POOL.', id='api.E001'))
+        if async_mode and not pool and config.get('CONN_MAX_AGE'):
+            errors.append(checks.Warning(
+                f"Database '{alias}' keeps connections open (CONN_MAX_AGE) while serving async views, "
+                "which Django advises against.",
+                hint='Set DB_POOL=true, or DB_CONN_MAX_AGE=0.', id='api.W002'))
+    return errors
+
+
+@checks.register()
+def check_connection_settings(app_configs=None, **kwargs):
+    return pool_errors(settings.DATABASES, getattr(settings, 'DB_POOL', False),
+                       settings.ROOT_URLCONF == 'events.urls_async')
+
+
+@checks.register(checks.Tags.database)
+def check_connections(app_configs=None, databases=None, **kwargs):
+    """
+    Connect to each database and compare a pool's size with what the
+    PostgreSQL server allows.
+    """
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+        except DatabaseError as e:
+            errors.append(checks.Error(f"Can't connect to database '{alias}': {e}",
+                                       hint='Check DATABASE_URL and DATABASE_REPLICA_URLS.', id='api.E002'))
+            continue
+        pool = connection.settings_dict.get('OPTIONS', {}).get('pool')
+        if connection.vendor != 'postgresql' or not pool:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW max_connections')
+            max_connections = int(cursor.fetchone()[0])
+        max_size = pool.get('max_size', 4) if isinstance(pool, dict) else 4
+        if max_size >= max_connections:
+            errors.append(checks.Warning(
+                f"Database '{alias}' allows {max_connections} connections, but one process's pool "
+                f"may open {max_size}.",
+                hint='Lower DB_POOL_MAX_SIZE so that it times the number of processes fits.', id='api.W003'))
+    return errors
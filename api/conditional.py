@@ -0,0 +1,32 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_validators(last_modified, *parts):
+    """
+    ``(etag, last_modified)`` for a representation that changes whenever
+    ``last_modified`` or any of ``parts`` does.
+    """
+    if last_modified is None:
+        return None, None
+    key = '|'.join([last_modified.isoformat(), *map(str, parts)])
+    etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+    return etag, int(last_modified.timestamp())
+
+
+def not_modified(request, etag, last_modified):
+    """
+    A 304 (or 412) response when the client's validators still match,
+    otherwise None.
+    """
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
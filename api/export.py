@@ -0,0 +1,80 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.negotiation import BaseContentNegotiation
+
+from authorization.models import CustomUser
+from .models import Event
+
+EVENT_COLUMNS = ('id', 'title', 'description', 'date', 'location', 'organizer', 'capacity', 'attendee_count')
+ATTENDEE_COLUMNS = ('id', 'email', 'username')
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def event_rows(queryset=None):
+    """
+    Yield events as tuples in ``EVENT_COLUMNS`` order, fetched ``CHUNK_SIZE``
+    rows at a time (a server-side cursor on PostgreSQL) so nothing is
+    materialized up front.
+    """
+    queryset = Event.objects.all() if queryset is None else queryset
+    # formatted like the API so an export matches what the endpoints return
+    date_field = serializers.DateTimeField()
+    rows = queryset.order_by('id').values_list('id', 'title', 'description', 'date', 'location',
+                                               'organizer_id', 'capacity', 'attendee_count')
+    for event_id, title, description, date, *rest in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield (event_id, title, description, date_field.to_representation(date), *rest)
+
+
+def attendee_rows(event_id):
+    # distinct for recurring events, with a row per occurrence registered for
+    rows = CustomUser.objects.filter(event=event_id).order_by('id').distinct().values_list(*ATTENDEE_COLUMNS)
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """
+    File-like object for ``csv.writer`` that hands each line back instead
+    of buffering it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def to_ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+
+
+def to_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class ExportContentNegotiation(BaseContentNegotiation):
+    """
+    The export format comes from the URL, so the Accept header must not
+    turn ``text/csv`` into a 406; errors still render with the first renderer.
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def streaming_export(columns, rows, fmt, filename):
+    encode = to_csv if fmt == 'csv' else to_ndjson
+    response = StreamingHttpResponse(encode(columns, rows), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Attendance
+
+# ?ordering= values and the keyset they paginate on; each one matches an index
+ORDERINGS = {
+    'date': ('date', 'id'),
+    '-date': ('-date', '-id'),
+    'attendee_count': ('attendee_count', 'id'),
+    '-attendee_count': ('-attendee_count', '-id'),
+}
+SEARCH_ORDERING = ('-rank', 'date', 'id')
+# parameters that filter relative to now, so their results change as time passes
+TIME_RELATIVE = ('upcoming',)
+
+
+class MeOrIdField(serializers.Field):
+    """
+    A user id, or ``me`` for the requesting user.
+    """
+    default_error_messages = {'invalid': 'Expected a user id or "me".'}
+    # ids are BIGINTs; a larger number would overflow in the database
+    max_id = 2 ** 63 - 1
+
+    def to_internal_value(self, data):
+        if data == 'me':
+            return self.context['request'].user.pk
+        try:
+            value = int(data)
+        except (TypeError, ValueError):
+            self.fail('invalid')
+        if not 1 <= value <= self.max_id:
+            self.fail('invalid')
+        return value
+
+
+def is_time_relative(params):
+    """
+    Whether the list for query ``params`` changes as events pass into the
+    past, which no write to the events records.
+    """
+    return any(params.get(name) for name in TIME_RELATIVE)
+
+
+class EventFilter(serializers.Serializer):
+    """
+    Validates the list query parameters and turns them into queryset filters
+    on indexed columns, so the filtering happens in the page query itself.
+    """
+    date_from = serializers.DateTimeField(required=False,
+                                          help_text='Events on or after this time, and series still going then')
+    date_to = serializers.DateTimeField(required=False, help_text='Events, and series, starting before this time')
+    upcoming = serializers.BooleanField(required=False, allow_null=True, default=None)
+    organizer = MeOrIdField(required=False)
+    location = serializers.CharField(required=False)
+    attending = serializers.ChoiceField(choices=['me'], required=False)
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), required=False)
+
+    def validate(self, attrs):
+        if 'date_from' in attrs and 'date_to' in attrs and attrs['date_from'] >= attrs['date_to']:
+            raise serializers.ValidationError({'date_to': ['Must be later than date_from.']})
+        return attrs
+
+    def filter_queryset(self, queryset):
+        params = self.validated_data
+        if 'date_from' in params:
+            queryset = queryset.on_or_after(params['date_from'])
+        if 'date_to' in params:
+            queryset = queryset.filter(date__lt=params['date_to'])
+        if params.get('upcoming') is True:
+            queryset = queryset.upcoming()
+        elif params.get('upcoming') is False:
+            queryset = queryset.filter(date__lt=timezone.now())
+        if 'organizer' in params:
+            queryset = queryset.filter(organizer_id=params['organizer'])
+        if 'location' in params:
+            queryset = queryset.filter(location=params['location'])
+        if 'attending' in params:
+            # a semi-join: a series' attendee can have a row per occurrence
+            queryset = queryset.filter(Exists(Attendance.objects.filter(
+                event=OuterRef('pk'), customuser=self.context['request'].user.pk)))
+        return queryset
+
+    def get_ordering(self, searching=False):
+        """
+        The keyset for the requested ordering; a search defaults to relevance.
+        """
+        if 'ordering' in self.validated_data:
+            return ORDERINGS[self.validated_data['ordering']]
+        return SEARCH_ORDERING if searching else ORDERINGS['date']
+
+
+class OccurrenceWindow(serializers.Serializer):
+    """
+    The window occurrences are expanded for: from now for
+    EVENTS_OCCURRENCE_DAYS by default, and at most EVENTS_OCCURRENCE_MAX_DAYS
+    long, which bounds the work a request can ask for.
+    """
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        date_from = attrs.setdefault('date_from', timezone.now())
+        date_to = attrs.setdefault(
+            'date_to', date_from + timedelta(days=getattr(settings, 'EVENTS_OCCURRENCE_DAYS', 90)))
+        if date_from >= date_to:
+            raise serializers.ValidationError({'date_to': ['Must be later than date_from.']})
+        max_days = getattr(settings, 'EVENTS_OCCURRENCE_MAX_DAYS', 366)
+        if date_to - date_from > timedelta(days=max_days):
+            raise serializers.ValidationError({'date_to': [f'At most {max_days} days after date_from.']})
+        return attrs
@@ -0,0 +1,106 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import router, transaction
+from rest_framework import serializers
+
+from .models import Event
+from .search import get_search_backend
+from .serializers import EventSerializer
+
+
+class ImportResult:
+    def __init__(self, max_errors=1000):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'error_count': self.error_count, 'errors': self.errors}
+
+
+class InvalidRow:
+    def __init__(self, message):
+        self.errors = {'non_field_errors': [message]}
+
+
+def read_ndjson(lines):
+    """
+    Yield one dict per non-blank line; a line that isn't a UTF-8 JSON
+    object is yielded as an ``InvalidRow`` so it gets reported with its row
+    number.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                yield InvalidRow(f'Invalid UTF-8: {e}')
+                continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield InvalidRow(f'Invalid JSON: {e}')
+            continue
+        yield row if isinstance(row, dict) else InvalidRow('Expected a JSON object')
+
+
+def read_json(items):
+    for item in items:
+        yield item if isinstance(item, dict) else InvalidRow('Expected a JSON object')
+
+
+def read_csv(lines):
+    for row in csv.DictReader(lines):
+        # CSV has no null, an empty cell means "not set"
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+def import_events(rows, organizer, chunk_size=1000, max_errors=1000):
+    """
+    Validate ``rows`` with ``EventSerializer`` rules and bulk-insert the valid
+    ones for ``organizer``, one transaction per chunk. Invalid rows are
+    skipped and reported by their 1-based position.
+    """
+    result = ImportResult(max_errors=max_errors)
+    # one serializer instance validates every row, so its fields are built only once
+    serializer = EventSerializer()
+    backend = get_search_backend(router.db_for_write(Event))
+    rows = iter(rows)
+    row_number = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return result
+        events = []
+        for row in chunk:
+            row_number += 1
+            if isinstance(row, InvalidRow):
+                result.add_error(row_number, row.errors)
+                continue
+            row.pop('organizer', None)
+            try:
+                data = serializer.run_validation(row)
+            except serializers.ValidationError as e:
+                result.add_error(row_number, e.detail)
+                continue
+            data.pop('attendees', None)
+            event = Event(organizer=organizer, **data)
+            event.set_recurrence_end()
+            events.append(event)
+        with transaction.atomic():
+            created = Event.objects.bulk_create(events, batch_size=chunk_size)
+        # bulk_create sends no post_save, so index the new rows ourselves
+        for event in created:
+            if event.pk is not None:
+                backend.index(event)
+        result.created += len(created)
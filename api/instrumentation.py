@@ -0,0 +1,91 @@
+"""
+Per-request timings for ``api.middleware.RequestTimingMiddleware``.
+
+The middleware makes a ``RequestTiming`` current for the request. Every
+database connection gets ``record_query`` as an execute wrapper when it
+connects, and code that serializes a response wraps it in ``measure``. Both
+report to whichever timing is current, held in a context variable so that
+the async views' queries, which run in ``sync_to_async`` threads, are
+credited to the request that made them.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from . import metrics
+
+# statements kept per request for the slow request log, and characters kept of each
+MAX_QUERIES = 100
+MAX_SQL_LENGTH = 1000
+
+current_timing = ContextVar('current_timing', default=None)
+
+request_duration = metrics.histogram(
+    'api_request_duration_seconds', 'Wall time of API requests',
+    [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10], scale=10 ** 6)
+request_queries = metrics.histogram(
+    'api_request_db_queries', 'Database queries per API request', [0, 1, 2, 3, 5, 10, 20, 50, 100])
+request_db_duration = metrics.histogram(
+    'api_request_db_duration_seconds', 'Time API requests spent in database queries',
+    [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5], scale=10 ** 6)
+request_serialization_duration = metrics.histogram(
+    'api_request_serialization_seconds', 'Time API requests spent serializing and rendering responses',
+    [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1], scale=10 ** 6)
+response_size = metrics.histogram(
+    'api_response_size_bytes', 'Size of API response bodies',
+    [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304])
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_duration = 0.0
+        self.serialization_duration = 0.0
+        self.queries = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add_query(self, sql, duration):
+        self.query_count += 1
+        self.db_duration += duration
+        if len(self.queries) < MAX_QUERIES:
+            # e.g. a search's IN list of matching ids can run to megabytes
+            if len(sql) > MAX_SQL_LENGTH:
+                sql = sql[:MAX_SQL_LENGTH] + '...'
+            self.queries.append((sql, duration))
+
+
+def record_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    """
+    Add ``record_query`` to ``connection``, once, whichever request or
+    thread opened it.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def measure():
+    """
+    Count the time spent in the block as serialization of the current response.
+    """
+    timing = current_timing.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.serialization_duration += time.perf_counter() - started
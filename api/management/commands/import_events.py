@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importing import import_events, read_csv, read_ndjson
+from authorization.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Import events from a CSV or NDJSON file, streaming it in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin")
+        parser.add_argument('--organizer', required=True, help='Email of the user the events belong to')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                            help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            organizer = CustomUser.objects.get(email=options['organizer'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['organizer']}")
+
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        reader = read_csv if file_format == 'csv' else read_ndjson
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        started = time.perf_counter()
+        try:
+            result = import_events(reader(stream), organizer, chunk_size=options['chunk_size'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(f'Imported {result.created} events, {result.error_count} rows rejected '
+                          f'in {elapsed:.2f}s ({result.created / elapsed if elapsed else 0:.0f} events/s)')
@@ -0,0 +1,128 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.cache import touch_events_deleted
+from api.models import Event
+from api.signals import recount_attendees
+from api.synthetic import make_attendance, make_events, make_organizers
+from authorization.authentication import forget_tokens
+from authorization.backends import forget_users
+from authorization.models import AuthToken, CustomUser
+
+PREFIX = 'seed-user'
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with a synthetic dataset for benchmarks, e.g. '
+            '--users 100000 --events 1000000 --attendances 5000000; the same --seed gives the same data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--attendances', type=int, default=50000,
+                            help='Registrations to draw; repeats of a user for an event are dropped, so fewer are made')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of event popularity; 0 spreads attendees evenly')
+        parser.add_argument('--capacity-share', type=float, default=0.3,
+                            help='Fraction of events with a capacity')
+        parser.add_argument('--signup-days', type=int, default=30,
+                            help='Days before now over which registration times are spread')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete a previously seeded dataset first')
+
+    def handle(self, *args, **options):
+        seeded_users = CustomUser.objects.filter(email__startswith=PREFIX)
+        if options['flush']:
+            self.flush(seeded_users)
+        elif seeded_users.exists():
+            raise CommandError('The database already has a seeded dataset; add --flush to replace it')
+
+        started = time.perf_counter()
+        user_ids = make_organizers(options['users'], prefix=PREFIX, batch_size=options['batch_size'])
+        self.report('users', len(user_ids), started)
+
+        step = time.perf_counter()
+        created = make_events(options['events'], user_ids, batch_size=options['batch_size'], seed=options['seed'],
+                              capacity_share=options['capacity_share'])
+        self.report('events', created, step)
+
+        step = time.perf_counter()
+        seeded_events = Event.objects.filter(organizer__email__startswith=PREFIX)
+        events = list(seeded_events.values_list('id', 'organizer_id', 'capacity').iterator())
+        make_attendance(events, user_ids, options['attendances'], skew=options['skew'],
+                        batch_size=options['batch_size'] * 2, seed=options['seed'],
+                        signup_days=options['signup_days'])
+        # one UPDATE per range of ids instead of a million single-row ones
+        ids = sorted(event_id for event_id, _, _ in events)
+        for offset in range(0, len(ids), options['batch_size'] * 10):
+            chunk = ids[offset:offset + options['batch_size'] * 10]
+            recount_attendees(Event.objects.filter(pk__gte=chunk[0], pk__lte=chunk[-1]))
+        attendances = Event.attendees.through.objects.filter(customuser__email__startswith=PREFIX).count()
+        self.report('attendances', attendances, step)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+    def report(self, name, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{count} {name} in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s)')
+
+    def flush(self, seeded_users):
+        """
+        Delete the seeded rows with plain DELETEs; going through the ORM's
+        collector would load every event and user to send their signals.
+        Cached users, tokens and sessions are dropped once, after the commit.
+        """
+        Attendance = Event.attendees.through
+        with transaction.atomic():
+            events = Event.objects.filter(organizer__in=seeded_users)
+            Attendance.objects.filter(event__in=events)._raw_delete(Attendance.objects.db)
+            # seeded users may have signed up for other events, e.g. in a benchmark
+            registrations = Attendance.objects.filter(customuser__in=seeded_users)
+            other_events = set(registrations.values_list('event_id', flat=True))
+            registrations._raw_delete(Attendance.objects.db)
+            events._raw_delete(events.db)
+            recount_attendees(Event.objects.filter(pk__in=other_events))
+
+            # benchmarks issue tokens and sessions for seeded users, e.g. scripts/load_http.py
+            user_ids = list(seeded_users.values_list('pk', flat=True))
+            tokens = AuthToken.objects.filter(user__in=seeded_users)
+            token_hashes = list(tokens.values_list('key_hash', flat=True))
+            tokens._raw_delete(tokens.db)
+            session_keys = self.sessions_of(user_ids)
+            for offset in range(0, len(session_keys), 500):
+                sessions = Session.objects.filter(pk__in=session_keys[offset:offset + 500])
+                sessions._raw_delete(sessions.db)
+            for through in (CustomUser.groups.through, CustomUser.user_permissions.through):
+                rows = through.objects.filter(customuser__in=seeded_users)
+                rows._raw_delete(rows.db)
+            seeded_users._raw_delete(seeded_users.db)
+        touch_events_deleted()
+        forget_users(user_ids)
+        forget_tokens(token_hashes)
+        # cached_db also keeps each session in the cache
+        cache_key_prefix = getattr(import_module(settings.SESSION_ENGINE).SessionStore, 'cache_key_prefix', None)
+        if cache_key_prefix:
+            caches[settings.SESSION_CACHE_ALIAS].delete_many([cache_key_prefix + key for key in session_keys])
+
+    def sessions_of(self, user_ids):
+        """
+        Keys of the stored sessions logged in as one of ``user_ids``; the
+        user is only in the encoded session data, so every session is read.
+        """
+        user_ids = {str(pk) for pk in user_ids}
+        return [session.session_key
+                for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator()
+                if str(session.get_decoded().get(SESSION_KEY)) in user_ids]
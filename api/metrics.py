@@ -0,0 +1,137 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def increment(cache, key, amount):
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+
+
+class PendingIncrements:
+    """
+    Increments added up in this process and written to the cache together,
+    one ``incr`` per key, at most every METRICS_FLUSH_SECONDS, so recording
+    a metric costs no cache round-trip. A process's values reach the cache,
+    and the other processes, up to that much later.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._amounts = defaultdict(int)
+        self._flushed_at = time.monotonic()
+
+    def add(self, cache_alias, key, amount):
+        with self._lock:
+            self._amounts[cache_alias, key] += amount
+
+    def get(self, cache_alias, key):
+        return self._amounts.get((cache_alias, key), 0)
+
+    def due(self):
+        interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 10)
+        return bool(self._amounts) and time.monotonic() - self._flushed_at >= interval
+
+    def flush(self):
+        with self._lock:
+            amounts, self._amounts = self._amounts, defaultdict(int)
+            self._flushed_at = time.monotonic()
+        for (cache_alias, key), amount in amounts.items():
+            increment(caches[cache_alias], key, amount)
+
+
+pending = PendingIncrements()
+
+
+class Counter:
+    """
+    Monotonic counter kept in the Django cache, so every worker process
+    adds to (and the metrics endpoint reports) the same value; increments
+    go through ``pending``.
+    """
+
+    def __init__(self, name, documentation, cache_alias='default'):
+        self.name = name
+        self.documentation = documentation
+        self.cache_alias = cache_alias
+        self.key = f'metrics:{name}'
+
+    def inc(self, amount=1):
+        pending.add(self.cache_alias, self.key, amount)
+
+    def value(self):
+        # this process's increments count even before they are flushed
+        return caches[self.cache_alias].get(self.key, 0) + pending.get(self.cache_alias, self.key)
+
+    def expose(self):
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} counter',
+                f'{self.name} {self.value()}']
+
+
+class Histogram:
+    """
+    Histogram kept in the Django cache like ``Counter``. An observation
+    increments only the bucket it falls into and the sum, which is stored
+    in integer units of ``1 / scale``; the cumulative counts Prometheus
+    expects are added up when the metric is exposed.
+    """
+
+    def __init__(self, name, documentation, buckets, scale=1, cache_alias='default'):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self.scale = scale
+        self.cache_alias = cache_alias
+        self.key = f'metrics:{name}'
+
+    def observe(self, value):
+        bucket = bisect.bisect_left(self.buckets, value)
+        pending.add(self.cache_alias, f'{self.key}:bucket:{bucket}', 1)
+        pending.add(self.cache_alias, f'{self.key}:sum', round(value * self.scale))
+
+    def expose(self):
+        cache = caches[self.cache_alias]
+        keys = [f'{self.key}:bucket:{i}' for i in range(len(self.buckets) + 1)]
+        values = cache.get_many(keys + [f'{self.key}:sum'])
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        total = 0
+        for key, bound in zip(keys, [*self.buckets, '+Inf']):
+            total += values.get(key, 0)
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {total}')
+        lines.append(f'{self.name}_sum {values.get(f"{self.key}:sum", 0) / self.scale}')
+        lines.append(f'{self.name}_count {total}')
+        return lines
+
+
+registry = []
+
+
+def counter(name, documentation, **kwargs):
+    metric = Counter(name, documentation, **kwargs)
+    registry.append(metric)
+    return metric
+
+
+def histogram(name, documentation, buckets, **kwargs):
+    metric = Histogram(name, documentation, buckets, **kwargs)
+    registry.append(metric)
+    return metric
+
+
+def render():
+    """
+    All registered metrics in the Prometheus text exposition format.
+    """
+    pending.flush()
+    lines = []
+    for metric in registry:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
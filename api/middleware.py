@@ -0,0 +1,132 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics
+from .instrumentation import (RequestTiming, current_timing, request_db_duration, request_duration,
+                              request_queries, request_serialization_duration, response_size)
+from .replicas import pin_to_primary, track_writes
+
+logger = logging.getLogger('api.requests')
+
+
+def view_app(request):
+    """
+    The app whose view served ``request``, or None if no URL matched.
+    """
+    match = request.resolver_match
+    if match is None:
+        return None
+    func = getattr(match.func, 'view_class', match.func)
+    return func.__module__.split('.')[0]
+
+
+class RequestTimingMiddleware:
+    """
+    Times requests to the views of REQUEST_TIMING_APPS: wall time, database
+    queries and their time, serialization time and response size. They are
+    sent back in a ``Server-Timing`` header, added to the histograms on
+    /api/metrics/, and requests slower than SLOW_REQUEST_SECONDS are logged
+    with their SQL.
+
+    Streamed responses (the exports) are timed up to their first byte and
+    have no size. The histograms are added to in memory and written to the
+    cache every METRICS_FLUSH_SECONDS (see ``metrics.PendingIncrements``).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        response = self.finish(request, response, timing)
+        if metrics.pending.due():
+            metrics.pending.flush()
+        return response
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        response = self.finish(request, response, timing)
+        if metrics.pending.due():
+            # cache round-trips, kept off the event loop
+            await sync_to_async(metrics.pending.flush)()
+        return response
+
+    def finish(self, request, response, timing):
+        if view_app(request) not in getattr(settings, 'REQUEST_TIMING_APPS', ('api', 'authorization')):
+            return response
+        elapsed = timing.elapsed()
+        response['Server-Timing'] = (
+            f'db;desc="{timing.query_count} queries";dur={timing.db_duration * 1000:.1f}, '
+            f'serialize;dur={timing.serialization_duration * 1000:.1f}, '
+            f'total;dur={elapsed * 1000:.1f}')
+
+        request_duration.observe(elapsed)
+        request_queries.observe(timing.query_count)
+        request_db_duration.observe(timing.db_duration)
+        request_serialization_duration.observe(timing.serialization_duration)
+        if not response.streaming:
+            response_size.observe(len(response.content))
+
+        if elapsed >= getattr(settings, 'SLOW_REQUEST_SECONDS', 1.0):
+            statements = ''.join(f'\n  {duration * 1000:.1f} ms: {sql}' for sql, duration in timing.queries)
+            logger.warning('Slow request %s %s: %s in %.1f ms, %d queries in %.1f ms, serialization %.1f ms%s',
+                           request.method, request.get_full_path(), response.status_code, elapsed * 1000,
+                           timing.query_count, timing.db_duration * 1000, timing.serialization_duration * 1000,
+                           statements)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Keeps the reads of a user who just wrote to the event tables on the
+    primary for REPLICA_PIN_SECONDS (see ``api.replicas``). Goes after
+    AuthenticationMiddleware; users authenticated by DRF are seen too, as
+    DRF sets ``user`` on the underlying request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with track_writes() as writes:
+            response = self.get_response(request)
+        if writes.happened:
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        with track_writes() as writes:
+            response = await self.get_response(request)
+        if writes.happened:
+            # the session user may not have been loaded yet, which takes a query
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def pin(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
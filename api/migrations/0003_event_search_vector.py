@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:34
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX event_search_vector_idx ON api_event USING gin (search_vector)",
+    "CREATE TRIGGER event_search_vector_update BEFORE INSERT OR UPDATE OF title, location, description "
+    "ON api_event FOR EACH ROW EXECUTE FUNCTION "
+    "tsvector_update_trigger(search_vector, 'pg_catalog.english', title, location, description)",
+    "UPDATE api_event SET search_vector = to_tsvector('pg_catalog.english', "
+    "coalesce(title, '') || ' ' || coalesce(location, '') || ' ' || coalesce(description, ''))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS event_search_vector_update ON api_event",
+    "DROP INDEX IF EXISTS event_search_vector_idx",
+]
+
+
+def run_on_postgres(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_event_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgres(POSTGRES_FORWARD), run_on_postgres(POSTGRES_BACKWARD)),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_attendees(apps, schema_editor):
+    Event = apps.get_model('api', 'Event')
+    Attendance = Event.attendees.through
+    count = (Attendance.objects.filter(event=OuterRef('pk')).order_by()
+             .values('event').annotate(count=Count('*')).values('count'))
+    Event.objects.using(schema_editor.connection.alias).update(attendee_count=Coalesce(Subquery(count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='attendee_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(count_attendees, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_event_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # the composite organizer index is created before the single-column FK index is dropped
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['location', 'date', 'id'], name='event_location_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'date', 'id'], name='event_organizer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('capacity__isnull', True), ('attendee_count__lt', models.F('capacity')), _connector='OR'), fields=['date', 'id'], name='event_open_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='organizer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='organizers', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
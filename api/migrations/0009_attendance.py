@@ -0,0 +1,55 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_event_access_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Event.attendees keeps its table; only the new column touches the database
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Attendance',
+                    fields=[
+                        ('id', models.AutoField(primary_key=True, serialize=False)),
+                        ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.event')),
+                        ('customuser', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                         to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'api_event_attendees',
+                        'unique_together': {('event', 'customuser')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='event',
+                    name='attendees',
+                    field=models.ManyToManyField(through='api.Attendance', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            # no database default, so that existing registrations are left without a time
+            database_operations=[
+                migrations.AddField(
+                    model_name='attendance',
+                    name='registered_at',
+                    field=models.DateTimeField(null=True),
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='attendance',
+                    name='registered_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+                ),
+            ],
+        ),
+    ]
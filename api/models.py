@@ -1,5 +1,53 @@
+from operator import attrgetter
+
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from authorization.models import CustomUser
+from .recurrence import parse_rule
+
+
+HAS_SEATS = models.Q(capacity__isnull=True) | models.Q(attendee_count__lt=models.F('capacity'))
+RECURRING = ~models.Q(recurrence='')
+# distinct, as a recurring event's attendee may have registered for several occurrences
+ATTENDEE_IDS = models.Prefetch('attendees', queryset=CustomUser.objects.only('id').distinct())
+
+
+def on_or_after(value):
+    """
+    Events that start at ``value`` or later, and series still going then.
+    """
+    return models.Q(date__gte=value) | RECURRING & (models.Q(recurrence_end__gte=value)
+                                                    | models.Q(recurrence_end__isnull=True))
+
+
+class EventQuerySet(models.QuerySet):
+    def with_attendees(self):
+        """
+        Prefetch attendee ids in one query for the whole page instead of one per event.
+        """
+        return self.prefetch_related(ATTENDEE_IDS)
+
+    def upcoming(self):
+        return self.on_or_after(timezone.now())
+
+    def on_or_after(self, value):
+        return self.filter(on_or_after(value))
+
+    def with_seats(self):
+        """
+        One-off events that can still take registrations; implies the
+        condition of ``event_open_date_idx`` so the planner can use that
+        partial index. A series' seats are per occurrence, on its
+        ``Occurrence`` rows, so series aren't included.
+        """
+        return self.filter(HAS_SEATS, ~RECURRING)
+
+
+class EventManager(models.Manager.from_queryset(EventQuerySet)):
+    def get_queryset(self):
+        # search_vector is only ever read by the database itself
+        return super().get_queryset().defer('search_vector')
 
 
 class Event(models.Model):
@@ -7,8 +55,162 @@ class Event(models.Model):
     description = models.TextField()
     date = models.DateTimeField()
     location = models.CharField(max_length=255)
-    organizer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="organizers")
-    attendees = models.ManyToManyField(CustomUser)
+    # indexed by event_organizer_date_idx, which also serves plain organizer lookups
+    organizer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="organizers", db_index=False)
+    attendees = models.ManyToManyField(CustomUser, through='Attendance')
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    # seats taken, kept in step with attendees by api.registration and api.signals; a
+    # recurring event's seats are per occurrence and counted on its Occurrence rows
+    attendee_count = models.PositiveIntegerField(default=0, editable=False)
+    # an RRULE (see api.recurrence), empty for a one-off event; date is then the first occurrence
+    recurrence = models.CharField(max_length=255, blank=True, default='')
+    # start of a series' last occurrence, null if it never ends; set by save()
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False)
+    # bumped by every write, including the queryset updates that maintain attendee_count
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by a database trigger on PostgreSQL, unused elsewhere (see api.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = EventManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+            models.Index(fields=['location', 'date', 'id'], name='event_location_date_idx'),
+            models.Index(fields=['organizer', 'date', 'id'], name='event_organizer_date_idx'),
+            models.Index(fields=['date', 'id'], condition=HAS_SEATS, name='event_open_date_idx'),
+            models.Index(fields=['attendee_count', 'id'], name='event_popularity_idx'),
+            models.Index(fields=['updated_at'], name='event_updated_at_idx'),
+            # the date filters' other half, series that started earlier
+            models.Index(fields=['recurrence_end'], condition=RECURRING, name='event_series_end_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.set_recurrence_end()
+        if 'update_fields' in kwargs and kwargs['update_fields'] is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'recurrence_end'}
+        super().save(*args, **kwargs)
+
+    @property
+    def seats_remaining(self):
+        # None for a series too: its capacity applies to each occurrence (see Occurrence.seats_remaining)
+        if self.capacity is None or self.recurrence:
+            return None
+        return max(self.capacity - self.attendee_count, 0)
+
+    @property
+    def rule(self):
+        return parse_rule(self.recurrence) if self.recurrence else None
+
+    def set_recurrence_end(self):
+        # for bulk_create, which doesn't call save()
+        self.recurrence_end = self.rule.last(self.date) if self.recurrence else None
+
+    def occurrences_between(self, start, end):
+        """
+        The occurrences held in [``start``, ``end``), moved ones where they
+        were moved to, ordered by time. Only occurrences with changes or
+        registrations are stored; the others come back unsaved, and so does
+        the single occurrence of a one-off event.
+        """
+        if not self.recurrence:
+            if start <= self.date < end:
+                return [Occurrence(event=self, start=self.date, date=self.date, attendee_count=self.attendee_count)]
+            return []
+        stored = {occurrence.start: occurrence for occurrence in self.occurrences.filter(
+            models.Q(start__gte=start, start__lt=end) | models.Q(date__gte=start, date__lt=end))}
+        occurrences = []
+        for when in self.rule.between(self.date, start, end):
+            occurrence = stored.pop(when, None) or Occurrence(event=self, start=when, date=when)
+            if start <= occurrence.date < end:
+                occurrences.append(occurrence)
+        # moved into the window from outside it
+        occurrences.extend(occurrence for occurrence in stored.values() if start <= occurrence.date < end)
+        return sorted(occurrences, key=attrgetter('date', 'start'))
+
+
+class Occurrence(models.Model):
+    """
+    One occurrence of a recurring event, stored once it differs from the
+    rule (cancelled or moved) or takes registrations, as it holds their
+    seat count.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='occurrences')
+    # where the rule puts it, which identifies it even after a move
+    start = models.DateTimeField()
+    date = models.DateTimeField()
+    cancelled = models.BooleanField(default=False)
+    attendee_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        unique_together = [('event', 'start')]
+
+    def __str__(self):
+        return f'{self.event_id} at {self.start:%Y-%m-%d %H:%M}'
+
+    @property
+    def seats_remaining(self):
+        if self.event.capacity is None:
+            return None
+        return max(self.event.capacity - self.attendee_count, 0)
+
+
+class Attendance(models.Model):
+    """
+    A registration: the table behind ``Event.attendees``, which was
+    Django's own until registrations needed a time.
+    """
+    # the table was created by Django for the plain ManyToManyField, with an integer key
+    id = models.AutoField(primary_key=True)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    customuser = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    # null for registrations made before it was recorded
+    registered_at = models.DateTimeField(default=timezone.now, null=True)
+    # set for a recurring event, whose registrations are per occurrence
+    occurrence = models.ForeignKey(Occurrence, on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        db_table = 'api_event_attendees'
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'customuser'], condition=models.Q(occurrence__isnull=True),
+                                    name='attendance_event_user_uniq'),
+            models.UniqueConstraint(fields=['occurrence', 'customuser'],
+                                    condition=models.Q(occurrence__isnull=False),
+                                    name='attendance_occurrence_user_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.customuser_id} -> {self.event_id}'
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued in the same transaction as the change that triggered it and
+    delivered later by ``manage.py send_outbox``.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipient = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
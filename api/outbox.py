@@ -0,0 +1,87 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """
+    Queue one email per recipient. Call inside the transaction that makes
+    the change the email reports, so both commit or roll back together.
+    """
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(subject=subject, body=message, from_email=from_email, recipient=recipient)
+        for recipient in recipient_list
+    ])
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def record_failure(email, error, now, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def drain(batch_size=None):
+    """
+    Deliver one batch of due emails over a single mail connection.
+    Returns ``(sent, failed)`` counts for the batch.
+    """
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        due = OutboxEmail.objects.filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+        if connection.features.has_select_for_update_skip_locked:
+            # lets several workers drain the same table without sending twice
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        if not batch:
+            return sent, failed
+
+        mail_connection = get_connection()
+        try:
+            try:
+                mail_connection.open()
+            except Exception as e:
+                # the server is unreachable: an attempt for every email, so the batch backs off together
+                logger.warning('Opening the mail connection failed: %s', e)
+                for email in batch:
+                    record_failure(email, e, now, max_attempts)
+                failed = len(batch)
+            else:
+                for email in batch:
+                    try:
+                        EmailMessage(email.subject, email.body, email.from_email, [email.recipient],
+                                     connection=mail_connection).send()
+                    except Exception as e:
+                        logger.warning('Sending outbox email %s failed: %s', email.pk, e)
+                        record_failure(email, e, now, max_attempts)
+                        failed += 1
+                    else:
+                        email.attempts += 1
+                        email.status = OutboxEmail.SENT
+                        email.sent_at = timezone.now()
+                        email.last_error = ''
+                        sent += 1
+        finally:
+            mail_connection.close()
+        OutboxEmail.objects.bulk_update(batch, ['attempts', 'status', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,152 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the ordering columns instead of
+    counting rows, so every page is a bounded index range scan.
+
+    The response body stays a plain list; next/previous page URLs are
+    sent in the ``Link`` header.
+    """
+    ordering = ('date', 'id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size = getattr(settings, 'EVENTS_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'EVENTS_MAX_PAGE_SIZE', 500)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.set_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """
+        The requested page as a lazy queryset, with one extra row that tells
+        whether there is a further page.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request, queryset)
+
+        ordering = self._directed(self.reverse)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self._seek(ordering, self.position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.position is not None, has_more
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(data, headers=self.get_headers())
+
+    def get_headers(self):
+        links = []
+        if self.has_next and self.page:
+            links.append('<%s>; rel="next"' % self.get_next_link())
+        if self.has_previous and self.page:
+            links.append('<%s>; rel="prev"' % self.get_previous_link())
+        return {'Link': ', '.join(links)} if links else None
+
+    def get_next_link(self):
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        values = [self._field_value(obj, field) for field in self.ordering]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'), default=str)
+        token = urlsafe_b64encode(payload.encode()).decode('ascii').rstrip('=')
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, queryset):
+        token = request.GET.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            values, reverse = payload['p'], bool(payload['r'])
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [self._to_python(queryset, field, value) for field, value in zip(self.ordering, values)]
+            # the ordering columns are never null, and a null can't be compared in the seek
+            if any(value is None for value in position):
+                raise ValueError
+        except (BinasciiError, KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def _directed(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+
+    @staticmethod
+    def _field_value(obj, field):
+        # pages hold model instances, or dicts when the queryset is .values()
+        name = field.lstrip('-')
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @staticmethod
+    def _to_python(queryset, field, value):
+        name = field.lstrip('-')
+        try:
+            model_field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # an annotation, such as the search rank
+            model_field = queryset.query.annotations[name].output_field
+        return model_field.to_python(value)
+
+    @staticmethod
+    def _seek(ordering, position):
+        """
+        Build ``(a, b) > (x, y)`` as ``a >= x AND (a > x OR (a = x AND b > y))``
+        so the leading column bounds the index range.
+        """
+        names = [field.lstrip('-') for field in ordering]
+        seek = Q()
+        for i in range(len(ordering)):
+            lookup = 'lt' if ordering[i].startswith('-') else 'gt'
+            step = Q(**{'%s__%s' % (names[i], lookup): position[i]})
+            for name, value in zip(names[:i], position[:i]):
+                step &= Q(**{name: value})
+            seek |= step
+        lead = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{'%s__%s' % (names[0], lead): position[0]}) & seek
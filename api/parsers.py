@@ -0,0 +1,14 @@
+from rest_framework.parsers import BaseParser
+
+from .importing import read_ndjson
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline-delimited JSON. Parses lazily: ``request.data`` is a generator
+    that reads one line of the request body at a time.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return read_ndjson(stream)
@@ -0,0 +1,209 @@
+"""
+Recurrence rules for events: a subset of iCalendar's RRULE (RFC 5545),
+e.g. ``FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20``.
+
+    FREQ      DAILY, WEEKLY or MONTHLY
+    INTERVAL  every how many days, weeks or months (default 1)
+    BYDAY     the weekdays of a weekly rule, MO to SU (default the start's)
+    COUNT     number of occurrences, or
+    UNTIL     last possible start, as 20300101T000000Z or 20300101
+
+The series starts at the event's date, its first occurrence, and keeps
+that wall-clock time in TIME_ZONE across daylight saving changes.
+
+Occurrences are never stored by the rule: ``between`` yields those in a
+window, and jumps straight to the window with date arithmetic, so its cost
+depends on the window's length, not on how far into the series it lies.
+"""
+import functools
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+PARTS = ('FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL')
+
+
+def _positive_int(name, value):
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f'{name} must be a positive integer')
+    return int(value)
+
+
+def _parse_until(value):
+    for fmt in ('%Y%m%dT%H%M%SZ', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            pass
+    raise ValueError('UNTIL must look like 20300101T000000Z or 20300101')
+
+
+def _add_months(value, months):
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+class RecurrenceRule:
+    def __init__(self, freq, interval=1, byday=(), count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.byday = tuple(sorted(set(byday), key=WEEKDAYS.index))
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, text):
+        """
+        The rule written in ``text``; raises ``ValueError`` saying what is
+        wrong with it.
+        """
+        parts = {}
+        for part in text.strip().upper().split(';'):
+            name, sep, value = part.partition('=')
+            if not sep or not value:
+                raise ValueError(f'Expected NAME=VALUE, got "{part}"')
+            if name not in PARTS:
+                raise ValueError(f'Unsupported rule part {name}; use {", ".join(PARTS)}')
+            if name in parts:
+                raise ValueError(f'{name} is given twice')
+            parts[name] = value
+        if parts.get('FREQ') not in FREQUENCIES:
+            raise ValueError(f'FREQ must be one of {", ".join(FREQUENCIES)}')
+        if 'COUNT' in parts and 'UNTIL' in parts:
+            raise ValueError('COUNT and UNTIL cannot both be given')
+        byday = parts['BYDAY'].split(',') if 'BYDAY' in parts else []
+        if byday and parts['FREQ'] != 'WEEKLY':
+            raise ValueError('BYDAY is only supported with FREQ=WEEKLY')
+        if any(day not in WEEKDAYS for day in byday):
+            raise ValueError(f'BYDAY takes days among {",".join(WEEKDAYS)}')
+        return cls(parts['FREQ'],
+                   interval=_positive_int('INTERVAL', parts['INTERVAL']) if 'INTERVAL' in parts else 1,
+                   byday=byday,
+                   count=_positive_int('COUNT', parts['COUNT']) if 'COUNT' in parts else None,
+                   until=_parse_until(parts['UNTIL']) if 'UNTIL' in parts else None)
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append(f'BYDAY={",".join(self.byday)}')
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            parts.append(f'UNTIL={self.until:%Y%m%dT%H%M%SZ}')
+        return ';'.join(parts)
+
+    def check_start(self, dtstart):
+        """
+        Raise ``ValueError`` if the rule can't start at ``dtstart``.
+        """
+        local = timezone.localtime(dtstart, timezone.get_default_timezone())
+        if self.byday and WEEKDAYS[local.weekday()] not in self.byday:
+            raise ValueError('The first occurrence must fall on one of the BYDAY days')
+        if self.freq == 'MONTHLY' and local.day > 28:
+            # RFC 5545 skips the months without that day, which has no fixed period
+            raise ValueError('Monthly events must start on one of the first 28 days of the month')
+        if self.until is not None and self.until < dtstart:
+            raise ValueError('UNTIL is before the first occurrence')
+        try:
+            self.last(dtstart)
+        except (OverflowError, ValueError):
+            raise ValueError('The series would run past the year 9999')
+
+    def between(self, dtstart, start, end):
+        """
+        Yield the starts of the occurrences in [``start``, ``end``), in order,
+        of the series that begins at ``dtstart``.
+        """
+        tz = timezone.get_default_timezone()
+        series = _Series(self, timezone.make_naive(dtstart, tz))
+        # a period early, in case a daylight saving change moves the window's edge
+        period = max(series.period_of(timezone.make_naive(start, tz)) - 1, 0)
+        try:
+            while True:
+                for position in range(len(series.offsets)):
+                    number = series.number(period, position)
+                    if number < 0:
+                        continue
+                    if self.count is not None and number >= self.count:
+                        return
+                    occurrence = timezone.make_aware(series.occurrence(period, position), tz)
+                    if (self.until is not None and occurrence > self.until) or occurrence >= end:
+                        return
+                    if occurrence >= start:
+                        yield occurrence
+                period += 1
+        except (OverflowError, ValueError):
+            # past year 9999
+            return
+
+    def contains(self, dtstart, value):
+        return next(self.between(dtstart, value, value + timedelta(microseconds=1)), None) == value
+
+    def last(self, dtstart):
+        """
+        The start of the series' last occurrence, or None if it never ends.
+        """
+        if self.count is None and self.until is None:
+            return None
+        tz = timezone.get_default_timezone()
+        series = _Series(self, timezone.make_naive(dtstart, tz))
+        if self.count is not None:
+            period, position = divmod(self.count - 1 + series.skipped, len(series.offsets))
+            return timezone.make_aware(series.occurrence(period, position), tz)
+        period = series.period_of(timezone.make_naive(self.until, tz))
+        while period >= 0:
+            for position in reversed(range(len(series.offsets))):
+                occurrence = timezone.make_aware(series.occurrence(period, position), tz)
+                if series.number(period, position) >= 0 and occurrence <= self.until:
+                    return occurrence
+            period -= 1
+        return dtstart
+
+
+class _Series:
+    """
+    A rule laid out from its first occurrence, in naive wall-clock time:
+    periods of INTERVAL days, weeks (from Monday) or months, with the
+    occurrences at fixed day offsets within each period, numbered from the
+    first occurrence on.
+    """
+
+    def __init__(self, rule, first):
+        self.rule = rule
+        if rule.freq == 'WEEKLY':
+            self.origin = first - timedelta(days=first.weekday())
+            self.offsets = [WEEKDAYS.index(day) for day in rule.byday] or [first.weekday()]
+            self.period_days = 7 * rule.interval
+        else:
+            self.origin = first
+            self.offsets = [0]
+            self.period_days = rule.interval
+        # days of the first week before the first occurrence
+        self.skipped = sum(offset < first.weekday() for offset in self.offsets) if rule.freq == 'WEEKLY' else 0
+
+    def period_of(self, value):
+        if self.rule.freq == 'MONTHLY':
+            months = (value.year - self.origin.year) * 12 + value.month - self.origin.month
+            return max(months // self.rule.interval, 0)
+        return max((value - self.origin) // timedelta(days=self.period_days), 0)
+
+    def occurrence(self, period, position):
+        if self.rule.freq == 'MONTHLY':
+            return _add_months(self.origin, period * self.rule.interval)
+        return self.origin + timedelta(days=period * self.period_days + self.offsets[position])
+
+    def number(self, period, position):
+        return period * len(self.offsets) + position - self.skipped
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_rule(text):
+    """
+    ``RecurrenceRule.parse``, cached: events are read far more often than
+    their rules change.
+    """
+    return RecurrenceRule.parse(text)
@@ -0,0 +1,137 @@
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Event, Occurrence
+from .signals import attendance_changed
+
+
+class RegistrationError(Exception):
+    message = 'Registration failed'
+
+
+class AlreadyRegistered(RegistrationError):
+    message = 'You are already registered for this event'
+
+
+class EventFull(RegistrationError):
+    message = 'This event is full'
+
+
+class NotRegistered(RegistrationError):
+    message = 'You are not registered for this event'
+
+
+class OccurrenceRequired(RegistrationError):
+    message = 'This event recurs: choose an occurrence'
+
+
+class NotAnOccurrence(RegistrationError):
+    message = 'The event has no occurrence at that time'
+
+
+class OccurrenceCancelled(RegistrationError):
+    message = 'This occurrence is cancelled'
+
+
+def check_occurrence(event, start):
+    """
+    Raise ``RegistrationError`` unless ``start`` names an occurrence of
+    ``event``, as registrations for a recurring event must and for a one-off
+    one mustn't.
+    """
+    if not event.recurrence:
+        if start is not None:
+            raise NotAnOccurrence()
+        return
+    if start is None:
+        raise OccurrenceRequired()
+    if not event.rule.contains(event.date, start):
+        raise NotAnOccurrence()
+
+
+def register_attendee(event, user, start=None):
+    """
+    Take a seat and add ``user`` to ``event.attendees``; for a recurring
+    event, a seat at the occurrence that starts at ``start``.
+
+    The seat is taken by a single conditional ``UPDATE`` on the event row,
+    which also serializes concurrent registrations for that event; the unique
+    (event, user) constraint on the attendees table rejects duplicates. Both
+    happen in one transaction, so a rejected attempt gives its seat back.
+    """
+    check_occurrence(event, start)
+    if start is not None:
+        return register_for_occurrence(event, user, start)
+    Attendance = Event.attendees.through
+    # no savepoint: a failure has to roll back the enclosing transaction anyway
+    with transaction.atomic(savepoint=False):
+        taken = (Event.objects
+                 .filter(pk=event.pk)
+                 .with_seats()
+                 .update(attendee_count=F('attendee_count') + 1, updated_at=timezone.now()))
+        if taken:
+            try:
+                Attendance.objects.create(event_id=event.pk, customuser_id=user.pk)
+            except IntegrityError:
+                raise AlreadyRegistered()
+            attendance_changed.send(sender=Event, event_id=event.pk, using=router.db_for_write(Event))
+    if not taken:
+        raise EventFull()
+
+
+def register_for_occurrence(event, user, start):
+    """
+    As ``register_attendee``, with the seats counted on the occurrence's row,
+    which is stored on its first registration.
+    """
+    Attendance = Event.attendees.through
+    with transaction.atomic(savepoint=False):
+        occurrence, _ = Occurrence.objects.get_or_create(event=event, start=start, defaults={'date': start})
+        seats = Occurrence.objects.filter(pk=occurrence.pk, cancelled=False)
+        if event.capacity is not None:
+            seats = seats.filter(attendee_count__lt=event.capacity)
+        taken = seats.update(attendee_count=F('attendee_count') + 1)
+        if taken:
+            try:
+                Attendance.objects.create(event_id=event.pk, customuser_id=user.pk, occurrence=occurrence)
+            except IntegrityError:
+                raise AlreadyRegistered()
+            # moves the event's Last-Modified, as its attendee list changed
+            Event.objects.filter(pk=event.pk).update(updated_at=timezone.now())
+            attendance_changed.send(sender=Event, event_id=event.pk, using=router.db_for_write(Event))
+    if not taken:
+        raise OccurrenceCancelled() if occurrence.cancelled else EventFull()
+
+
+def unregister_attendee(event, user, start=None):
+    """
+    Remove ``user`` from ``event.attendees`` and give the seat back; for a
+    recurring event, from the occurrence that starts at ``start``.
+    """
+    check_occurrence(event, start)
+    if start is not None:
+        return unregister_from_occurrence(event, user, start)
+    Attendance = Event.attendees.through
+    with transaction.atomic(savepoint=False):
+        deleted, _ = Attendance.objects.filter(event_id=event.pk, customuser_id=user.pk).delete()
+        if deleted:
+            Event.objects.filter(pk=event.pk).update(attendee_count=F('attendee_count') - 1, updated_at=timezone.now())
+            attendance_changed.send(sender=Event, event_id=event.pk, using=router.db_for_write(Event))
+    if not deleted:
+        raise NotRegistered()
+
+
+def unregister_from_occurrence(event, user, start):
+    Attendance = Event.attendees.through
+    with transaction.atomic(savepoint=False):
+        occurrence = Occurrence.objects.filter(event=event, start=start).first()
+        deleted = 0
+        if occurrence is not None:
+            deleted, _ = Attendance.objects.filter(occurrence=occurrence, customuser_id=user.pk).delete()
+        if deleted:
+            Occurrence.objects.filter(pk=occurrence.pk).update(attendee_count=F('attendee_count') - 1)
+            Event.objects.filter(pk=event.pk).update(updated_at=timezone.now())
+            attendance_changed.send(sender=Event, event_id=event.pk, using=router.db_for_write(Event))
+    if not deleted:
+        raise NotRegistered()
@@ -0,0 +1,13 @@
+from rest_framework import renderers
+
+from .instrumentation import measure
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    ``JSONRenderer`` that counts its time as serialization of the response.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure():
+            return super().render(data, accepted_media_type, renderer_context)
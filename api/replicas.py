@@ -0,0 +1,224 @@
+"""
+Read replicas for the event list and detail.
+
+Views opt in with ``reads_from_replica``: their queries then go to one of
+DATABASE_REPLICAS, picked round-robin among the ones that accept
+connections. Everything else, all writes included, stays on the primary.
+So do the reads of a user who wrote to the event tables in the last
+REPLICA_PIN_SECONDS, which should cover the replication lag, so that
+nobody reads back their own registration or update as if it hadn't
+happened.
+"""
+import functools
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections
+
+# writes to these apps' tables pin the writer to the primary
+PINNING_APPS = ('api',)
+NOT_CHOSEN = object()
+
+current_reads = ContextVar('current_reads', default=None)
+current_writes = ContextVar('current_writes', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaPool:
+    """
+    Round-robin over the replicas. One that fails its connection check is
+    left out for REPLICA_RETRY_SECONDS, and with none left reads go to the
+    primary.
+    """
+
+    def __init__(self):
+        self._turn = itertools.count()
+        self._down_until = {}
+
+    def choose(self):
+        aliases = replica_aliases()
+        if not aliases:
+            return None
+        start = next(self._turn)
+        now = time.monotonic()
+        for i in range(len(aliases)):
+            alias = aliases[(start + i) % len(aliases)]
+            if self._down_until.get(alias, 0) <= now and self.check(alias):
+                return alias
+        return None
+
+    def check(self, alias):
+        try:
+            # a no-op on an open connection; a failure mid-request is reported by reads_from_replica
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self.mark_down(alias)
+            return False
+        return True
+
+    def mark_down(self, alias):
+        self._down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+
+
+pool = ReplicaPool()
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    caches['default'].set(_pin_key(user_id), True, timeout=getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    return caches['default'].get(_pin_key(user_id)) is not None
+
+
+class Writes:
+    """
+    Whether the current request has written to the PINNING_APPS tables.
+    """
+    happened = False
+
+
+@contextmanager
+def track_writes():
+    writes = Writes()
+    token = current_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        current_writes.reset(token)
+
+
+class ReplicaReads:
+    """
+    The replica a view's reads go to, chosen at its first query, so a
+    response served from the cache doesn't touch a replica at all.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._pinned = None
+        self.chosen = NOT_CHOSEN
+
+    @property
+    def pinned(self):
+        if self._pinned is None:
+            self._pinned = self.user is not None and self.user.is_authenticated and is_pinned(self.user.pk)
+        return self._pinned
+
+    @property
+    def alias(self):
+        if self.chosen is NOT_CHOSEN:
+            self.chosen = None if self.pinned else pool.choose()
+        return self.chosen
+
+    def fall_back(self):
+        """
+        Mark the chosen replica as down and read from the primary instead.
+        """
+        if self.chosen not in (NOT_CHOSEN, None):
+            pool.mark_down(self.chosen)
+            self.chosen = None
+            return True
+        return False
+
+
+def reads_own_writes():
+    """
+    Whether the current view's user wrote lately while there are replicas:
+    another user's replica read may then have cached a copy from before the
+    write, under the version the write bumped, so caches filled by replica
+    reads mustn't answer this view.
+    """
+    reads = current_reads.get()
+    return reads is not None and bool(replica_aliases()) and reads.pinned
+
+
+def replica_timeout():
+    """
+    Cache timeout for data read in the current view: no longer than a
+    replica may lag behind if it came from one, else None for the default.
+    """
+    reads = current_reads.get()
+    if reads is not None and reads.chosen not in (NOT_CHOSEN, None):
+        return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    return None
+
+
+def reads_from_replica(view_method):
+    """
+    Decorate a view's read-only handler (sync or async) to run its queries
+    on a replica. A replica that fails mid-request is marked down and the
+    handler runs again on the primary.
+    """
+    if iscoroutinefunction(view_method):
+        @functools.wraps(view_method)
+        async def handler(view, request, *args, **kwargs):
+            reads = ReplicaReads(getattr(request, 'user', None))
+            token = current_reads.set(reads)
+            try:
+                try:
+                    return await view_method(view, request, *args, **kwargs)
+                except OperationalError:
+                    if not reads.fall_back():
+                        raise
+                    return await view_method(view, request, *args, **kwargs)
+            finally:
+                current_reads.reset(token)
+        return handler
+
+    @functools.wraps(view_method)
+    def handler(view, request, *args, **kwargs):
+        reads = ReplicaReads(getattr(request, 'user', None))
+        token = current_reads.set(reads)
+        try:
+            try:
+                return view_method(view, request, *args, **kwargs)
+            except OperationalError:
+                if not reads.fall_back():
+                    raise
+                return view_method(view, request, *args, **kwargs)
+        finally:
+            current_reads.reset(token)
+    return handler
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = current_reads.get()
+        if reads is None:
+            return None
+        writes = current_writes.get()
+        if writes is not None and writes.happened:
+            return DEFAULT_DB_ALIAS
+        return reads.alias or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        writes = current_writes.get()
+        if writes is not None and model._meta.app_label in PINNING_APPS:
+            writes.happened = True
+        # never where an instance was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        if db in replica_aliases():
+            return False
+        return None
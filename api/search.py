@@ -0,0 +1,177 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import BooleanField, F, IntegerField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+TOKEN_RE = re.compile(r'\w+')
+# Ranks are scaled to integers so they can be compared exactly in a pagination cursor.
+RANK_SCALE = 1000000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search over the ``search_vector`` column, which a database
+    trigger keeps in sync with title, location and description and a GIN
+    index serves.
+    """
+    config = 'english'
+
+    def search(self, queryset, text):
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset.none().annotate(rank=Value(0))
+        # every term must match, the last one as a prefix so search-as-you-type works
+        query = SearchQuery(' & '.join('%s:*' % token for token in tokens),
+                            search_type='raw', config=self.config)
+        rank = Cast(SearchRank(F('search_vector'), query) * RANK_SCALE, IntegerField())
+        return queryset.filter(search_vector=query).annotate(rank=rank)
+
+    def index(self, event):
+        pass
+
+    def remove(self, event_id):
+        pass
+
+
+class InvertedIndex:
+    """
+    In-process token -> {event id: weight} postings, built lazily from the
+    database on first use and updated from model signals.
+    """
+    weights = (('title', 4), ('location', 2), ('description', 1))
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._built = False
+        self._lock = threading.RLock()
+
+    def build(self):
+        from .models import Event
+
+        with self._lock:
+            self.clear()
+            rows = Event.objects.values_list('id', 'title', 'location', 'description')
+            for event_id, *fields in rows.iterator(chunk_size=2000):
+                self._add(event_id, fields)
+            self._built = True
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._built = False
+
+    def add(self, event):
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(event.pk)
+            self._add(event.pk, [getattr(event, name) for name, _ in self.weights])
+
+    def remove(self, event_id):
+        with self._lock:
+            self._remove(event_id)
+
+    def search(self, text):
+        """
+        Return ``{event id: score}`` for events containing every token,
+        the last token matched as a prefix.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return {}
+        with self._lock:
+            if not self._built:
+                self.build()
+            *exact, prefix = tokens
+            postings = [self._postings.get(token, {}) for token in exact]
+            merged = {}
+            for token, ids in self._postings.items():
+                if token.startswith(prefix):
+                    for event_id, weight in ids.items():
+                        merged[event_id] = merged.get(event_id, 0) + weight
+            postings.append(merged)
+
+        postings.sort(key=len)
+        scores = dict(postings[0])
+        for ids in postings[1:]:
+            scores = {event_id: score + ids[event_id] for event_id, score in scores.items() if event_id in ids}
+        return scores
+
+    def _add(self, event_id, fields):
+        tokens = {}
+        for value, (_, weight) in zip(fields, self.weights):
+            for token in tokenize(value or ''):
+                tokens[token] = tokens.get(token, 0) + weight
+        for token, weight in tokens.items():
+            self._postings[token][event_id] = weight
+        self._documents[event_id] = tuple(tokens)
+
+    def _remove(self, event_id):
+        for token in self._documents.pop(event_id, ()):
+            ids = self._postings[token]
+            ids.pop(event_id, None)
+            if not ids:
+                del self._postings[token]
+
+
+class InvertedIndexSearchBackend:
+    """
+    Fallback for databases without full-text search (SQLite in tests and
+    local development).
+
+    Matching ids are inlined into the SQL twice, once to filter and once to
+    rank, so a query matching most of a large table produces a statement of
+    that size; past a few hundred thousand matches it can hit the database's
+    statement length limit.
+    """
+
+    def __init__(self):
+        self.inverted_index = InvertedIndex()
+
+    def search(self, queryset, text):
+        scores = self.inverted_index.search(text)
+        if not scores:
+            return queryset.none().annotate(rank=Value(0))
+        # ids come from our own index, so they are inlined rather than bound
+        # to stay clear of SQLite's host parameter limit on large result sets
+        quote_name = connections[queryset.db].ops.quote_name
+        column = '%s.%s' % (quote_name(queryset.model._meta.db_table), quote_name('id'))
+        by_score = defaultdict(list)
+        for event_id, score in scores.items():
+            by_score[score].append(str(int(event_id)))
+        cases = ' '.join('WHEN %s IN (%s) THEN %d' % (column, ','.join(ids), score)
+                         for score, ids in by_score.items())
+        matched = RawSQL('%s IN (%s)' % (column, ','.join(map(str, map(int, scores)))), (),
+                         output_field=BooleanField())
+        rank = RawSQL('CASE %s ELSE 0 END' % cases, (), output_field=IntegerField())
+        return queryset.filter(matched).annotate(rank=rank)
+
+    def index(self, event):
+        self.inverted_index.add(event)
+
+    def remove(self, event_id):
+        self.inverted_index.remove(event_id)
+
+
+_backends = {}
+
+
+def get_search_backend(using='default'):
+    vendor = connections[using].vendor
+    if vendor not in _backends:
+        if vendor == 'postgresql':
+            _backends[vendor] = PostgresSearchBackend()
+        else:
+            _backends[vendor] = InvertedIndexSearchBackend()
+    return _backends[vendor]
@@ -1,20 +1,142 @@
 from django.utils import timezone
 from rest_framework import serializers
-from .models import Event
+from rest_framework.permissions import SAFE_METHODS
+from .models import Event, Occurrence
+from .recurrence import RecurrenceRule
+
+
+def include_attendees(request):
+    """
+    The attendee id list can be huge, so it is only sent for ``?include=attendees``.
+    """
+    return request is not None and 'attendees' in request.GET.get('include', '').split(',')
+
+
+def split_param(request, name):
+    return [value for value in request.GET.get(name, '').split(',') if value] if request is not None else []
 
 
 class EventSerializer(serializers.ModelSerializer):
+    """
+    Full event representation. Reads can be narrowed with ``?fields=``
+    (any of ``Meta.fields``) or ``?omit=`` (from ``default_fields``).
+    """
+    seats_remaining = serializers.IntegerField(
+        read_only=True, allow_null=True,
+        help_text='Null without a capacity, and for a recurring event, whose seats are per occurrence')
+    # rendered when the request doesn't ask for particular fields
+    default_fields = ['id', 'title', 'description', 'date', 'location', 'organizer', 'capacity',
+                      'attendee_count', 'seats_remaining', 'recurrence', 'recurrence_end']
+    # model columns behind fields that aren't columns themselves
+    field_columns = {'seats_remaining': ('capacity', 'attendee_count', 'recurrence'), 'attendees': ()}
 
     class Meta:
         model = Event
-        fields = '__all__'
-        read_only_fields = ['attendees']
+        fields = ['id', 'title', 'description', 'date', 'location', 'organizer', 'attendees',
+                  'capacity', 'attendee_count', 'seats_remaining', 'recurrence', 'recurrence_end']
+        read_only_fields = ['attendees', 'recurrence_end']
         extra_kwargs = {
             'description': {'required': False},
             'organizer': {'required':False}
         }
 
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and request.method not in SAFE_METHODS:
+            # writes validate and echo back the full event
+            names = self.default_fields + (['attendees'] if include_attendees(request) else [])
+        else:
+            names = self.field_names(request)
+        return {name: field for name, field in fields.items() if name in names}
+
+    @classmethod
+    def field_names(cls, request):
+        """
+        The fields to render for ``request``; raises ``ValidationError`` for
+        names the serializer doesn't have.
+        """
+        fields, omit = split_param(request, 'fields'), split_param(request, 'omit')
+        unknown = [name for name in fields + omit if name not in cls.Meta.fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': [f'Unknown field: {name}' for name in unknown]})
+        names = fields or [name for name in cls.default_fields if name not in omit]
+        if include_attendees(request) and 'attendees' not in names:
+            names.append('attendees')
+        return names
+
+    @classmethod
+    def columns(cls, names):
+        """
+        Model fields to load for rendering ``names``, for ``QuerySet.only()``.
+        """
+        columns = {'id'}
+        for name in names:
+            columns.update(cls.field_columns.get(name, (name,)))
+        return sorted(columns)
+
+    def validate_capacity(self, value):
+        if value is not None and self.instance is not None and value < self.instance.attendee_count:
+            raise serializers.ValidationError("Capacity cannot be lower than the number of attendees")
+        return value
+
     def validate_date(self, value):
         if value < timezone.now():
             raise serializers.ValidationError("Event date cannot be in the past")
         return value
+
+    def validate_recurrence(self, value):
+        if not value:
+            return ''
+        try:
+            # stored in a canonical form
+            return str(RecurrenceRule.parse(value))
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate(self, attrs):
+        date = attrs.get('date', getattr(self.instance, 'date', None))
+        recurrence = attrs.get('recurrence', getattr(self.instance, 'recurrence', ''))
+        if recurrence and date is not None:
+            try:
+                RecurrenceRule.parse(recurrence).check_start(date)
+            except ValueError as e:
+                raise serializers.ValidationError({'recurrence': [str(e)]})
+        instance = self.instance
+        if (instance is not None and instance.recurrence
+                and (date != instance.date or recurrence != instance.recurrence)
+                and instance.occurrences.exists()):
+            # stored occurrences are keyed by where the rule put them
+            raise serializers.ValidationError(
+                {'recurrence': ['The schedule of a series with registrations or changed occurrences is fixed']})
+        if instance is not None and bool(recurrence) != bool(instance.recurrence) and instance.attendees.exists():
+            # a one-off event's registrations have no occurrence, and a series' all have one
+            raise serializers.ValidationError(
+                {'recurrence': ['An event with registrations cannot start or stop recurring']})
+        return attrs
+
+
+class EventListSerializer(EventSerializer):
+    """
+    Compact list representation: the description is left to the detail view.
+    """
+    default_fields = ['id', 'title', 'date', 'location', 'organizer', 'capacity', 'attendee_count',
+                      'seats_remaining']
+
+
+class OccurrenceSerializer(serializers.ModelSerializer):
+    """
+    An occurrence of an event, identified by its ``start``; organizers can
+    move it (``date``) or cancel it.
+    """
+    seats_remaining = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Occurrence
+        fields = ['start', 'date', 'cancelled', 'attendee_count', 'seats_remaining']
+        read_only_fields = ['start']
+
+    def validate_date(self, value):
+        if value < timezone.now():
+            raise serializers.ValidationError("Occurrence date cannot be in the past")
+        return value
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import instrumentation
+from .cache import event_cache, touch_events_deleted
+from .models import Event
+from .search import get_search_backend
+
+Attendance = Event.attendees.through
+
+# sent by api.registration, which writes attendee rows directly and so
+# bypasses m2m_changed
+attendance_changed = Signal()
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrumentation.install(connection)
+
+
+def invalidate_events(event_ids, using):
+    """
+    Drop cached payloads now, so the writing request sees its own change,
+    and again on commit, so a reader that raced the transaction can't keep
+    serving what it read before the commit.
+    """
+    event_ids = list(event_ids)
+    for pk in event_ids:
+        event_cache.invalidate(pk)
+    transaction.on_commit(lambda: [event_cache.invalidate(pk) for pk in event_ids], using=using)
+
+
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, using, **kwargs):
+    # the in-process index outlives the transaction, so it only takes
+    # committed rows; a rolled-back save must leave no postings behind
+    transaction.on_commit(lambda: get_search_backend(using).index(instance), using=using)
+    invalidate_events([instance.pk], using)
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: get_search_backend(using).remove(pk), using=using)
+    invalidate_events([pk], using)
+    touch_events_deleted()
+    transaction.on_commit(touch_events_deleted, using=using)
+
+
+@receiver(attendance_changed, sender=Event)
+def attendance_saved(sender, event_id, using, **kwargs):
+    invalidate_events([event_id], using)
+
+
+def recount_attendees(events):
+    # a recurring event's registrations are counted per occurrence instead
+    count = (Attendance.objects.filter(event=OuterRef('pk'), occurrence__isnull=True).order_by()
+             .values('event').annotate(count=Count('*')).values('count'))
+    events.update(attendee_count=Coalesce(Subquery(count), 0), updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Attendance)
+def count_attendees(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Keep attendee_count right when attendees are changed through the ORM
+    (admin, shell, fixtures) rather than api.registration.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_event_ids = list(instance.event_set.using(using).values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        event_ids = [instance.pk]
+    elif action == 'post_clear':
+        event_ids = instance.__dict__.pop('_cleared_event_ids', [])
+    else:
+        event_ids = pk_set
+    recount_attendees(Event.objects.using(using).filter(pk__in=event_ids))
+    invalidate_events(event_ids, using)
@@ -0,0 +1,162 @@
+"""
+Statistics for an organizer's dashboard, computed by the database in two
+queries however many events the organizer has:
+
+- a page of their events with each one's attendees and fill rate, and,
+  as window functions over all of them, the totals, so the page and the
+  totals come from one scan of ``event_organizer_date_idx``;
+- registrations per day for their events over the last
+  ORGANIZER_STATS_DAYS days, from ``Attendance.registered_at``; cancelled
+  registrations are gone and don't count.
+
+A series' attendees are its occurrences' registrations, summed from the
+``Occurrence`` rows, and it is upcoming while it is still running. Its
+capacity applies to each occurrence, so it has no fill rate and is left
+out of the capacity totals.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import (BooleanField, Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum,
+                              Value, When, Window)
+from django.db.models.functions import Cast, Coalesce, NullIf, TruncDate
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+
+from .models import RECURRING, Attendance, Event, Occurrence, on_or_after
+
+# the dashboard's sort options; unlimited events and series have no fill rate and go last either way
+ORDERINGS = {
+    'date': (F('date').asc(), F('id').asc()),
+    '-date': (F('date').desc(), F('id').desc()),
+    'attendees': (F('registrations').asc(), F('id').asc()),
+    '-attendees': (F('registrations').desc(), F('id').desc()),
+    'fill_rate': (F('fill_rate').asc(nulls_last=True), F('id').asc()),
+    '-fill_rate': (F('fill_rate').desc(nulls_last=True), F('id').desc()),
+}
+EVENT_FIELDS = ('id', 'title', 'date', 'location', 'capacity', 'registrations', 'fill_rate', 'is_upcoming')
+
+
+class StatsParamsSerializer(serializers.Serializer):
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), default='date')
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+    def validate_offset(self, value):
+        # deeper OFFSETs scan every skipped row, and past 2**63 the database refuses them
+        max_offset = getattr(settings, 'ORGANIZER_STATS_MAX_OFFSET', 100000)
+        if value > max_offset:
+            raise serializers.ValidationError(f'Ensure this value is less than or equal to {max_offset}.')
+        return value
+
+
+def ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def event_page(organizer_id, now, ordering='date', offset=0, limit=50):
+    """
+    One page of the organizer's events, as dicts, the totals over all of
+    them, and whether there are more; the totals are None if the page is
+    empty, as then no row carried them.
+    """
+    # only a series has Occurrence rows, and only a series runs the subquery
+    occurrence_registrations = Occurrence.objects.filter(event=OuterRef('pk')).values('event').annotate(
+        total=Sum('attendee_count')).values('total')
+    registrations = Case(When(RECURRING, then=Coalesce(Subquery(occurrence_registrations), 0)),
+                         default=F('attendee_count'), output_field=IntegerField())
+    capped = Q(capacity__isnull=False) & ~RECURRING
+    rows = list(
+        Event.objects.filter(organizer_id=organizer_id)
+        .annotate(
+            registrations=registrations,
+            is_upcoming=Case(When(on_or_after(now), then=True), default=False, output_field=BooleanField()),
+            fill_rate=Case(When(capped, then=Cast('attendee_count', FloatField())
+                                / Cast(NullIf('capacity', Value(0)), FloatField())),
+                           output_field=FloatField()),
+            total_events=Window(Count('id')),
+            total_upcoming=Window(Sum(Case(When(on_or_after(now), then=1), default=0,
+                                           output_field=IntegerField()))),
+            total_attendees=Window(Sum('registrations')),
+            capped_attendees=Window(Sum(Case(When(capped, then='attendee_count'), default=0,
+                                                  output_field=IntegerField()))),
+            total_capacity=Window(Sum(Case(When(capped, then='capacity'), output_field=IntegerField()))),
+        )
+        .order_by(*ORDERINGS[ordering])
+        .values(*EVENT_FIELDS, 'total_events', 'total_upcoming', 'total_attendees', 'capped_attendees',
+                'total_capacity')
+        [offset:offset + limit + 1])
+    if not rows:
+        return [], None, False
+    first = rows[0]
+    totals = {
+        'events': first['total_events'],
+        'upcoming': first['total_upcoming'],
+        'past': first['total_events'] - first['total_upcoming'],
+        'attendees': first['total_attendees'],
+        'capacity': first['total_capacity'],
+        # over the one-off events that have a capacity
+        'fill_rate': ratio(first['capped_attendees'], first['total_capacity']),
+    }
+    events = [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'date': row['date'],
+            'location': row['location'],
+            'upcoming': row['is_upcoming'],
+            'capacity': row['capacity'],
+            'attendees': row['registrations'],
+            'fill_rate': None if row['fill_rate'] is None else round(row['fill_rate'], 4),
+        }
+        for row in rows[:limit]
+    ]
+    return events, totals, len(rows) > limit
+
+
+def signups_per_day(organizer_id, now, days):
+    """
+    ``[{'date': ..., 'signups': n}]`` for the days with registrations among
+    the last ``days``, oldest first.
+    """
+    return list(
+        Attendance.objects.filter(event__organizer_id=organizer_id, registered_at__gte=now - timedelta(days=days))
+        .annotate(date=TruncDate('registered_at'))
+        .values('date')
+        .annotate(signups=Count('id'))
+        .order_by('date'))
+
+
+def organizer_stats(organizer_id, ordering='date', offset=0, limit=50):
+    """
+    The dashboard for ``organizer_id``; returns ``(data, has_more)``, where
+    ``has_more`` tells whether there are events past this page.
+    """
+    now = timezone.now()
+    events, totals, has_more = event_page(organizer_id, now, ordering, offset, limit)
+    if totals is None:
+        if offset:
+            raise NotFound('Invalid page')
+        totals = {'events': 0, 'upcoming': 0, 'past': 0, 'attendees': 0, 'capacity': None, 'fill_rate': None}
+    days = getattr(settings, 'ORGANIZER_STATS_DAYS', 30)
+    data = {
+        'totals': totals,
+        'signups_per_day': signups_per_day(organizer_id, now, days),
+        'events': events,
+    }
+    return data, has_more
+
+
+def cached_organizer_stats(organizer_id, ordering='date', offset=0, limit=50):
+    """
+    ``organizer_stats`` kept for ORGANIZER_STATS_CACHE_TIMEOUT seconds; it
+    isn't invalidated, so a dashboard lags behind its events by as much.
+    """
+    cache = caches[getattr(settings, 'EVENTS_CACHE_ALIAS', 'default')]
+    key = f'organizer-stats:{organizer_id}:{ordering}:{offset}:{limit}'
+    result = cache.get(key)
+    if result is None:
+        result = organizer_stats(organizer_id, ordering, offset, limit)
+        cache.set(key, result, timeout=getattr(settings, 'ORGANIZER_STATS_CACHE_TIMEOUT', 30))
+    return result
@@ -0,0 +1,84 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.utils import timezone
+
+from authorization.models import CustomUser
+from .models import Event
+
+WORDS = ['music', 'art', 'tech', 'yoga', 'cooking', 'festival', 'conference', 'workshop',
+         'meetup', 'exhibition', 'concert', 'bootcamp', 'retreat', 'summit', 'class', 'party']
+LOCATIONS = ['Kyiv', 'Lviv', 'Odesa', 'Kharkiv', 'Dnipro', 'Central Park', 'Art Gallery',
+             'Convention Center', 'Culinary School', 'Retreat Center', 'Fitness Center']
+
+
+def make_organizers(count, prefix='organizer', batch_size=5000):
+    """
+    Bulk-create ``count`` users with an unusable password; returns their ids.
+    """
+    for offset in range(0, count, batch_size):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{prefix}{i}@example.com', email=f'{prefix}{i}@example.com', password='!')
+            for i in range(offset, min(offset + batch_size, count))])
+    return list(CustomUser.objects.filter(email__startswith=prefix).values_list('id', flat=True))
+
+
+def make_events(count, organizer_ids, start=None, batch_size=5000, seed=0, capacity_share=0):
+    """
+    Bulk-insert ``count`` synthetic events spread over the year after
+    ``start``; a ``capacity_share`` of them get a capacity of 10 to 500.
+    """
+    rng = random.Random(seed)
+    start = start or timezone.now()
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(batch_size, count - created)):
+            title = ' '.join(rng.sample(WORDS, 3)).title()
+            event = Event(title=title,
+                          description=f'{title} {" ".join(rng.choices(WORDS, k=12))}',
+                          date=start + timedelta(minutes=rng.randrange(525600)),
+                          location=rng.choice(LOCATIONS),
+                          organizer_id=rng.choice(organizer_ids))
+            # only draw when asked to, so existing seeds keep producing the same events
+            if capacity_share and rng.random() < capacity_share:
+                event.capacity = rng.randint(10, 500)
+            batch.append(event)
+        Event.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def make_attendance(events, user_ids, count, skew=1.1, batch_size=10000, seed=0, signup_days=0):
+    """
+    Bulk-insert about ``count`` registrations of random users for
+    ``events``, a list of ``(id, organizer_id, capacity)``. Event
+    popularity follows a Zipf distribution with exponent ``skew``, so a few
+    events draw most of the attendees, as in production. Organizers don't
+    attend their own events and capacities are respected; attendee_count
+    is left for the caller to recount. With ``signup_days``, registration
+    times are spread over that many days before now rather than all now.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    events = list(events)
+    rng.shuffle(events)
+    cum_weights = list(accumulate(1 / rank ** skew for rank in range(1, len(events) + 1)))
+    taken = {}
+    Attendance = Event.attendees.through
+    for offset in range(0, count, batch_size):
+        batch = []
+        for event_id, organizer_id, capacity in rng.choices(events, cum_weights=cum_weights,
+                                                             k=min(batch_size, count - offset)):
+            user_id = rng.choice(user_ids)
+            if user_id == organizer_id or (capacity is not None and taken.get(event_id, 0) >= capacity):
+                continue
+            taken[event_id] = taken.get(event_id, 0) + 1
+            attendance = Attendance(event_id=event_id, customuser_id=user_id, registered_at=now)
+            # as with capacities in make_events, only draw when asked to
+            if signup_days:
+                attendance.registered_at = now - timedelta(seconds=rng.randrange(signup_days * 86400))
+            batch.append(attendance)
+        # a user drawn twice for the same event is a duplicate row, skipped by the unique constraint
+        Attendance.objects.bulk_create(batch, ignore_conflicts=True)
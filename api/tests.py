@@ -1,12 +1,56 @@
-from datetime import datetime
+import asyncio
+import csv
+import json
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from importlib import import_module
+from io import StringIO
+from contextlib import ExitStack
+from unittest import mock
+from urllib.parse import urlencode
 
-from django.test import TestCase, Client, RequestFactory
-from django.urls import reverse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.models import Count, F
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.timezone import now as timezone_now
 from rest_framework.test import force_authenticate, APITestCase
 from rest_framework import status
-from authorization.models import CustomUser
-from .models import Event
-from .views import EventListCreateAPIView
+from authorization.models import AuthToken, CustomUser
+from events.settings import database_config
+from . import metrics
+from .async_views import AsyncEventListView
+from .cache import event_cache, hits as cache_hits, misses as cache_misses
+from .checks import check_connections, pool_errors
+from .importing import import_events
+from .instrumentation import RequestTiming
+from .models import Attendance, Event, Occurrence, OutboxEmail
+from .outbox import drain, enqueue_email, retry_delay
+from .recurrence import RecurrenceRule, _Series
+from .registration import RegistrationError, register_attendee
+from .replicas import ReplicaPool
+from .search import InvertedIndex, get_search_backend
+from .serializers import EventListSerializer
+from .throttling import BucketBusy, EndpointThrottle, TokenBucketThrottle, take_token
+from .views import EventListCreateAPIView, EventRegistrationAPIView
 
 
 class LoginTestCase(TestCase):
@@ -80,18 +124,20 @@ class SearchTestCase(TestCase):
         self.factory = RequestFactory()
         self.user = CustomUser.objects.create_user(email='testuser@example.com',
                                                    password='testpassword')
-        self.event1 = Event.objects.create(title='Event 1', description='Description 1',
-                                           date=datetime(2024, 5, 5),
-                                           location="Kyiv",
-                                           organizer=self.user)
-        self.event2 = Event.objects.create(title='Event 2', description='Description 2',
-                                           date=datetime(2024, 5, 5),
-                                           location="Kyiv",
-                                           organizer=self.user)
-        self.event3 = Event.objects.create(title='Another Event', description='Description 3',
-                                           date=datetime(2024, 5, 5),
-                                           location="Kyiv",
-                                           organizer=self.user)
+        # events are indexed on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event1 = Event.objects.create(title='Event 1', description='Description 1',
+                                               date=datetime(2024, 5, 5),
+                                               location="Kyiv",
+                                               organizer=self.user)
+            self.event2 = Event.objects.create(title='Event 2', description='Description 2',
+                                               date=datetime(2024, 5, 5),
+                                               location="Kyiv",
+                                               organizer=self.user)
+            self.event3 = Event.objects.create(title='Another Event', description='Description 3',
+                                               date=datetime(2024, 5, 5),
+                                               location="Kyiv",
+                                               organizer=self.user)
 
     def test_search_by_title(self):
         view = EventListCreateAPIView.as_view()
@@ -119,6 +165,80 @@ class SearchTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 0)
 
+    def test_search_by_description(self):
+        view = EventListCreateAPIView.as_view()
+        request = self.factory.get('/events/', {'search': 'description 3'})
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assertEqual([event['title'] for event in response.data], ['Another Event'])
+
+    def test_search_matches_last_term_as_prefix(self):
+        view = EventListCreateAPIView.as_view()
+        request = self.factory.get('/events/', {'search': 'anoth'})
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assertEqual([event['title'] for event in response.data], ['Another Event'])
+
+    def test_search_ranks_title_matches_first(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            match = Event.objects.create(title='Kyiv Marathon', description='Run', date=datetime(2024, 5, 5),
+                                         location="Lviv", organizer=self.user)
+        view = EventListCreateAPIView.as_view()
+        request = self.factory.get('/events/', {'search': 'kyiv'})
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(response.data[0]['id'], match.pk)
+
+    def test_search_follows_updates_and_deletes(self):
+        view = EventListCreateAPIView.as_view()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event1.title = 'Renamed'
+            self.event1.save()
+            self.event2.delete()
+        request = self.factory.get('/events/', {'search': 'renamed'})
+        force_authenticate(request, user=self.user)
+        self.assertEqual([event['id'] for event in view(request).data], [self.event1.pk])
+        request = self.factory.get('/events/', {'search': 'event'})
+        force_authenticate(request, user=self.user)
+        self.assertEqual([event['id'] for event in view(request).data], [self.event3.pk])
+
+    def test_rolled_back_save_is_not_indexed(self):
+        view = EventListCreateAPIView.as_view()
+        # build the in-process index first, so only the signal could add to it
+        request = self.factory.get('/events/', {'search': 'event'})
+        force_authenticate(request, user=self.user)
+        view(request)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Event.objects.create(title='Ghost', description='', date=datetime(2024, 5, 5),
+                                     location="Kyiv", organizer=self.user)
+                raise IntegrityError
+        self.assertEqual(get_search_backend().inverted_index.search('ghost'), {})
+
+
+class InvertedIndexTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com',
+                                                   password='testpassword')
+        self.event = Event.objects.create(title='Jazz Night', description='Live jazz and blues',
+                                          date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                          location="Odesa", organizer=self.user)
+        self.index = InvertedIndex()
+        self.index.build()
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(set(self.index.search('jazz odesa')), {self.event.pk})
+        self.assertEqual(self.index.search('jazz kyiv'), {})
+
+    def test_weights_fields(self):
+        # title (4) + description (1)
+        self.assertEqual(self.index.search('jazz'), {self.event.pk: 5})
+
+    def test_remove(self):
+        self.index.remove(self.event.pk)
+        self.assertEqual(self.index.search('jazz'), {})
+
 
 class EventAPITestCase(APITestCase):
     def setUp(self):
@@ -196,4 +316,1811 @@ class EventAPITestCase(APITestCase):
     def test_delete_event(self):
         url = reverse('event-detail', kwargs={'pk': self.event.pk})
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com',
+                                                   password='testpassword')
+        # two events share every date so the id tie-breaker is exercised
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(6):
+                Event.objects.create(title=f'Event {i}', description='Description',
+                                     date=datetime(2030, 5, 1 + i // 2, tzinfo=timezone.utc),
+                                     location="Kyiv", organizer=self.user)
+        self.client.force_authenticate(self.user)
+
+    def follow(self, response, rel):
+        for part in response.get('Link', '').split(','):
+            if f'rel="{rel}"' in part:
+                return part.split(';')[0].strip()[1:-1]
+        return None
+
+    def test_pages_walk_whole_table_in_order(self):
+        expected = list(Event.objects.order_by('date', 'id').values_list('title', flat=True))
+        titles = []
+        url = reverse('event-list') + '?page_size=4'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles.extend(item['title'] for item in response.data)
+            url = self.follow(response, 'next')
+        self.assertEqual(titles, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get(reverse('event-list'), {'page_size': 2})
+        second = self.client.get(self.follow(first, 'next'))
+        self.assertIsNone(self.follow(first, 'prev'))
+        back = self.client.get(self.follow(second, 'prev'))
+        self.assertEqual([e['id'] for e in back.data], [e['id'] for e in first.data])
+
+    def test_search_results_paginate(self):
+        Event.objects.filter(title='Event 5').update(title='Kyiv Event 5')
+        with self.captureOnCommitCallbacks(execute=True):
+            Event.objects.get(title='Kyiv Event 5').save()
+        ids = []
+        url = reverse('event-list') + '?search=kyiv&page_size=4'
+        while url:
+            response = self.client.get(url)
+            ids.extend(item['id'] for item in response.data)
+            url = self.follow(response, 'next')
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(len(set(ids)), 6)
+        self.assertEqual(ids[0], Event.objects.get(title='Kyiv Event 5').pk)
+
+    def test_page_size_is_capped(self):
+        with self.settings(EVENTS_MAX_PAGE_SIZE=3):
+            response = self.client.get(reverse('event-list'), {'page_size': 100})
+        self.assertEqual(len(response.data), 3)
+
+    def cursor(self, payload):
+        return urlsafe_b64encode(json.dumps(payload).encode()).decode('ascii')
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('event-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_cursor(self):
+        for params in [{'cursor': self.cursor({'p': [None, 1], 'r': 0})},
+                       {'cursor': self.cursor({'p': ['2030-05-01T00:00:00Z', None], 'r': 1})},
+                       {'cursor': self.cursor({'p': ['someday', 1], 'r': 0})},
+                       {'cursor': self.cursor({'p': [None, 1], 'r': 0}), 'ordering': '-attendee_count'},
+                       {'cursor': self.cursor({'p': ['x', 1], 'r': 0}), 'ordering': '-attendee_count'},
+                       # the search rank is an annotation, not a model field
+                       {'cursor': self.cursor({'p': ['x', '2030-05-01T00:00:00Z', 1], 'r': 0}), 'search': 'kyiv'},
+                       {'cursor': self.cursor({'p': [None, '2030-05-01T00:00:00Z', 1], 'r': 0}), 'search': 'kyiv'}]:
+            with self.subTest(params=params):
+                response = self.client.get(reverse('event-list'), params)
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EventQueryCountTestCase(APITestCase):
+    """
+    Query budgets per request; these must not grow with the number of rows.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com',
+                                                   password='testpassword')
+        self.attendees = [CustomUser.objects.create_user(email=f'attendee{i}@example.com',
+                                                         password='testpassword')
+                          for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def create_events(self, count):
+        for i in range(count):
+            event = Event.objects.create(title=f'Event {i}', description='Description',
+                                         date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                         location="Kyiv", organizer=self.user)
+            event.attendees.add(*self.attendees)
+        return event
+
+    # list requests also run one aggregate for their ETag
+
+    def test_list_query_count_is_constant(self):
+        self.create_events(3)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('event-list'))
+        self.create_events(30)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('event-list'))
+        self.assertNotIn('attendees', response.data[0])
+        self.assertEqual(response.data[0]['attendee_count'], 3)
+
+    def test_list_with_attendees_query_count_is_constant(self):
+        self.create_events(3)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('event-list'), {'include': 'attendees'})
+        self.create_events(30)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('event-list'), {'include': 'attendees'})
+        self.assertEqual(len(response.data[0]['attendees']), 3)
+
+    def test_search_query_count_is_constant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_events(30)
+        # the first search may build the in-process index on SQLite
+        self.client.get(reverse('event-list'), {'search': 'Kyiv'})
+        with self.assertNumQueries(3):
+            self.client.get(reverse('event-list'), {'search': 'Kyiv', 'include': 'attendees'})
+
+    def test_detail_query_count(self):
+        event = self.create_events(1)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('event-detail', kwargs={'pk': event.pk}))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('event-detail', kwargs={'pk': event.pk}), {'include': 'attendees'})
+        self.assertEqual(sorted(response.data['attendees']), sorted(u.pk for u in self.attendees))
+
+    def test_register_query_count(self):
+        event = self.create_events(1)
+        self.client.force_authenticate(CustomUser.objects.create_user(email='new@example.com',
+                                                                      password='testpassword'))
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('event-detail', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP unavailable')
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('SMTP unreachable')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('sent without a connection')
+
+
+class OutboxTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com',
+                                                        password='testpassword')
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', username='testuser@example.com',
+                                                   password='testpassword')
+        self.event = Event.objects.create(title='Event 1', description='Description 1',
+                                          date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                          location="Kyiv", organizer=self.organizer)
+        self.client.force_authenticate(self.user)
+
+    def register(self):
+        return self.client.post(reverse('event-detail', kwargs={'pk': self.event.pk}))
+
+    def test_registration_queues_email_instead_of_sending(self):
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.recipient, 'testuser@example.com')
+        self.assertIn('Event 1', email.body)
+
+    def test_failed_registration_queues_nothing(self):
+        self.register()
+        self.register()
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_worker_sends_queued_emails(self):
+        self.register()
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['testuser@example.com'])
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.SENT)
+        self.assertIsNotNone(email.sent_at)
+
+    def test_worker_sends_in_batches(self):
+        enqueue_email('Subject', 'Body', 'Eventsapp@gmail.com', [f'user{i}@example.com' for i in range(5)])
+        self.assertEqual(drain(batch_size=2), (2, 0))
+        call_command('send_outbox', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+    @override_settings(EMAIL_BACKEND='api.tests.FailingEmailBackend', OUTBOX_MAX_ATTEMPTS=2,
+                       OUTBOX_RETRY_BASE_SECONDS=60)
+    def test_failures_back_off_then_give_up(self):
+        self.register()
+        self.assertEqual(drain(), (0, 1))
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.PENDING, 1))
+        self.assertIn('SMTP unavailable', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone_now() + timedelta(seconds=50))
+        # not due yet
+        self.assertEqual(drain(), (0, 0))
+        OutboxEmail.objects.update(next_attempt_at=timezone_now())
+        self.assertEqual(drain(), (0, 1))
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.FAILED)
+
+    @override_settings(EMAIL_BACKEND='api.tests.UnreachableEmailBackend', OUTBOX_RETRY_BASE_SECONDS=60)
+    def test_unreachable_server_backs_off_the_batch(self):
+        enqueue_email('Subject', 'Body', 'Eventsapp@gmail.com', ['a@example.com', 'b@example.com'])
+        self.assertEqual(drain(), (0, 2))
+        for email in OutboxEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), (OutboxEmail.PENDING, 1))
+            self.assertIn('SMTP unreachable', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone_now() + timedelta(seconds=50))
+        self.assertEqual(drain(), (0, 0))
+
+    def test_retry_delay_is_exponential_and_capped(self):
+        with self.settings(OUTBOX_RETRY_BASE_SECONDS=10, OUTBOX_RETRY_MAX_SECONDS=50):
+            self.assertEqual([retry_delay(n).seconds for n in (1, 2, 3, 4)], [10, 20, 40, 50])
+
+
+class RegistrationTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com',
+                                                        password='testpassword')
+        self.users = [CustomUser.objects.create_user(email=f'user{i}@example.com', password='testpassword')
+                      for i in range(3)]
+        self.event = Event.objects.create(title='Event 1', description='Description 1',
+                                          date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                          location="Kyiv", organizer=self.organizer, capacity=2)
+
+    def register(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('event-detail', kwargs={'pk': self.event.pk}))
+
+    def test_capacity_is_enforced(self):
+        self.assertEqual(self.register(self.users[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.register(self.users[1]).status_code, status.HTTP_201_CREATED)
+        response = self.register(self.users[2])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], 'This event is full')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 2)
+        self.assertEqual(self.event.attendees.count(), 2)
+
+    def test_duplicate_registration_gives_seat_back(self):
+        self.register(self.users[0])
+        response = self.register(self.users[0])
+        self.assertEqual(response.data['message'], 'You are already registered for this event')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+        self.assertEqual(self.register(self.users[1]).status_code, status.HTTP_201_CREATED)
+
+    def test_unlimited_capacity(self):
+        self.event.capacity = None
+        self.event.save()
+        for user in self.users:
+            self.assertEqual(self.register(user).status_code, status.HTTP_201_CREATED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 3)
+
+    def test_capacity_cannot_drop_below_attendees(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        self.client.force_authenticate(self.organizer)
+        response = self.client.patch(reverse('event-detail', kwargs={'pk': self.event.pk}), {'capacity': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seats_are_exposed(self):
+        self.register(self.users[0])
+        self.client.force_authenticate(self.users[0])
+        response = self.client.get(reverse('event-detail', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.data['attendee_count'], 1)
+        self.assertEqual(response.data['seats_remaining'], 1)
+        self.assertNotIn('attendees', response.data)
+
+    def test_unregister_gives_seat_back(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        url = reverse('event-registration', kwargs={'pk': self.event.pk})
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], 'You are not registered for this event')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+        self.assertEqual(self.register(self.users[2]).status_code, status.HTTP_201_CREATED)
+
+    def test_register_via_registration_endpoint(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.client.post(reverse('event-registration', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(self.users[0], self.event.attendees.all())
+
+    def test_orm_changes_keep_count(self):
+        self.event.attendees.add(*self.users)
+        self.event.attendees.add(self.users[0])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 3)
+        self.event.attendees.remove(self.users[0], self.organizer)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 2)
+        self.users[1].event_set.clear()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 1)
+        self.event.attendees.clear()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 0)
+
+
+def in_memory_sqlite():
+    return connection.vendor == 'sqlite' and connection.creation.is_in_memory_db(connection.settings_dict['NAME'])
+
+
+class ConcurrentRegistrationTestCase(TransactionTestCase):
+    """
+    Many threads registering at once must never overbook an event or
+    create duplicate attendee rows.
+    """
+    threads = 16
+    capacity = 50
+
+    def setUp(self):
+        if in_memory_sqlite():
+            self.skipTest('threads need a shared database; set TEST_DATABASE_NAME to a file')
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword')
+        CustomUser.objects.bulk_create([CustomUser(email=f'user{i}@example.com', username=f'user{i}@example.com')
+                                        for i in range(200)])
+        self.users = list(CustomUser.objects.exclude(pk=self.organizer.pk))
+        self.event = Event.objects.create(title='Popular Event', description='Description',
+                                          date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                          location="Kyiv", organizer=self.organizer, capacity=self.capacity)
+
+    def run_concurrently(self, users):
+        outcomes = []
+
+        def attempt(user):
+            try:
+                register_attendee(self.event, user)
+                return 'registered'
+            except RegistrationError as e:
+                return type(e).__name__
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            outcomes.extend(executor.map(attempt, users))
+        return outcomes
+
+    def test_no_overbooking(self):
+        outcomes = self.run_concurrently(self.users)
+        self.event.refresh_from_db()
+        self.assertEqual(outcomes.count('registered'), self.capacity)
+        self.assertEqual(outcomes.count('EventFull'), len(self.users) - self.capacity)
+        self.assertEqual(self.event.attendee_count, self.capacity)
+        self.assertEqual(self.event.attendees.count(), self.capacity)
+
+    def test_no_duplicates(self):
+        outcomes = self.run_concurrently(self.users[:10] * 4)
+        self.event.refresh_from_db()
+        self.assertEqual(outcomes.count('registered'), 10)
+        self.assertEqual(outcomes.count('AlreadyRegistered'), 30)
+        self.assertEqual(self.event.attendee_count, 10)
+        self.assertEqual(self.event.attendees.count(), 10)
+
+
+class EventDetailCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword')
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.event = Event.objects.create(title='Event 1', description='Description 1',
+                                          date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                          location="Kyiv", organizer=self.organizer)
+        self.url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        self.client.force_authenticate(self.organizer)
+
+    def test_second_read_is_served_from_cache(self):
+        misses, hits = cache_misses.value(), cache_hits.value()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['title'], 'Event 1')
+        self.assertEqual((cache_misses.value() - misses, cache_hits.value() - hits), (1, 1))
+
+    def test_variants_are_cached_separately(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, {'include': 'attendees'})
+        self.assertEqual(response.data['attendees'], [])
+
+    def test_update_invalidates(self):
+        self.client.get(self.url)
+        self.client.patch(self.url, {'title': 'Renamed'})
+        self.assertEqual(self.client.get(self.url).data['title'], 'Renamed')
+
+    def test_delete_invalidates(self):
+        self.client.get(self.url)
+        self.client.delete(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_registration_invalidates(self):
+        self.client.get(self.url, {'include': 'attendees'})
+        self.client.force_authenticate(self.user)
+        registration_url = reverse('event-registration', kwargs={'pk': self.event.pk})
+        self.client.post(registration_url)
+        response = self.client.get(self.url, {'include': 'attendees'})
+        self.assertEqual((response.data['attendee_count'], response.data['attendees']), (1, [self.user.pk]))
+        self.client.delete(registration_url)
+        response = self.client.get(self.url, {'include': 'attendees'})
+        self.assertEqual((response.data['attendee_count'], response.data['attendees']), (0, []))
+
+    def test_orm_attendee_changes_invalidate(self):
+        self.client.get(self.url)
+        self.event.attendees.add(self.user)
+        self.assertEqual(self.client.get(self.url).data['attendee_count'], 1)
+
+    def test_stale_write_after_invalidation_is_ignored(self):
+        version, _ = event_cache.get(self.event.pk, 'default')
+        event_cache.invalidate(self.event.pk)
+        event_cache.set(self.event.pk, 'default', version, {'title': 'stale'})
+        self.assertIsNone(event_cache.get(self.event.pk, 'default')[1])
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.url)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'# TYPE events_detail_cache_hits_total counter', response.content)
+        self.assertIn(b'events_detail_cache_misses_total ', response.content)
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.event = Event.objects.create(title='Event 1', description='Description 1',
+                                          date=datetime(2030, 5, 5, tzinfo=timezone.utc),
+                                          location="Kyiv", organizer=self.user)
+        self.other = Event.objects.create(title='Event 2', description='Description 2',
+                                          date=datetime(2030, 5, 6, tzinfo=timezone.utc),
+                                          location="Kyiv", organizer=self.user)
+        self.detail_url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        self.client.force_authenticate(self.user)
+
+    def test_detail_if_none_match(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # and again from the cached validators, without touching the database
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_changes_etag(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'title': 'Renamed'})
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_follows_registration(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        register_attendee(self.event, CustomUser.objects.create_user(email='new@example.com', password='x'))
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_variants_have_different_etags(self):
+        plain = self.client.get(self.detail_url)['ETag']
+        self.assertNotEqual(plain, self.client.get(self.detail_url, {'include': 'attendees'})['ETag'])
+
+    def test_list_if_none_match(self):
+        url = reverse('event-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_upcoming_list_has_no_validators(self):
+        # an event passing into the past changes the list without any write
+        url = reverse('event-list')
+        response = self.client.get(url, {'upcoming': 'true'})
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(len(response.data), 2)
+        with mock.patch('api.models.timezone.now', return_value=datetime(2030, 5, 5, 12, tzinfo=timezone.utc)):
+            response = self.client.get(url, {'upcoming': 'true'})
+        self.assertEqual([event['title'] for event in response.data], ['Event 2'])
+
+    def test_list_etag_depends_on_query(self):
+        url = reverse('event-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, {'search': 'Event'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_changes_on_update_and_delete(self):
+        url = reverse('event-list')
+        etag = self.client.get(url)['ETag']
+        self.other.title = 'Renamed'
+        self.other.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.client.delete(reverse('event-detail', kwargs={'pk': self.other.pk}))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+def explain(sql_or_queryset):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # tiny test tables would otherwise always be scanned sequentially
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        if not isinstance(sql_or_queryset, str):
+            return sql_or_queryset.explain()
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql_or_queryset}')
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class QueryPlanTestCase(APITestCase):
+    """
+    Runs EXPLAIN on the SQL the API actually issues and fails on any full
+    scan of the event tables.
+    """
+    tables = ('api_event', 'api_event_attendees')
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.attendee = CustomUser.objects.create_user(email='attendee@example.com', password='testpassword')
+        for i in range(5):
+            event = Event.objects.create(title=f'Event {i}', description='Description',
+                                         date=datetime(2030, 5, 1 + i, tzinfo=timezone.utc),
+                                         location="Kyiv", organizer=self.user, capacity=10)
+            event.attendees.add(self.attendee)
+        self.event = event
+        self.client.force_authenticate(self.user)
+
+    def full_scans(self, sql_or_queryset):
+        plan = explain(sql_or_queryset)
+        if connection.vendor == 'postgresql':
+            pattern = r'Seq Scan on (%s)\b' % '|'.join(self.tables)
+        else:
+            pattern = r'SCAN "?(%s)"?(?! USING)\b' % '|'.join(self.tables)
+        return re.findall(pattern, plan), plan
+
+    def assertIndexed(self, queries):
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            checked += 1
+            scans, plan = self.full_scans(sql)
+            self.assertFalse(scans, f'full scan of {scans} in\n{sql}\n{plan}')
+        self.assertTrue(checked)
+
+    def request_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        return context.captured_queries
+
+    def test_list_pages(self):
+        first = self.client.get(reverse('event-list'), {'page_size': 2})
+        next_url = first['Link'].split(';')[0].strip('<>')
+        self.assertIndexed(self.request_queries('get', reverse('event-list'), {'page_size': 2}))
+        self.assertIndexed(self.request_queries('get', next_url))
+
+    def test_list_with_attendees(self):
+        self.assertIndexed(self.request_queries('get', reverse('event-list'), {'include': 'attendees'}))
+
+    def test_search(self):
+        self.client.get(reverse('event-list'), {'search': 'event'})
+        self.assertIndexed(self.request_queries('get', reverse('event-list'), {'search': 'event'}))
+
+    def test_detail(self):
+        url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        self.assertIndexed(self.request_queries('get', url, {'include': 'attendees'}))
+
+    def test_list_filters(self):
+        for params in [{'location': 'Kyiv'}, {'organizer': 'me'}, {'upcoming': 'true'},
+                       {'date_from': '2030-05-02', 'date_to': '2030-05-04'}, {'ordering': '-date'},
+                       {'ordering': '-attendee_count'}]:
+            with self.subTest(params=params):
+                self.assertIndexed(self.request_queries('get', reverse('event-list'), params))
+        self.client.force_authenticate(self.attendee)
+        self.assertIndexed(self.request_queries('get', reverse('event-list'), {'attending': 'me'}))
+
+    def test_registration(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(email='new@example.com', password='x'))
+        url = reverse('event-registration', kwargs={'pk': self.event.pk})
+        self.assertIndexed(self.request_queries('post', url))
+        self.assertIndexed(self.request_queries('delete', url))
+
+    def test_queryset_access_paths(self):
+        querysets = {
+            'event_location_date_idx': Event.objects.filter(location='Kyiv').order_by('date', 'id')[:50],
+            'event_organizer_date_idx': self.user.organizers.order_by('date', 'id')[:50],
+            'event_date_id_idx': Event.objects.upcoming().order_by('date', 'id')[:50],
+            'event_open_date_idx': Event.objects.with_seats().order_by('date', 'id')[:50],
+            'event_popularity_idx': Event.objects.order_by('-attendee_count', '-id')[:50],
+        }
+        for index, queryset in querysets.items():
+            with self.subTest(index=index):
+                scans, plan = self.full_scans(queryset)
+                self.assertFalse(scans, plan)
+                if connection.vendor == 'sqlite':
+                    self.assertIn(index, plan)
+
+
+class EventImportTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('event-bulk-create')
+
+    def rows(self, count, **overrides):
+        return [dict({'title': f'Imported {i}', 'description': 'Bulk', 'location': 'Lviv',
+                      'date': '2030-05-05T10:00:00Z'}, **overrides) for i in range(count)]
+
+    def test_json_array(self):
+        response = self.client.post(self.url, self.rows(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': 3, 'error_count': 0, 'errors': []})
+        self.assertEqual(Event.objects.filter(organizer=self.user, title__startswith='Imported').count(), 3)
+
+    def test_ndjson_stream_reports_row_errors(self):
+        lines = [json.dumps(row) for row in self.rows(2)]
+        lines.insert(1, json.dumps({'title': 'Old', 'location': 'Lviv', 'date': '2001-01-01T00:00:00Z'}))
+        lines.insert(2, 'not json')
+        body = '\n'.join(lines) + '\n'
+        response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('date', response.data['errors'][0]['errors'])
+
+    def test_ndjson_line_that_is_not_utf8_is_a_row_error(self):
+        lines = [json.dumps(row).encode() for row in self.rows(2)]
+        lines.insert(1, b'\xff\xfe')
+        body = b'\n'.join(lines) + b'\n'
+        response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+        self.assertIn('Invalid UTF-8', response.data['errors'][0]['errors']['non_field_errors'][0])
+
+    def test_body_must_be_an_array(self):
+        for body in ['{"title": "One"}', '5', 'null', '"x"']:
+            response = self.client.generic('POST', self.url, body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+            self.assertEqual(response.data, {'error': 'Expected a JSON array or NDJSON'})
+        self.assertFalse(Event.objects.exists())
+
+    def test_organizer_is_the_requesting_user(self):
+        other = CustomUser.objects.create_user(email='other@example.com', password='testpassword')
+        self.client.post(self.url, self.rows(1, organizer=other.pk), format='json')
+        self.assertEqual(Event.objects.get().organizer, self.user)
+
+    def test_all_rows_invalid(self):
+        response = self.client.post(self.url, [{'title': 'No date'}, 'nope'], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error_count'], 2)
+
+    def test_imported_events_are_searchable(self):
+        self.client.get(reverse('event-list'), {'search': 'imported'})
+        self.client.post(self.url, self.rows(2), format='json')
+        response = self.client.get(reverse('event-list'), {'search': 'imported'})
+        self.assertEqual(len(response.data), 2)
+
+    def test_chunks(self):
+        result = import_events(iter(self.rows(5) + [{'title': 'bad'}] + self.rows(4)), self.user, chunk_size=3)
+        self.assertEqual((result.created, result.error_count), (9, 1))
+        self.assertEqual(result.errors[0]['row'], 6)
+
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            writer = csv.DictWriter(f, ['title', 'description', 'date', 'location', 'capacity'])
+            writer.writeheader()
+            writer.writerow({'title': 'CSV 1', 'description': 'd', 'date': '2030-05-05 10:00', 'location': 'Kyiv',
+                             'capacity': ''})
+            writer.writerow({'title': 'CSV 2', 'description': 'd', 'date': '2030-05-06 10:00', 'location': 'Kyiv',
+                             'capacity': '20'})
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command('import_events', f.name, organizer='testuser@example.com', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 2 events', out.getvalue())
+        self.assertEqual(list(Event.objects.order_by('title').values_list('capacity', flat=True)), [None, 20])
+
+    def test_command_reads_ndjson(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write('\n'.join(json.dumps(row) for row in self.rows(3)))
+        self.addCleanup(os.remove, f.name)
+        err = StringIO()
+        call_command('import_events', f.name, organizer='testuser@example.com', stdout=StringIO(), stderr=err)
+        self.assertEqual(Event.objects.count(), 3)
+        self.assertEqual(err.getvalue(), '')
+
+
+class EventExportTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword',
+                                                        username='organizer')
+        self.event = Event.objects.create(title='Export, "quoted"', description='Line one\nline two',
+                                          date='2030-05-05T10:00:00Z', location='Kyiv', organizer=self.organizer,
+                                          capacity=10)
+        Event.objects.create(title='Second', description='', date='2030-06-05T10:00:00Z', location='Lviv',
+                             organizer=self.organizer)
+        self.attendees = CustomUser.objects.bulk_create([CustomUser(email=f'a{i}@example.com', username=f'a{i}')
+                                                         for i in range(3)])
+        self.event.attendees.add(*self.attendees)
+        self.client.force_authenticate(self.organizer)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_events_ndjson(self):
+        response = self.client.get(reverse('event-export', kwargs={'fmt': 'ndjson'}))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Export, "quoted"', 'Second'])
+        self.assertEqual(rows[0], {'id': self.event.pk, 'title': 'Export, "quoted"', 'description': 'Line one\nline two',
+                                   'date': '2030-05-05T10:00:00Z', 'location': 'Kyiv', 'organizer': self.organizer.pk,
+                                   'capacity': 10, 'attendee_count': 3})
+        self.assertIsNone(rows[1]['capacity'])
+
+    def test_events_csv(self):
+        response = self.client.get(reverse('event-export', kwargs={'fmt': 'csv'}), HTTP_ACCEPT='text/csv')
+        self.assertIn('attachment; filename="events.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual(rows[0]['title'], 'Export, "quoted"')
+        self.assertEqual(rows[0]['description'], 'Line one\nline two')
+        self.assertEqual(rows[1]['capacity'], '')
+
+    def test_attendees(self):
+        response = self.client.get(reverse('event-attendees-export', kwargs={'pk': self.event.pk, 'fmt': 'csv'}))
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual([row['email'] for row in rows], [user.email for user in self.attendees])
+
+    def test_attendees_organizer_only(self):
+        self.client.force_authenticate(self.attendees[0])
+        response = self.client.get(reverse('event-attendees-export', kwargs={'pk': self.event.pk, 'fmt': 'ndjson'}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse('event-export', kwargs={'fmt': 'csv'}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def peak_memory(self, attendee_count):
+        prefix = f'load{attendee_count}-'
+        CustomUser.objects.bulk_create([CustomUser(email=f'{prefix}{i}@example.com', username=f'{prefix}{i}')
+                                        for i in range(attendee_count)], batch_size=1000)
+        Event.attendees.through.objects.filter(event=self.event).delete()
+        Event.attendees.through.objects.bulk_create(
+            [Event.attendees.through(event_id=self.event.pk, customuser_id=user_id)
+             for user_id in CustomUser.objects.filter(email__startswith=prefix).values_list('id', flat=True)],
+            batch_size=1000)
+        response = self.client.get(reverse('event-attendees-export', kwargs={'pk': self.event.pk, 'fmt': 'ndjson'}))
+        tracemalloc.start()
+        try:
+            lines = sum(chunk.count(b'\n') for chunk in response.streaming_content)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, attendee_count)
+        return peak
+
+    def test_memory_does_not_grow_with_rows(self):
+        with mock.patch('api.export.CHUNK_SIZE', 100):
+            small = self.peak_memory(500)
+            large = self.peak_memory(10000)
+        # the whole export would be ~20x larger; streaming keeps one chunk in memory
+        self.assertLess(large, small * 2)
+
+
+@override_settings(ROOT_URLCONF='events.urls_async')
+class AsyncViewsTestCase(APITestCase):
+    def setUp(self):
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword')
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword',
+                                                   username='testuser@example.com')
+        self.events = [Event.objects.create(title=f'Event {i}', description='Description', location='Kyiv',
+                                            date=f'2030-0{i + 1}-01T10:00:00Z', organizer=self.organizer,
+                                            capacity=5)
+                       for i in range(3)]
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def test_routes_to_async_views(self):
+        match = resolve(reverse('event-list'))
+        self.assertIs(match.func.view_class, AsyncEventListView)
+
+    async def test_list_matches_sync_view(self):
+        response = await self.async_client.get(reverse('event-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with override_settings(ROOT_URLCONF='events.urls'):
+            expected = await sync_to_async(self.client.get)(reverse('event-list'), {'page_size': 2})
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'])
+        self.assertEqual(response['Link'], expected['Link'])
+
+        response = await self.async_client.get(reverse('event-list'), {'page_size': 2},
+                                               headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_list_search_and_invalid_cursor(self):
+        response = await self.async_client.get(reverse('event-list'), {'search': 'event'})
+        self.assertEqual(len(json.loads(response.content)), 3)
+        response = await self.async_client.get(reverse('event-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_detail(self):
+        url = reverse('event-detail', kwargs={'pk': self.events[0].pk})
+        response = await self.async_client.get(url, {'include': 'attendees'})
+        self.assertEqual(json.loads(response.content)['attendees'], [])
+        response = await self.async_client.get(url, {'include': 'attendees'},
+                                               headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = await self.async_client.get(reverse('event-detail', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_FLUSH_SECONDS=0)
+    async def test_cache_is_not_used_on_the_event_loop(self):
+        on_loop = []
+
+        def watch(name):
+            method = getattr(LocMemCache, name)
+
+            def watched(cache, *args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    pass
+                else:
+                    on_loop.append((name, args[0] if args else None))
+                return method(cache, *args, **kwargs)
+            return watched
+
+        detail_url = reverse('event-detail', kwargs={'pk': self.events[0].pk})
+        with ExitStack() as stack:
+            for name in ['get', 'set', 'add', 'incr', 'delete', 'get_many', 'set_many', 'delete_many']:
+                stack.enter_context(mock.patch.object(LocMemCache, name, watch(name)))
+            await self.async_client.get(reverse('event-list'))
+            # a miss, then a hit
+            await self.async_client.get(detail_url)
+            await self.async_client.get(detail_url)
+            await self.async_client.post(reverse('event-registration', kwargs={'pk': self.events[1].pk}))
+        self.assertEqual(on_loop, [])
+
+    async def test_register(self):
+        event = self.events[0]
+        response = await self.async_client.post(reverse('event-registration', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = await self.async_client.post(reverse('event-detail', kwargs={'pk': event.pk}))
+        self.assertEqual(json.loads(response.content), {'message': 'You are already registered for this event'})
+        await event.arefresh_from_db()
+        self.assertEqual(event.attendee_count, 1)
+        self.assertEqual(await OutboxEmail.objects.acount(), 1)
+
+    def test_register_enforces_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(reverse('event-registration', kwargs={'pk': self.events[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('CSRF Failed', response.json()['detail'])
+
+    async def test_requires_authentication(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_other_methods_use_sync_views(self):
+        event = self.events[0]
+        self.client.force_login(self.organizer)
+        response = self.client.patch(reverse('event-detail', kwargs={'pk': event.pk}), {'title': 'Renamed'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['title'], 'Renamed')
+        self.client.force_login(self.user)
+        self.client.post(reverse('event-registration', kwargs={'pk': event.pk}))
+        response = self.client.delete(reverse('event-registration', kwargs={'pk': event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+        self.event = Event.objects.create(title='Calendar Event', description='A very long description',
+                                          date='2030-05-05T10:00:00Z', location='Kyiv', organizer=self.user,
+                                          capacity=10)
+        self.event.attendees.add(self.user)
+
+    def get_list(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, [query['sql'] for query in queries.captured_queries]
+
+    def test_list_is_compact_by_default(self):
+        data, queries = self.get_list()
+        self.assertEqual(list(data[0]), ['id', 'title', 'date', 'location', 'organizer', 'capacity',
+                                         'attendee_count', 'seats_remaining'])
+        self.assertNotIn('"description"', queries[-1])
+
+    def test_detail_is_full(self):
+        response = self.client.get(reverse('event-detail', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.data['description'], 'A very long description')
+
+    def test_fields_narrow_the_select(self):
+        data, queries = self.get_list(fields='title,date')
+        self.assertEqual(data, [{'title': 'Calendar Event', 'date': '2030-05-05T10:00:00Z'}])
+        select = queries[-1].split(' FROM ')[0]
+        self.assertEqual(sorted(re.findall(r'"api_event"\."(\w+)"', select)), ['date', 'id', 'title'])
+
+    def test_fields_can_ask_for_description_and_attendees(self):
+        data, queries = self.get_list(fields='id,description,attendees')
+        self.assertEqual(data, [{'id': self.event.pk, 'description': 'A very long description',
+                                 'attendees': [self.user.pk]}])
+        self.assertEqual(len(queries), 3)
+
+    def test_omit(self):
+        data, queries = self.get_list(omit='capacity,seats_remaining,attendee_count')
+        self.assertEqual(list(data[0]), ['id', 'title', 'date', 'location', 'organizer'])
+        self.assertNotIn('"capacity"', queries[-1].split(' FROM ')[0])
+
+    def test_paging_works_with_narrowed_fields(self):
+        Event.objects.create(title='Later', description='', date='2030-06-05T10:00:00Z', location='Kyiv',
+                             organizer=self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('event-list'), {'fields': 'title', 'page_size': 1})
+        next_url = response['Link'].split(';')[0].strip('<>')
+        response = self.client.get(next_url)
+        self.assertEqual(response.data, [{'title': 'Later'}])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('event-list'), {'fields': 'title,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'fields': ['Unknown field: password']})
+
+    def test_detail_fields_are_cached_per_representation(self):
+        url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        self.assertEqual(self.client.get(url, {'fields': 'title'}).data, {'title': 'Calendar Event'})
+        self.assertEqual(self.client.get(url, {'fields': 'location'}).data, {'location': 'Kyiv'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'fields': 'title'}).data, {'title': 'Calendar Event'})
+
+    def test_writes_ignore_fields(self):
+        url = reverse('event-detail', kwargs={'pk': self.event.pk}) + '?fields=title'
+        response = self.client.patch(url, {'location': 'Lviv'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['location'], 'Lviv')
+        self.assertIn('description', response.data)
+
+
+class FastSerializerParityTestCase(APITestCase):
+    """
+    The fast list path has to produce exactly the bytes EventListSerializer does.
+    """
+    cases = [
+        {},
+        {'page_size': 2},
+        {'fields': 'id,title,description,date,location,organizer,capacity,attendee_count,seats_remaining'},
+        {'fields': 'date,title'},
+        {'omit': 'seats_remaining,location'},
+        {'search': 'festival'},
+        {'search': 'festival', 'fields': 'title', 'page_size': 1},
+    ]
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+        rows = [
+            ('Music Festival', 'Plain', '2030-05-05T10:00:00Z', 'Kyiv', None, 0),
+            ('Фестиваль “quotes” \\ and "escapes"', 'Line\nbreak\ttab     \x01 😀', '2030-05-05T10:00:00Z',
+             'Львів', 10, 10),
+            ('Festival with microseconds', '', '2030-05-06T10:00:00.123456Z', 'Odesa', 5, 2),
+            ('Late festival', 'Full', '2030-12-31T23:59:59Z', 'Kyiv', 3, 4),
+        ]
+        for title, description, date, location, capacity, count in rows:
+            event = Event.objects.create(title=title, description=description, date=date, location=location,
+                                         organizer=self.user, capacity=capacity)
+            Event.objects.filter(pk=event.pk).update(attendee_count=count)
+
+    def fetch(self, params, fast, **headers):
+        pages = []
+        with override_settings(EVENTS_FAST_SERIALIZER=fast):
+            url, data = reverse('event-list'), params
+            while url:
+                response = self.client.get(url, data, **headers)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                pages.append(response.content)
+                links = [link for link in response.get('Link', '').split(', ') if 'rel="next"' in link]
+                url, data = (links[0].split(';')[0].strip('<>'), None) if links else (None, None)
+        return pages
+
+    def test_byte_parity(self):
+        for params in self.cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.fetch(params, fast=True), self.fetch(params, fast=False))
+
+    @override_settings(TIME_ZONE='Europe/Kyiv')
+    def test_byte_parity_in_another_timezone(self):
+        fast = self.fetch({}, fast=True)
+        self.assertIn(b'+02:00', fast[0])
+        self.assertEqual(fast, self.fetch({}, fast=False))
+
+    def test_byte_parity_with_indent(self):
+        headers = {'HTTP_ACCEPT': 'application/json; indent=4'}
+        self.assertEqual(self.fetch({}, fast=True, **headers), self.fetch({}, fast=False, **headers))
+
+    def test_skips_serializer_fields(self):
+        with mock.patch.object(EventListSerializer, 'to_representation') as to_representation:
+            self.fetch({}, fast=True)
+        to_representation.assert_not_called()
+
+    def test_attendees_use_the_serializer(self):
+        Event.objects.first().attendees.add(self.user)
+        self.assertEqual(self.fetch({'include': 'attendees'}, fast=True),
+                         self.fetch({'include': 'attendees'}, fast=False))
+
+
+class EventFilterTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='testuser@example.com', password='testpassword')
+        self.other = CustomUser.objects.create_user(email='other@example.com', password='testpassword')
+        self.client.force_authenticate(self.user)
+        now = timezone_now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.past = Event.objects.create(title='Past', description='', date=now - timedelta(days=10),
+                                             location='Kyiv', organizer=self.user)
+            self.soon = Event.objects.create(title='Soon', description='', date=now + timedelta(days=1),
+                                             location='Lviv', organizer=self.other)
+            self.later = Event.objects.create(title='Later', description='', date=now + timedelta(days=30),
+                                              location='Kyiv', organizer=self.other)
+        register_attendee(self.later, self.user)
+        register_attendee(self.later, self.other)
+        register_attendee(self.soon, self.other)
+
+    def titles(self, expected_predicate=None, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        # the collection aggregate for the ETag, which ?upcoming= lists don't have, then the filtered page itself
+        self.assertEqual(len(queries), 1 if 'upcoming' in params else 2)
+        if expected_predicate:
+            self.assertRegex(queries[-1]['sql'].split(' WHERE ', 1)[1], expected_predicate)
+        return [event['title'] for event in response.data]
+
+    def iso(self, value):
+        return value.isoformat().replace('+00:00', 'Z')
+
+    def test_no_filters(self):
+        self.assertEqual(self.titles(), ['Past', 'Soon', 'Later'])
+
+    def test_date_range(self):
+        date_from, date_to = self.soon.date, self.later.date
+        self.assertEqual(self.titles(r'"date" >= .*"date" <', date_from=self.iso(date_from),
+                                     date_to=self.iso(date_to)), ['Soon'])
+        self.assertEqual(self.titles(date_from=self.iso(date_from)), ['Soon', 'Later'])
+
+    def test_date_range_must_be_ordered(self):
+        response = self.client.get(reverse('event-list'), {'date_from': self.iso(self.later.date),
+                                                           'date_to': self.iso(self.soon.date)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('date_to', response.data)
+
+    def test_upcoming(self):
+        self.assertEqual(self.titles(r'"date" >=', upcoming='true'), ['Soon', 'Later'])
+        self.assertEqual(self.titles(r'"date" <', upcoming='false'), ['Past'])
+
+    def test_organizer(self):
+        self.assertEqual(self.titles(r'"organizer_id" =', organizer='me'), ['Past'])
+        self.assertEqual(self.titles(organizer=self.other.pk), ['Soon', 'Later'])
+
+    def test_location(self):
+        self.assertEqual(self.titles(r'"location" =', location='Kyiv'), ['Past', 'Later'])
+
+    def test_attending_me(self):
+        self.assertEqual(self.titles(r'"customuser_id" =', attending='me'), ['Later'])
+
+    def test_combined(self):
+        self.assertEqual(self.titles(location='Kyiv', upcoming='true', attending='me', organizer=self.other.pk),
+                         ['Later'])
+
+    def test_ordering(self):
+        self.assertEqual(self.titles(ordering='-date'), ['Later', 'Soon', 'Past'])
+        self.assertEqual(self.titles(ordering='-attendee_count'), ['Later', 'Soon', 'Past'])
+        self.assertEqual(self.titles(ordering='attendee_count'), ['Past', 'Soon', 'Later'])
+
+    def test_ordering_pages(self):
+        response = self.client.get(reverse('event-list'), {'ordering': '-date', 'page_size': 2})
+        self.assertEqual([event['title'] for event in response.data], ['Later', 'Soon'])
+        response = self.client.get(response['Link'].split(';')[0].strip('<>'))
+        self.assertEqual([event['title'] for event in response.data], ['Past'])
+
+    def test_filters_with_search(self):
+        # the first search loads the in-process index
+        self.client.get(reverse('event-list'), {'search': 'warmup'})
+        self.assertEqual(self.titles(search='later', location='Kyiv'), ['Later'])
+        self.assertEqual(self.titles(search='later', location='Lviv'), [])
+
+    def test_invalid_values(self):
+        for params in [{'organizer': 'someone'}, {'organizer': str(2 ** 63)}, {'organizer': '0'},
+                       {'date_from': 'tomorrow'}, {'ordering': 'title'}, {'attending': 'you'}, {'upcoming': 'maybe'}]:
+            with self.subTest(params=params):
+                response = self.client.get(reverse('event-list'), params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(list(params)[0], response.data)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK=dict(
+        settings.REST_FRAMEWORK,
+        DEFAULT_THROTTLE_RATES=dict(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates)))
+
+
+class ThrottlingTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f'user{i}@example.com', username=f'user{i}@example.com') for i in range(2)])
+        self.user, self.other = users
+        self.events = Event.objects.bulk_create([
+            Event(title=f'Event {i}', description='Description', location='Kyiv', date='2030-01-01T10:00:00Z',
+                  organizer=self.organizer)
+            for i in range(4)])
+        self.client.force_authenticate(self.user)
+
+    def register(self, event):
+        return self.client.post(reverse('event-registration', kwargs={'pk': event.pk}))
+
+    @throttle_rates(register='2/min')
+    def test_register_is_stricter_than_reads(self):
+        self.assertEqual(self.register(self.events[0]).status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('event-detail', kwargs={'pk': self.events[1].pk}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.register(self.events[2])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # one token comes back every 30 seconds
+        self.assertIn(int(response['Retry-After']), (29, 30))
+        self.assertFalse(self.events[2].attendees.exists())
+
+        response = self.client.get(reverse('event-detail', kwargs={'pk': self.events[2].pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('event-list')).status_code, status.HTTP_200_OK)
+
+    @throttle_rates(register='1/min')
+    def test_limits_are_per_user(self):
+        self.assertEqual(self.register(self.events[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.register(self.events[1]).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.register(self.events[1]).status_code, status.HTTP_201_CREATED)
+
+    @throttle_rates(user='3/min')
+    def test_user_limit_covers_all_endpoints(self):
+        self.assertEqual(self.client.get(reverse('event-list')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.register(self.events[0]).status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse('event-detail', kwargs={'pk': self.events[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    @throttle_rates(register='1/min')
+    @override_settings(ROOT_URLCONF='events.urls_async')
+    async def test_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('event-registration', kwargs={'pk': self.events[0].pk})
+        response = await self.async_client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = await self.async_client.post(reverse('event-detail', kwargs={'pk': self.events[1].pk}))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response['Retry-After']), (59, 60))
+        response = await self.async_client.get(reverse('event-detail', kwargs={'pk': self.events[1].pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def assertRefills(self, bucket_cache):
+        for _ in range(3):
+            self.assertEqual(take_token(bucket_cache, 'bucket', 3, 60, now=1000.0), 0)
+        self.assertAlmostEqual(take_token(bucket_cache, 'bucket', 3, 60, now=1000.0), 20)
+        self.assertAlmostEqual(take_token(bucket_cache, 'bucket', 3, 60, now=1015.0), 5)
+        self.assertEqual(take_token(bucket_cache, 'bucket', 3, 60, now=1020.0), 0)
+        self.assertGreater(take_token(bucket_cache, 'bucket', 3, 60, now=1020.0), 0)
+        # an idle client gets a full bucket back, not more
+        self.assertEqual(sum(take_token(bucket_cache, 'bucket', 3, 60, now=5000.0) == 0 for _ in range(5)), 3)
+
+    def file_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return FileBasedCache(directory.name, {})
+
+    def test_bucket_refills(self):
+        self.assertRefills(cache)
+
+    def test_file_cache_bucket_refills(self):
+        self.assertRefills(self.file_cache())
+
+    def test_redis_bucket_refills(self):
+        if not os.getenv('REDIS_URL'):
+            self.skipTest('set REDIS_URL to run the Redis script')
+        redis_cache = RedisCache(os.getenv('REDIS_URL'), {'KEY_PREFIX': 'test-throttling'})
+        redis_cache.delete('bucket')
+        self.addCleanup(redis_cache.delete, 'bucket')
+        self.assertRefills(redis_cache)
+
+    @throttle_rates(register='1/min')
+    def test_busy_bucket_is_throttled(self):
+        file_cache = self.file_cache()
+        # caches without an atomic update take a lock, and wait for it only briefly
+        file_cache.add('bucket:lock', 1)
+        started = time.perf_counter()
+        with self.assertRaises(BucketBusy):
+            take_token(file_cache, 'bucket', 3, 60, now=1000.0)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        file_cache.delete('bucket:lock')
+        self.assertEqual(take_token(file_cache, 'bucket', 3, 60, now=1000.0), 0)
+
+        request = RequestFactory().post('/')
+        request.user = self.user
+        throttle = EndpointThrottle()
+        with mock.patch('api.throttling.take_token', side_effect=BucketBusy('bucket')):
+            self.assertFalse(throttle.allow_request(request, EventRegistrationAPIView()))
+        self.assertEqual(throttle.wait(), 60)
+
+    @throttle_rates(register='10/min')
+    def test_concurrent_requests_share_one_bucket(self):
+        # the throttle only needs the user and the view's scope
+        request = RequestFactory().post('/')
+        request.user = self.user
+        view = EventRegistrationAPIView()
+
+        def attempt(_):
+            return EndpointThrottle().allow_request(request, view)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            allowed = list(executor.map(attempt, range(40)))
+        self.assertEqual(sum(allowed), 10)
+
+    @throttle_rates(register='10/min')
+    def test_concurrent_requests_share_one_file_cache_bucket(self):
+        request = RequestFactory().post('/')
+        request.user = self.user
+        view = EventRegistrationAPIView()
+
+        def attempt(_):
+            return EndpointThrottle().allow_request(request, view)
+
+        # the cache every worker process would share
+        with mock.patch.object(TokenBucketThrottle, 'cache', self.file_cache()), \
+                ThreadPoolExecutor(max_workers=16) as executor:
+            allowed = list(executor.map(attempt, range(200)))
+        self.assertLessEqual(sum(allowed), 10)
+        self.assertGreater(sum(allowed), 0)
+
+
+class RequestTimingTestCase(APITestCase):
+    def setUp(self):
+        # earlier tests' increments would otherwise be written into this test's counts
+        metrics.pending.flush()
+        cache.clear()
+        self.user = CustomUser.objects.create(email='testuser@example.com', username='testuser@example.com')
+        self.event = Event.objects.create(title='Event', description='Description', location='Kyiv',
+                                          date='2030-01-01T10:00:00Z', organizer=self.user)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def timings(self, response):
+        return {match['name']: match for match in re.finditer(
+            r'(?P<name>\w+);(?:desc="(?P<queries>\d+) queries";)?dur=(?P<dur>[\d.]+)', response['Server-Timing'])}
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event-list'))
+        timings = self.timings(response)
+        self.assertEqual(int(timings['db']['queries']), len(queries))
+        self.assertGreater(float(timings['serialize']['dur']), 0)
+        self.assertGreaterEqual(float(timings['total']['dur']), float(timings['db']['dur']))
+
+    def test_only_api_and_authorization_views(self):
+        self.assertIn('Server-Timing', self.client.get(reverse('token-list')))
+        self.assertNotIn('Server-Timing', self.client.get('/admin/login/'))
+        self.assertNotIn('Server-Timing', self.client.get('/no-such-page/'))
+
+    def test_histograms(self):
+        response = self.client.get(reverse('event-detail', kwargs={'pk': self.event.pk}))
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', metrics)
+        self.assertIn('api_request_duration_seconds_count 1\n', metrics)
+        self.assertIn('api_request_duration_seconds_bucket{le="+Inf"} 1\n', metrics)
+        self.assertIn(f'api_response_size_bytes_sum {float(len(response.content))}\n', metrics)
+        queries = int(self.timings(response)['db']['queries'])
+        self.assertIn(f'api_request_db_queries_sum {float(queries)}\n', metrics)
+
+    @override_settings(METRICS_FLUSH_SECONDS=60)
+    def test_metrics_are_written_in_batches(self):
+        url = reverse('event-detail', kwargs={'pk': self.event.pk})
+        with mock.patch.object(metrics, 'increment', wraps=metrics.increment) as increment:
+            for _ in range(3):
+                self.client.get(url)
+            increment.assert_not_called()
+            metrics.pending.flush()
+        # one write per bucket and sum touched, however many requests
+        keys = [call.args[1] for call in increment.call_args_list]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertIn('metrics:api_request_duration_seconds:sum', keys)
+        self.assertIn('api_request_duration_seconds_count 3\n', self.client.get(reverse('metrics')).content.decode())
+
+    @override_settings(METRICS_FLUSH_SECONDS=0)
+    def test_metrics_are_flushed_when_due(self):
+        self.client.get(reverse('event-detail', kwargs={'pk': self.event.pk}))
+        self.assertEqual(metrics.pending.get('default', 'metrics:api_request_duration_seconds:sum'), 0)
+        self.assertGreater(cache.get('metrics:api_request_duration_seconds:sum'), 0)
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_log_their_sql(self):
+        with self.assertLogs('api.requests', 'WARNING') as logs:
+            self.client.get(reverse('event-detail', kwargs={'pk': self.event.pk}))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f'GET /api/events/{self.event.pk}/: 200', logs.output[0])
+        self.assertIn('FROM "api_event"', logs.output[0])
+
+    def test_long_statements_are_cut_short(self):
+        timing = RequestTiming()
+        timing.add_query('SELECT 1 WHERE id IN (%s)' % ', '.join(['1'] * 10000), 0.1)
+        self.assertLess(len(timing.queries[0][0]), 1010)
+        self.assertEqual(timing.db_duration, 0.1)
+
+    @override_settings(ROOT_URLCONF='events.urls_async')
+    async def test_async_views(self):
+        # the queries run in sync_to_async threads and still count towards the request
+        response = await self.async_client.get(reverse('event-detail', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(int(self.timings(response)['db']['queries']), 0)
+
+
+class SeedEventsTestCase(TestCase):
+    def seed(self, **options):
+        options = dict({'users': 30, 'events': 200, 'attendances': 1000, 'seed': 1}, **options)
+        call_command('seed_events', stdout=StringIO(), **options)
+
+    def test_dataset(self):
+        self.seed()
+        self.assertEqual(CustomUser.objects.count(), 30)
+        self.assertEqual(Event.objects.count(), 200)
+        Attendance = Event.attendees.through
+        self.assertGreater(Attendance.objects.count(), 500)
+        # attendee_count is recounted, capacities hold and organizers don't attend their own events
+        counts = dict(Attendance.objects.values_list('event').annotate(count=Count('*')))
+        self.assertEqual({pk: count for pk, count in Event.objects.values_list('pk', 'attendee_count') if count},
+                         counts)
+        self.assertFalse(Event.objects.filter(attendee_count__gt=F('capacity')).exists())
+        self.assertFalse(Attendance.objects.filter(event__organizer=F('customuser')).exists())
+        self.assertTrue(Event.objects.filter(capacity__isnull=False).exists())
+
+    def test_skewed_attendance(self):
+        self.seed(users=500, attendances=2000)
+        counts = sorted(Event.objects.values_list('attendee_count', flat=True), reverse=True)
+        # the most popular tenth of the events draw most of the registrations
+        self.assertGreater(sum(counts[:20]), sum(counts) / 2)
+
+    def test_reproducible(self):
+        self.seed()
+        columns = ('title', 'location', 'capacity', 'attendee_count')
+        first = list(Event.objects.order_by('pk').values_list(*columns))
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(flush=True)
+        self.assertEqual(list(Event.objects.order_by('pk').values_list(*columns)), first)
+
+    def test_flush_drops_tokens_and_sessions(self):
+        self.seed()
+        user = CustomUser.objects.order_by('pk').first()
+        AuthToken.issue(user)
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session.create()
+        command = 'api.management.commands.seed_events'
+        with mock.patch('authorization.signals.forget_now_and_on_commit') as per_row, \
+                mock.patch(f'{command}.forget_users') as forget_users, \
+                mock.patch(f'{command}.forget_tokens') as forget_tokens:
+            self.seed(flush=True)
+        # plain DELETEs, so no per-row signals; cached copies are dropped in one go
+        per_row.assert_not_called()
+        forget_users.assert_called_once()
+        self.assertEqual(len(forget_users.call_args.args[0]), 30)
+        self.assertIn(user.pk, forget_users.call_args.args[0])
+        forget_tokens.assert_called_once()
+        self.assertFalse(AuthToken.objects.exists())
+        self.assertFalse(Session.objects.filter(pk=session.session_key).exists())
+        self.assertIsNone(cache.get(session.cache_key))
+
+
+class ReplicaTestCase(APITestCase):
+    """
+    A second SQLite file stands in for a replica; rows written to only one
+    of the two databases show which one a query went to.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # added here rather than in settings, where the test runner would set it up as a test database
+        cls.replica_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+        cls.replica_file.close()
+        connections.settings['replica'] = dict(connections.settings['default'], NAME=cls.replica_file.name)
+        call_command('migrate', database='replica', verbosity=0)
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.remove(cls.replica_file.name)
+
+    def setUp(self):
+        cache.clear()
+        for alias in ['replica', 'default']:
+            users = CustomUser.objects.using(alias).bulk_create([
+                CustomUser(pk=100 + i, email=f'user{i}@example.com', username=f'user{i}@example.com')
+                for i in range(3)])
+        self.organizer, self.user, self.other = users
+        self.shared = Event.objects.create(pk=100, title='Shared', description='Description', location='Kyiv',
+                                           date='2030-01-01T10:00:00Z', organizer=self.organizer)
+        Event.objects.using('replica').create(pk=100, title='Shared', description='Description', location='Kyiv',
+                                              date='2030-01-01T10:00:00Z', organizer_id=self.organizer.pk)
+        Event.objects.create(pk=101, title='Primary only', description='Description', location='Kyiv',
+                             date='2030-02-01T10:00:00Z', organizer=self.organizer)
+        Event.objects.using('replica').create(pk=102, title='Replica only', description='Description',
+                                              location='Kyiv', date='2030-03-01T10:00:00Z',
+                                              organizer_id=self.organizer.pk)
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('api.replicas.pool', ReplicaPool())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def titles(self):
+        response = self.client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [event['title'] for event in response.data]
+
+    def test_without_replicas_reads_use_the_primary(self):
+        self.assertEqual(self.titles(), ['Shared', 'Primary only'])
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_list_and_detail_read_from_the_replica(self):
+        self.assertEqual(self.titles(), ['Shared', 'Replica only'])
+        response = self.client.get(reverse('event-detail', kwargs={'pk': 102}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('event-detail', kwargs={'pk': 101}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=3)
+    def test_replica_payloads_are_cached_briefly(self):
+        with mock.patch.object(event_cache, 'set', wraps=event_cache.set) as cache_set:
+            self.client.get(reverse('event-detail', kwargs={'pk': 100}))
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], 3)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writes_go_to_the_primary(self):
+        response = self.client.post(reverse('event-registration', kwargs={'pk': 100}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Event.objects.using('default').get(pk=100).attendees.filter(pk=self.user.pk).exists())
+        self.assertFalse(Event.objects.using('replica').get(pk=100).attendees.exists())
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writer_does_not_read_back_a_replica_copy_cached_after_the_write(self):
+        url = reverse('event-detail', kwargs={'pk': 100})
+        self.client.post(reverse('event-registration', kwargs={'pk': 100}))
+        # another user reads the lagging replica and caches its copy under the new version
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url, {'include': 'attendees'}).data['attendees'], [])
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url, {'include': 'attendees'}).data['attendees'], [self.user.pk])
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writer_reads_from_the_primary_for_a_while(self):
+        self.client.post(reverse('event-registration', kwargs={'pk': 100}))
+        self.assertEqual(self.titles(), ['Shared', 'Primary only'])
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.titles(), ['Shared', 'Replica only'])
+
+    @override_settings(DATABASE_REPLICAS=['replica'], ROOT_URLCONF='events.urls_async')
+    async def test_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('event-detail', kwargs={'pk': 102}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await self.async_client.get(reverse('event-list'))
+        self.assertEqual([event['title'] for event in response.json()], ['Shared', 'Replica only'])
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'default'])
+    def test_round_robin(self):
+        pool = ReplicaPool()
+        self.assertEqual([pool.choose() for _ in range(4)], ['replica', 'default', 'replica', 'default'])
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'default'], REPLICA_RETRY_SECONDS=30)
+    def test_unreachable_replica_is_left_out(self):
+        pool = ReplicaPool()
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError) as check:
+            self.assertEqual([pool.choose() for _ in range(4)], ['default'] * 4)
+        self.assertEqual(check.call_count, 1)
+        with mock.patch('api.replicas.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual(pool.choose(), 'replica')
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_falls_back_to_the_primary(self):
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError):
+            self.assertEqual(self.titles(), ['Shared', 'Primary only'])
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_replica_failing_mid_request(self):
+        with mock.patch.object(connections['replica'], 'create_cursor', side_effect=OperationalError):
+            self.assertEqual(self.titles(), ['Shared', 'Primary only'])
+            # and it is left out of the next requests
+            self.assertEqual(self.titles(), ['Shared', 'Primary only'])
+
+
+class ConnectionSettingsTestCase(TestCase):
+    sqlite = {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 60}
+    postgres = {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 0,
+                'OPTIONS': {'pool': {'min_size': 2, 'max_size': 10}}}
+
+    def test_database_config(self):
+        with mock.patch('events.settings.DB_POOL', False):
+            config = database_config('postgres://events:secret@db/events')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config.get('OPTIONS', {}))
+        with mock.patch('events.settings.DB_POOL', True):
+            config = database_config('postgres://events:secret@db/events')
+            self.assertEqual(config['CONN_MAX_AGE'], 0)
+            self.assertEqual(config['OPTIONS']['pool']['max_size'], 10)
+            self.assertNotIn('pool', database_config('sqlite:////tmp/events.db').get('OPTIONS', {}))
+
+    def test_pool_errors(self):
+        self.assertEqual(pool_errors({'default': self.sqlite}, pool_requested=False, async_mode=False), [])
+        self.assertEqual([error.id for error in pool_errors({'default': self.sqlite}, True, False)], ['api.W001'])
+        self.assertEqual([error.id for error in pool_errors({'default': self.sqlite}, False, True)], ['api.W002'])
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            self.assertEqual([error.id for error in pool_errors({'default': self.postgres}, True, True)],
+                             ['api.E001'])
+
+    def test_connection_check(self):
+        self.assertEqual(check_connections(databases=['default']), [])
+        with mock.patch.object(connection, 'ensure_connection', side_effect=OperationalError('refused')):
+            self.assertEqual([error.id for error in check_connections(databases=['default'])], ['api.E002'])
+
+
+class OrganizerStatsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword')
+        self.users = [CustomUser.objects.create_user(email=f'user{i}@example.com', password='testpassword')
+                      for i in range(4)]
+        now = timezone_now()
+        self.past = Event.objects.create(title='Past', description='-', date=now - timedelta(days=3),
+                                         location='Kyiv', organizer=self.organizer, capacity=4)
+        self.full = Event.objects.create(title='Full', description='-', date=now + timedelta(days=1),
+                                         location='Lviv', organizer=self.organizer, capacity=2)
+        self.open = Event.objects.create(title='Open', description='-', date=now + timedelta(days=2),
+                                         location='Odesa', organizer=self.organizer)
+        for event, users in [(self.past, self.users[:1]), (self.full, self.users[:2]), (self.open, self.users)]:
+            for user in users:
+                register_attendee(event, user)
+        Attendance.objects.filter(event=self.past).update(registered_at=now - timedelta(days=5))
+        # someone else's event is not counted
+        Event.objects.create(title='Other', description='-', date=now, location='Kyiv', organizer=self.users[0])
+        self.client.force_authenticate(self.organizer)
+
+    def stats(self, **params):
+        return self.client.get(reverse('organizer-stats'), params)
+
+    def test_stats(self):
+        with self.assertNumQueries(2):
+            response = self.stats()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals'], {'events': 3, 'upcoming': 2, 'past': 1, 'attendees': 7,
+                                                   'capacity': 6, 'fill_rate': 0.5})
+        events = response.data['events']
+        self.assertEqual([event['title'] for event in events], ['Past', 'Full', 'Open'])
+        self.assertEqual([event['attendees'] for event in events], [1, 2, 4])
+        self.assertEqual([event['fill_rate'] for event in events], [0.25, 1.0, None])
+        self.assertEqual([event['upcoming'] for event in events], [False, True, True])
+        today = timezone_now().date()
+        self.assertEqual(response.data['signups_per_day'],
+                         [{'date': today - timedelta(days=5), 'signups': 1}, {'date': today, 'signups': 6}])
+
+    def test_running_series(self):
+        # weekly since two weeks ago, ten classes; its capacity is per class
+        start = timezone_now().replace(microsecond=0) - timedelta(days=14)
+        series = Event.objects.create(title='Weekly', description='-', date=start, location='Kyiv',
+                                      organizer=self.organizer, capacity=3, recurrence='FREQ=WEEKLY;COUNT=10')
+        register_attendee(series, self.users[0], start + timedelta(days=21))
+        register_attendee(series, self.users[1], start + timedelta(days=21))
+        register_attendee(series, self.users[0], start + timedelta(days=28))
+        response = self.stats(ordering='-attendees')
+        self.assertEqual(response.data['totals'], {'events': 4, 'upcoming': 3, 'past': 1, 'attendees': 10,
+                                                   'capacity': 6, 'fill_rate': 0.5})
+        weekly = response.data['events'][1]
+        self.assertEqual((weekly['title'], weekly['attendees'], weekly['upcoming'], weekly['fill_rate']),
+                         ('Weekly', 3, True, None))
+        series.refresh_from_db()
+        self.assertIsNone(series.seats_remaining)
+        self.assertFalse(Event.objects.with_seats().filter(pk=series.pk).exists())
+
+    def test_ordering_and_pages(self):
+        response = self.stats(ordering='-fill_rate', page_size=2)
+        self.assertEqual([event['title'] for event in response.data['events']], ['Full', 'Past'])
+        # the totals cover every event, not just the page
+        self.assertEqual(response.data['totals']['events'], 3)
+        self.assertIn('offset=2', response['Link'])
+        response = self.stats(ordering='-fill_rate', page_size=2, offset=2)
+        self.assertEqual([event['title'] for event in response.data['events']], ['Open'])
+        self.assertEqual(response.data['totals']['attendees'], 7)
+        self.assertNotIn('rel="next"', response['Link'])
+        self.assertEqual(self.stats(offset=3).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.stats(offset=2 ** 64).status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(ORGANIZER_STATS_MAX_OFFSET=1):
+            self.assertEqual(self.stats(offset=2).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stats(ordering='title').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_no_events(self):
+        self.client.force_authenticate(self.users[1])
+        response = self.stats()
+        self.assertEqual(response.data, {
+            'totals': {'events': 0, 'upcoming': 0, 'past': 0, 'attendees': 0, 'capacity': None, 'fill_rate': None},
+            'signups_per_day': [], 'events': []})
+
+    def test_cached(self):
+        self.stats()
+        register_attendee(self.past, self.users[1])
+        with self.assertNumQueries(0):
+            response = self.stats()
+        self.assertEqual(response.data['totals']['attendees'], 7)
+        cache.clear()
+        self.assertEqual(self.stats().data['totals']['attendees'], 8)
+
+
+class RecurrenceTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = CustomUser.objects.create_user(email='organizer@example.com', password='testpassword')
+        self.users = [CustomUser.objects.create_user(email=f'user{i}@example.com', password='testpassword')
+                      for i in range(3)]
+        # Wednesdays and Fridays at 18:00, ten classes
+        self.start = datetime(2030, 5, 8, 18, tzinfo=timezone.utc)
+        self.series = Event.objects.create(title='Yoga', description='-', date=self.start, location='Kyiv',
+                                           organizer=self.organizer, capacity=1,
+                                           recurrence='FREQ=WEEKLY;BYDAY=WE,FR;COUNT=10')
+        self.client.force_authenticate(self.users[0])
+
+    def occurrences(self, **params):
+        response = self.client.get(reverse('event-occurrences', kwargs={'pk': self.series.pk}), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def register(self, user, start, method='post'):
+        self.client.force_authenticate(user)
+        url = reverse('event-registration', kwargs={'pk': self.series.pk})
+        params = '' if start is None else '?' + urlencode({'occurrence': start.isoformat()})
+        return getattr(self.client, method)(url + params)
+
+    def test_rule(self):
+        rule = RecurrenceRule.parse('byday=fr,we;freq=weekly;interval=1')
+        self.assertEqual(str(rule), 'FREQ=WEEKLY;BYDAY=WE,FR')
+        self.assertEqual([d.day for d in rule.between(self.start, self.start, self.start + timedelta(days=10))],
+                         [8, 10, 15, 17])
+        self.assertEqual(self.series.recurrence_end, datetime(2030, 6, 7, 18, tzinfo=timezone.utc))
+        for text in ['FREQ=YEARLY', 'FREQ=DAILY;BYDAY=MO', 'FREQ=DAILY;COUNT=2;UNTIL=20300101', 'FREQ=DAILY;X=1']:
+            with self.assertRaises(ValueError):
+                RecurrenceRule.parse(text)
+
+    def test_expansion_is_bounded_by_the_window(self):
+        rule = RecurrenceRule.parse('FREQ=DAILY')
+        window = self.start + timedelta(days=365 * 60)
+        with mock.patch.object(_Series, 'occurrence', autospec=True, side_effect=_Series.occurrence) as occurrence:
+            days = list(rule.between(self.start, window, window + timedelta(days=7)))
+        self.assertEqual(len(days), 7)
+        self.assertEqual(days[0], window)
+        self.assertLess(occurrence.call_count, 10)
+
+    def test_create_series(self):
+        self.client.force_authenticate(self.organizer)
+        data = {'title': 'Class', 'date': '2030-05-06T18:00:00Z', 'location': 'Lviv',
+                'recurrence': 'freq=weekly;until=20300601'}
+        response = self.client.post(reverse('event-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['recurrence'], 'FREQ=WEEKLY;UNTIL=20300601T000000Z')
+        self.assertEqual(response.data['recurrence_end'], '2030-05-27T18:00:00Z')
+        for recurrence in ['FREQ=WEEKLY;BYDAY=TU', 'FREQ=HOURLY']:
+            response = self.client.post(reverse('event-list'), dict(data, recurrence=recurrence), format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('recurrence', response.data)
+
+    def test_occurrences_with_exceptions(self):
+        self.client.force_authenticate(self.organizer)
+        url = reverse('event-occurrence', kwargs={'pk': self.series.pk, 'start': '2030-05-10T18:00:00Z'})
+        self.assertTrue(self.client.patch(url, {'cancelled': True}, format='json').data['cancelled'])
+        url = reverse('event-occurrence', kwargs={'pk': self.series.pk, 'start': '2030-05-15T18:00:00Z'})
+        self.client.patch(url, {'date': '2030-05-25T10:00:00Z'}, format='json')
+        url = reverse('event-occurrence', kwargs={'pk': self.series.pk, 'start': '2030-05-16T18:00:00Z'})
+        self.assertEqual(self.client.patch(url, {'cancelled': True}, format='json').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        with self.assertNumQueries(2):
+            data = self.occurrences(date_from='2030-05-01T00:00:00Z', date_to='2030-05-27T00:00:00Z')
+        self.assertEqual([(o['start'][:10], o['date'][:10], o['cancelled']) for o in data], [
+            ('2030-05-08', '2030-05-08', False), ('2030-05-10', '2030-05-10', True),
+            ('2030-05-17', '2030-05-17', False), ('2030-05-22', '2030-05-22', False),
+            ('2030-05-24', '2030-05-24', False), ('2030-05-15', '2030-05-25', False)])
+        # only the changed occurrences are stored
+        self.assertEqual(Occurrence.objects.count(), 2)
+        self.assertEqual(len(self.occurrences(date_from='2030-06-06T00:00:00Z', date_to='2031-01-01T00:00:00Z')), 1)
+        response = self.client.get(reverse('event-occurrences', kwargs={'pk': self.series.pk}),
+                                   {'date_from': '2030-01-01T00:00:00Z', 'date_to': '2032-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_registration_is_per_occurrence(self):
+        first, second = self.start, self.start + timedelta(days=2)
+        self.assertEqual(self.register(self.users[0], first).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.register(self.users[0], second).status_code, status.HTTP_201_CREATED)
+        # the capacity of 1 is per occurrence
+        self.assertEqual(self.register(self.users[1], first).data['message'], 'This event is full')
+        self.assertEqual(self.register(self.users[1], self.start + timedelta(days=1)).data['message'],
+                         'The event has no occurrence at that time')
+        self.assertEqual(self.register(self.users[1], None).data['message'],
+                         'This event recurs: choose an occurrence')
+        Occurrence.objects.filter(start=second).update(cancelled=True)
+        self.assertEqual(self.register(self.users[2], second).data['message'], 'This occurrence is cancelled')
+
+        self.assertEqual([o['attendee_count'] for o in self.occurrences(date_from='2030-05-08T00:00:00Z')[:3]],
+                         [1, 1, 0])
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.attendee_count, 0)
+        self.assertEqual(OutboxEmail.objects.filter(body__contains='2030-05-10 18:00').count(), 1)
+
+        self.assertEqual(self.register(self.users[0], first, 'delete').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.register(self.users[0], first, 'delete').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Occurrence.objects.get(start=first).attendee_count, 0)
+
+    def test_series_in_event_list(self):
+        self.register(self.users[0], self.start)
+        self.register(self.users[0], self.start + timedelta(days=2))
+        # started before the window but still going in it
+        response = self.client.get(reverse('event-list'), {'date_from': '2030-06-01T00:00:00Z'})
+        self.assertEqual([event['title'] for event in response.data], ['Yoga'])
+        response = self.client.get(reverse('event-list'), {'date_from': '2030-06-08T00:00:00Z'})
+        self.assertEqual(response.data, [])
+        response = self.client.get(reverse('event-list'), {'attending': 'me', 'fields': 'id,attendees'})
+        self.assertEqual(response.data, [{'id': self.series.pk, 'attendees': [self.users[0].pk]}])
+
+    def test_schedule_is_fixed_once_occurrences_are_stored(self):
+        self.client.force_authenticate(self.organizer)
+        url = reverse('event-detail', kwargs={'pk': self.series.pk})
+        self.assertEqual(self.client.patch(url, {'recurrence': 'FREQ=WEEKLY;BYDAY=WE;COUNT=5'},
+                                           format='json').status_code, status.HTTP_200_OK)
+        self.register(self.users[0], self.start)
+        self.client.force_authenticate(self.organizer)
+        response = self.client.patch(url, {'recurrence': 'FREQ=DAILY'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.patch(url, {'title': 'Morning yoga'}, format='json').status_code,
+                         status.HTTP_200_OK)
+
+    def test_event_with_registrations_cannot_start_or_stop_recurring(self):
+        one_off = Event.objects.create(title='Talk', description='-', date=self.start, location='Kyiv',
+                                       organizer=self.organizer)
+        self.client.force_authenticate(self.users[1])
+        self.client.post(reverse('event-registration', kwargs={'pk': one_off.pk}))
+        self.client.force_authenticate(self.organizer)
+        url = reverse('event-detail', kwargs={'pk': one_off.pk})
+        response = self.client.patch(url, {'recurrence': 'FREQ=WEEKLY;COUNT=3'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        one_off.refresh_from_db()
+        self.assertEqual((one_off.recurrence, one_off.attendee_count), ('', 1))
+        # the attendee can still cancel
+        self.client.force_authenticate(self.users[1])
+        response = self.client.delete(reverse('event-registration', kwargs={'pk': one_off.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.client.force_authenticate(self.organizer)
+        self.assertEqual(self.client.patch(url, {'recurrence': 'FREQ=WEEKLY;COUNT=3'}, format='json').status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(self.client.patch(url, {'recurrence': ''}, format='json').status_code, status.HTTP_200_OK)
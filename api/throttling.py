@@ -0,0 +1,206 @@
+"""
+Token bucket throttles kept in the Django cache.
+
+A rate of ``N/period`` lets a client send bursts of up to N requests, which
+then refill at N per period. The bucket is stored as a single timestamp
+(GCRA's theoretical arrival time) per client and scope. With Redis the
+bucket is updated by a script, atomically and in one round-trip, so the
+limit holds for all worker processes together; with the in-process cache a
+process lock makes the update atomic. Other caches take a lock (``add()``,
+or an exclusively created file for the file cache, whose ``add()`` isn't
+atomic) and wait briefly for it; a request that still finds it taken is
+throttled, so the limit holds however hard a client pushes.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from . import metrics
+
+throttled_requests = metrics.counter('api_throttled_requests_total', 'Requests rejected by a rate limit')
+
+# take_token in Lua; Redis replies with integers only, so the seconds come back as a string
+TAKE_TOKEN_SCRIPT = """
+local now, interval, duration = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local arrival = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+local overdraft = arrival - now - (duration - interval)
+if overdraft > 0 then
+    return tostring(overdraft)
+end
+redis.call('SET', KEYS[1], tostring(arrival + interval), 'EX', math.ceil(arrival + interval - now))
+return '0'
+"""
+
+local_lock = threading.Lock()
+# seconds a lock outlives a holder that died, and how long a request waits for it
+LOCK_TIMEOUT = 1
+LOCK_WAIT = 0.05
+
+
+class BucketBusy(Exception):
+    pass
+
+
+def update_bucket(cache, key, interval, duration, now):
+    arrival = max(cache.get(key, now), now)
+    # each request pushes the arrival time one interval ahead; a full bucket
+    # allows it to run at most ``duration - interval`` ahead of the clock
+    overdraft = arrival - now - (duration - interval)
+    if overdraft > 0:
+        return overdraft
+    cache.set(key, arrival + interval, timeout=math.ceil(arrival + interval - now))
+    return 0
+
+
+def acquire_lock(cache, lock_key):
+    """
+    Take the lock at ``lock_key``; returns a function that releases it, or
+    None if another caller holds it.
+    """
+    if isinstance(cache, FileBasedCache):
+        # FileBasedCache.add() checks for the file and then writes it, so two callers can both succeed
+        path = cache._key_to_file(lock_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            with suppress(FileNotFoundError):
+                if time.time() - os.path.getmtime(path) > LOCK_TIMEOUT:
+                    os.remove(path)
+            return None
+
+        def release():
+            # gone already if it outlived LOCK_TIMEOUT and another caller cleared it
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        return release
+    # add only succeeds for one caller; the timeout frees the lock if its holder dies
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        return None
+    return lambda: cache.delete(lock_key)
+
+
+def take_token(cache, key, num_requests, duration, now):
+    """
+    Take a token from the bucket at ``key``; returns 0 if there was one, or
+    else the seconds until there will be. Raises ``BucketBusy`` if other
+    requests held the bucket's lock for all of ``LOCK_WAIT``.
+    """
+    interval = duration / num_requests
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        return float(client.register_script(TAKE_TOKEN_SCRIPT)(keys=[key], args=[now, interval, duration]))
+    if isinstance(cache, LocMemCache):
+        # the buckets live in this process
+        with local_lock:
+            return update_bucket(cache, key, interval, duration, now)
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_WAIT
+    while True:
+        release = acquire_lock(cache, lock_key)
+        if release is not None:
+            break
+        if time.monotonic() > deadline:
+            raise BucketBusy(key)
+        time.sleep(0.002)
+    try:
+        return update_bucket(cache, key, interval, duration, now)
+    finally:
+        release()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    ``SimpleRateThrottle`` with a token bucket instead of a list of request
+    times, which costs a fixed amount per request and is safe to update
+    from concurrent requests.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+    def get_rate(self):
+        # read on every request, so a missing scope means no limit and tests can override rates
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        try:
+            self.retry_after = take_token(self.cache, self.key, self.num_requests, self.duration, self.timer())
+        except BucketBusy:
+            # the client's other requests kept the bucket locked; letting this one through
+            # would lift the limit exactly when a client floods us, so it waits a token's time
+            self.retry_after = self.duration / self.num_requests
+        if self.retry_after:
+            throttled_requests.inc()
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class AnonThrottle(TokenBucketThrottle):
+    """
+    Limits unauthenticated requests, such as token requests, per IP address.
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserThrottle(TokenBucketThrottle):
+    """
+    Limits all requests of an authenticated user, whichever endpoint they go to.
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class EndpointThrottle(TokenBucketThrottle):
+    """
+    Limits requests to a group of endpoints per user (or IP address). Views
+    name the group in ``throttle_scope``, or per method in ``throttle_scopes``.
+    """
+
+    def __init__(self):
+        # the scope, and so the rate, depends on the view
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scopes', {}).get(request.method, getattr(view, 'throttle_scope', None))
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
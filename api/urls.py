@@ -1,8 +1,20 @@
-from django.urls import path
-from .views import EventListCreateAPIView, EventRetrieveUpdateDestroyAPIView
+from django.urls import path, re_path
+from .views import (EventAttendeesExportAPIView, EventBulkCreateAPIView, EventExportAPIView,
+                    EventListCreateAPIView, EventOccurrenceAPIView, EventOccurrenceListAPIView,
+                    EventRegistrationAPIView, EventRetrieveUpdateDestroyAPIView, OrganizerStatsAPIView,
+                    metrics_view)
 
 urlpatterns = [
     path('events/', EventListCreateAPIView.as_view(), name='event-list'),
+    path('events/bulk/', EventBulkCreateAPIView.as_view(), name='event-bulk-create'),
+    re_path(r'^events/export\.(?P<fmt>ndjson|csv)$', EventExportAPIView.as_view(), name='event-export'),
     path('events/<int:pk>/', EventRetrieveUpdateDestroyAPIView.as_view(), name='event-detail'),
+    path('events/<int:pk>/registration/', EventRegistrationAPIView.as_view(), name='event-registration'),
+    path('events/<int:pk>/occurrences/', EventOccurrenceListAPIView.as_view(), name='event-occurrences'),
+    path('events/<int:pk>/occurrences/<str:start>/', EventOccurrenceAPIView.as_view(), name='event-occurrence'),
+    re_path(r'^events/(?P<pk>[0-9]+)/attendees\.(?P<fmt>ndjson|csv)$', EventAttendeesExportAPIView.as_view(),
+            name='event-attendees-export'),
+    path('organizers/me/stats/', OrganizerStatsAPIView.as_view(), name='organizer-stats'),
+    path('metrics/', metrics_view, name='metrics'),
 
 ]
\ No newline at end of file
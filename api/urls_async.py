@@ -0,0 +1,8 @@
+from django.urls import path
+from .async_views import AsyncEventDetailView, AsyncEventListView, AsyncEventRegistrationView
+
+urlpatterns = [
+    path('events/', AsyncEventListView.as_view(), name='event-list'),
+    path('events/<int:pk>/', AsyncEventDetailView.as_view(), name='event-detail'),
+    path('events/<int:pk>/registration/', AsyncEventRegistrationView.as_view(), name='event-registration'),
+]
@@ -1,81 +1,245 @@
-from django.conf import settings
-from django.core.mail import send_mail
-from django.db.models import Q
+from types import GeneratorType
 
-from rest_framework import status
+from django.db import transaction
+from django.db.models import Max, prefetch_related_objects
+from django.http import HttpResponse
+
+from rest_framework import serializers, status
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .models import Event
-from .serializers import EventSerializer
+from . import metrics
+from .cache import event_cache, events_deleted_at
+from .conditional import make_validators, not_modified, set_validators
+from .export import (ATTENDEE_COLUMNS, EVENT_COLUMNS, ExportContentNegotiation, attendee_rows, event_rows,
+                     streaming_export)
+from .fast_serializers import FastEventListSerializer, use_fast_serializer
+from .filters import EventFilter, OccurrenceWindow, is_time_relative
+from .importing import import_events, read_json
+from .instrumentation import measure
+from .models import ATTENDEE_IDS, Event, Occurrence
+from .outbox import enqueue_email
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .replicas import reads_from_replica, reads_own_writes, replica_timeout
+from .registration import RegistrationError, register_attendee, unregister_attendee
+from .search import get_search_backend
+from .serializers import EventListSerializer, EventSerializer, OccurrenceSerializer
+from .stats import StatsParamsSerializer, cached_organizer_stats
+
+
+def select_fields(queryset, serializer_class, names, ordering=(), as_values=False):
+    """
+    Narrow ``queryset`` to the columns needed to render ``names`` (plus the
+    ordering, which page cursors read) and prefetch attendees only if asked for.
+    With ``as_values`` the rows come back as dicts for ``FastEventListSerializer``.
+    """
+    columns = serializer_class.columns(names)
+    ordering = [field.lstrip('-') for field in ordering]
+    if as_values:
+        return queryset.values(*columns, *[name for name in ordering if name not in columns])
+    queryset = queryset.only(*columns, *[name for name in ordering if name not in queryset.query.annotations])
+    if 'attendees' in names:
+        queryset = queryset.with_attendees()
+    return queryset
+
+
+def list_queryset(request):
+    """
+    The event list query for ``request``, from its filters, search, ordering
+    and requested fields; returns ``(queryset, paginator, names, fast)``.
+    Raises ``ValidationError`` for invalid parameters.
+    """
+    names = EventListSerializer.field_names(request)
+    event_filter = EventFilter(data=request.GET.dict(), context={'request': request})
+    event_filter.is_valid(raise_exception=True)
+    queryset = event_filter.filter_queryset(Event.objects.all())
+    search_query = request.GET.get('search', '')
+    if search_query:
+        queryset = get_search_backend().search(queryset, search_query)
+    paginator = KeysetPagination(ordering=event_filter.get_ordering(searching=bool(search_query)))
+    fast = use_fast_serializer(names)
+    queryset = select_fields(queryset, EventListSerializer, names, paginator.ordering, as_values=fast)
+    return queryset, paginator, names, fast
+
+
+def list_data(page, names, request, fast):
+    with measure():
+        if fast:
+            return FastEventListSerializer(EventListSerializer, names).to_representation(page)
+        return EventListSerializer(page, many=True, context={'request': request}).data
+
+
+def detail_variant(names):
+    # cache and ETag key for one representation of an event
+    return ','.join(sorted(names))
 
 
 class EventListCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'events'
 
+    @reads_from_replica
     def get(self, request):
-        queryset = Event.objects.all()
-        search_query = request.query_params.get('search', '')
-        if search_query:
-            queryset = queryset.filter(Q(title__icontains=search_query) |
-                                       Q(location__icontains=search_query)).distinct()
-        # location = request.query_params.get('location')
-        # if location:
-        #     queryset = queryset.filter(location=location)
-        serializer = EventSerializer(queryset, many=True)
-        return Response(serializer.data)
+        etag = last_modified = None
+        # ?upcoming= lists change as time passes without a write, which the validators can't see
+        if not is_time_relative(request.GET):
+            # collection version: one index-only aggregate, nothing is serialized on a 304
+            last_changed = Event.objects.aggregate(last_changed=Max('updated_at'))['last_changed']
+            last_modified = max(filter(None, [last_changed, events_deleted_at()]))
+            etag, last_modified = make_validators(last_modified, request.user.pk, request.get_full_path())
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+
+        queryset, paginator, names, fast = list_queryset(request)
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        data = list_data(page, names, request, fast)
+        return set_validators(paginator.get_paginated_response(data), etag, last_modified)
 
     def post(self, request):
         mutable_data = request.data.copy()
         mutable_data['organizer'] = request.user.pk
-        serializer = EventSerializer(data=mutable_data)
+        serializer = EventSerializer(data=mutable_data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class EventRetrieveUpdateDestroyAPIView(APIView):
+class EventBulkCreateAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        rows = request.data
+        if isinstance(rows, list):
+            rows = read_json(rows)
+        elif not isinstance(rows, GeneratorType):
+            # anything but an array, or NDJSONParser's lazily read lines
+            return Response({'error': 'Expected a JSON array or NDJSON'}, status=status.HTTP_400_BAD_REQUEST)
+        result = import_events(rows, request.user)
+        if not result.error_count:
+            response_status = status.HTTP_201_CREATED
+        elif result.created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(), status=response_status)
+
+
+class EventExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request, fmt):
+        return streaming_export(EVENT_COLUMNS, event_rows(), fmt, 'events')
+
+
+class EventAttendeesExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request, pk, fmt):
+        event = get_object_or_404(Event.objects.only('id', 'organizer_id'), pk=pk)
+        if event.organizer_id != request.user.pk:
+            return Response({'error': 'You are not the organizer of this event'}, status=status.HTTP_403_FORBIDDEN)
+        return streaming_export(ATTENDEE_COLUMNS, attendee_rows(event.pk), fmt, f'event-{event.pk}-attendees')
+
+
+def occurrence_param(request):
+    """
+    The ``?occurrence=`` a registration for a recurring event names by its
+    start, or None; raises ``ValidationError`` if it isn't a time.
+    """
+    value = request.GET.get('occurrence')
+    if value is None:
+        return None
+    try:
+        return serializers.DateTimeField().to_internal_value(value)
+    except serializers.ValidationError as e:
+        raise serializers.ValidationError({'occurrence': e.detail})
+
+
+def sign_up(event, user, start=None):
+    """
+    Register ``user`` for ``event``, or its occurrence at ``start``, and
+    queue the confirmation email; returns the response body and status code.
+    """
+    if event.organizer_id == user.pk:
+        return {'message': "Organizers cannot be attendees"}, status.HTTP_400_BAD_REQUEST
+    try:
+        subject = 'Event Registration Confirmation'
+        message = f'You have successfully registered for the event "{event.title}".'
+        if start is not None:
+            message = (f'You have successfully registered for the event "{event.title}" '
+                       f'on {start:%Y-%m-%d %H:%M %Z}.')
+        recipient_list = [user.username]
+        from_email = "Eventsapp@gmail.com"
+        with transaction.atomic():
+            register_attendee(event, user, start)
+            enqueue_email(subject, message, from_email, recipient_list)
+
+        return {'message': 'You have successfully registered for the event'}, status.HTTP_201_CREATED
+    except RegistrationError as e:
+        return {'message': e.message}, status.HTTP_400_BAD_REQUEST
+    except Exception as e:
+        return {'error': str(e)}, status.HTTP_400_BAD_REQUEST
+
+
+class RegistrationMixin:
+    # signing up takes a row lock on the event, so it gets the stricter limit
+    throttle_scopes = {'POST': 'register'}
+
+    def register(self, request, event):
+        data, status_code = sign_up(event, request.user, occurrence_param(request))
+        return Response(data, status=status_code)
+
+
+class EventRetrieveUpdateDestroyAPIView(RegistrationMixin, APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'events'
 
     def get_object(self, pk):
         return get_object_or_404(Event, pk=pk)
 
+    @reads_from_replica
     def get(self, request, pk):
-        event = self.get_object(pk)
-        serializer = EventSerializer(event)
-        return Response(serializer.data)
+        names = EventSerializer.field_names(request)
+        variant = detail_variant(names)
+        # the writer's own reads skip copies a lagging replica may have cached since the write
+        version, entry = event_cache.get(pk, variant, skip=reads_own_writes())
+        if entry is not None:
+            etag, last_modified, data = entry
+            return not_modified(request, etag, last_modified) or set_validators(Response(data), etag, last_modified)
+
+        event = get_object_or_404(Event, pk=pk)
+        etag, last_modified = make_validators(event.updated_at, pk, variant)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        if 'attendees' in names:
+            prefetch_related_objects([event], ATTENDEE_IDS)
+        with measure():
+            data = EventSerializer(event, context={'request': request}).data
+        # a replica's copy may be behind, so it isn't kept for long
+        event_cache.set(pk, variant, version, (etag, last_modified, data), timeout=replica_timeout())
+        return set_validators(Response(data), etag, last_modified)
 
     def post(self, request, pk):
-        event = self.get_object(pk)
-        if event.organizer != request.user:
-            try:
-                if request.user in event.attendees.all():
-                    return Response({'message': "You are already registered for this event"},
-                                    status=status.HTTP_400_BAD_REQUEST)
-                event.attendees.add(request.user)
-                subject = 'Event Registration Confirmation'
-                message = f'You have successfully registered for the event "{event.title}".'
-                recipient_list = [request.user.username]
-                from_email = "Eventsapp@gmail.com"
-                send_mail(subject, message, from_email, recipient_list)
-
-                return Response({'message': 'You have successfully registered for the event'},
-                                status=status.HTTP_201_CREATED)
-            except Exception as e:
-                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            return Response({'message': "Organizers cannot be attendees"}, status=status.HTTP_400_BAD_REQUEST)
+        return self.register(request, self.get_object(pk))
 
     def put(self, request, pk):
         event = self.get_object(pk)
-        if event.organizer != request.user:
+        if event.organizer_id != request.user.pk:
             return Response({'error': 'You are not the organizer of this event'}, status=status.HTTP_403_FORBIDDEN)
         mutable_data = request.data.copy()
         mutable_data.pop('organizer', None)
-        serializer = EventSerializer(event, data=mutable_data)
+        serializer = EventSerializer(event, data=mutable_data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -83,12 +247,12 @@ class EventRetrieveUpdateDestroyAPIView(APIView):
 
     def patch(self, request, pk):
         event = self.get_object(pk)
-        if event.organizer != request.user:
+        if event.organizer_id != request.user.pk:
             return Response({'error': 'You are not the organizer of this event'}, status=status.HTTP_403_FORBIDDEN)
 
         mutable_data = request.data.copy()
         mutable_data.pop('organizer', None)
-        serializer = EventSerializer(event, data=mutable_data, partial=True)
+        serializer = EventSerializer(event, data=mutable_data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -97,4 +261,96 @@ class EventRetrieveUpdateDestroyAPIView(APIView):
     def delete(self, request, pk):
         event = self.get_object(pk)
         event.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class EventRegistrationAPIView(RegistrationMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'register'
+
+    def post(self, request, pk):
+        return self.register(request, get_object_or_404(Event, pk=pk))
+
+    def delete(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+        try:
+            unregister_attendee(event, request.user, occurrence_param(request))
+        except RegistrationError as e:
+            return Response({'message': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class EventOccurrenceListAPIView(APIView):
+    """
+    The occurrences of an event between ``date_from`` and ``date_to``,
+    expanded from its rule for that window only.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'events'
+
+    @reads_from_replica
+    def get(self, request, pk):
+        window = OccurrenceWindow(data=request.GET.dict())
+        window.is_valid(raise_exception=True)
+        event = get_object_or_404(Event, pk=pk)
+        occurrences = event.occurrences_between(window.validated_data['date_from'], window.validated_data['date_to'])
+        with measure():
+            data = OccurrenceSerializer(occurrences, many=True).data
+        return Response(data)
+
+
+class EventOccurrenceAPIView(APIView):
+    """
+    Lets the organizer of a recurring event move or cancel one occurrence,
+    named by its start as the rule gives it.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'events'
+
+    def patch(self, request, pk, start):
+        event = get_object_or_404(Event, pk=pk)
+        if event.organizer_id != request.user.pk:
+            return Response({'error': 'You are not the organizer of this event'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            start = serializers.DateTimeField().to_internal_value(start)
+        except serializers.ValidationError:
+            return Response({'error': 'Not an occurrence of this event'}, status=status.HTTP_404_NOT_FOUND)
+        if not event.recurrence or not event.rule.contains(event.date, start):
+            return Response({'error': 'Not an occurrence of this event'}, status=status.HTTP_404_NOT_FOUND)
+        occurrence = (Occurrence.objects.filter(event=event, start=start).first()
+                      or Occurrence(event=event, start=start, date=start))
+        serializer = OccurrenceSerializer(occurrence, data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class OrganizerStatsAPIView(APIView):
+    """
+    Dashboard of the requesting user's events: totals, registrations per
+    day and a page of per-event figures (see ``api.stats``), paged with
+    ``offset`` and ``page_size`` and sorted by ``ordering``.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'events'
+
+    @reads_from_replica
+    def get(self, request):
+        params = StatsParamsSerializer(data=request.GET.dict())
+        params.is_valid(raise_exception=True)
+        ordering, offset = params.validated_data['ordering'], params.validated_data['offset']
+        limit = KeysetPagination().get_page_size(request)
+        data, has_more = cached_organizer_stats(request.user.pk, ordering, offset, limit)
+
+        url = request.build_absolute_uri()
+        links = []
+        if has_more:
+            links.append('<%s>; rel="next"' % replace_query_param(url, 'offset', offset + limit))
+        if offset:
+            links.append('<%s>; rel="prev"' % replace_query_param(url, 'offset', max(offset - limit, 0)))
+        return Response(data, headers={'Link': ', '.join(links)} if links else None)
+
+
+def metrics_view(request):
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AuthToken
+
+
+@admin.register(AuthToken)
+class AuthTokenAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'created_at', 'expires_at']
+    search_fields = ['user__email', 'name']
+    raw_id_fields = ['user']
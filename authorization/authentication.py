@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import AuthToken, hash_token
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(key_hash):
+    return f'auth-token:{key_hash}'
+
+
+def forget_tokens(key_hashes):
+    """
+    Drop cached lookups, e.g. after a token is revoked or its user changes.
+    """
+    _cache().delete_many([_cache_key(key_hash) for key_hash in key_hashes])
+
+
+class BearerTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <key>`` with keys issued by ``AuthToken.issue``.
+
+    A request costs one cache read, or on a miss one indexed lookup by the
+    key's hash that also loads the user.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        return self.authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        key_hash = hash_token(key)
+        cache = _cache()
+        cached = cache.get(_cache_key(key_hash))
+        if cached is None:
+            try:
+                token = AuthToken.objects.select_related('user').get(key_hash=key_hash)
+            except AuthToken.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            cached = (token.user, token.expires_at)
+            remaining = (token.expires_at - timezone.now()).total_seconds()
+            timeout = min(getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300), remaining)
+            if timeout > 0:
+                cache.set(_cache_key(key_hash), cached, timeout=timeout)
+
+        user, expires_at = cached
+        if expires_at <= timezone.now():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return user, key_hash
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+
+
+def forget_users(user_ids):
+    """
+    Drop cached users, e.g. after they are saved or deleted.
+    """
+    _cache().delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` with its users cached for AUTH_USER_CACHE_TIMEOUT
+    seconds. ``get_user`` is what ``AuthenticationMiddleware`` runs to turn
+    a session into ``request.user``, so with the session in the cache too an
+    authenticated request needs no query before the view.
+
+    Saving or deleting a user drops the copy (see ``authorization.signals``);
+    ``QuerySet.update()`` sends no signal, so a user changed that way is
+    stale until the timeout.
+    """
+
+    def get_user(self, user_id):
+        cache = _cache()
+        user = cache.get(_cache_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(_cache_key(user_id), user, timeout=_timeout())
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        cache = _cache()
+        user = await cache.aget(_cache_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(_cache_key(user_id), user, timeout=_timeout())
+        return user if self.user_can_authenticate(user) else None
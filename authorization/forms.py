@@ -1,5 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 
 from authorization.models import CustomUser
 
@@ -22,9 +24,32 @@ class SignupForm(UserCreationForm):
             else:
                 self.fields[field].widget.attrs['placeholder'] = field.title
 
+    def validate_unique(self):
+        # a taken email is caught by the insert in save() instead of a query beforehand
+        exclude = self._get_validation_exclusions()
+        exclude.add('email')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except forms.ValidationError as e:
+            self._update_errors(e)
+
     def save(self, commit=True):
+        """
+        Create the user with one INSERT. Returns None, with the error added
+        to the form, if the email is already taken.
+        """
         user = super(SignupForm, self).save(commit=False)
         user.username = user.email = self.cleaned_data['email']
+        # the login that follows signup would otherwise save the user again
+        user.last_login = timezone.now()
+        user.last_login_saved = True
         if commit:
-            user.save()
-            return user
+            try:
+                with transaction.atomic():
+                    user.save()
+            except IntegrityError:
+                if not CustomUser.objects.filter(email=user.email).exists():
+                    raise
+                self.add_error('email', user.unique_error_message(CustomUser, ['email']))
+                return None
+        return user
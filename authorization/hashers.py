@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2 hasher with the iteration count taken from
+    PASSWORD_HASH_ITERATIONS, to fit the CPU each signup and login may
+    spend (``scripts/bench_signup.py`` times a hash).
+
+    Hashes keep the ``pbkdf2_sha256`` name, so existing ones still verify,
+    and one made with another count is redone when its user next logs in.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
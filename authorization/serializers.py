@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import AuthToken
+
+
+class AuthTokenSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuthToken
+        fields = ['id', 'name', 'created_at', 'expires_at']
+
+
+class IssueTokenSerializer(serializers.Serializer):
+    """
+    Credentials are only needed when the request isn't authenticated yet.
+    """
+    email = serializers.EmailField(required=False)
+    password = serializers.CharField(required=False, trim_whitespace=False, write_only=True)
+    name = serializers.CharField(required=False, allow_blank=True, max_length=100, default='')
+    expires_in = serializers.IntegerField(required=False, min_value=60,
+                                          help_text='Lifetime in seconds, at most AUTH_TOKEN_LIFETIME')
+
+    def validate_expires_in(self, value):
+        return min(timedelta(seconds=value), settings.AUTH_TOKEN_LIFETIME)
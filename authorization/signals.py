@@ -0,0 +1,47 @@
+from django.contrib.auth import models as auth_models
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_tokens
+from .backends import forget_users
+from .models import AuthToken, CustomUser
+
+
+def forget_now_and_on_commit(forget, keys, using):
+    # again on commit, in case a request cached the lookup while the change was in flight
+    keys = list(keys)
+    if keys:
+        forget(keys)
+        transaction.on_commit(lambda: forget(keys), using=using)
+
+
+@receiver(post_delete, sender=AuthToken)
+def token_revoked(sender, instance, using, **kwargs):
+    forget_now_and_on_commit(forget_tokens, [instance.key_hash], using)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, created, using, **kwargs):
+    # cached lookups hold a copy of the user, e.g. with a stale is_active or password;
+    # a new user's id may have been cached by a transaction that was rolled back
+    forget_now_and_on_commit(forget_users, [instance.pk], using)
+    if not created:
+        forget_now_and_on_commit(forget_tokens, instance.auth_tokens.values_list('key_hash', flat=True), using)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, using, **kwargs):
+    forget_now_and_on_commit(forget_users, [instance.pk], using)
+
+
+# instead of django.contrib.auth's, which saves the user on every login
+user_logged_in.disconnect(dispatch_uid='update_last_login')
+
+
+@receiver(user_logged_in, dispatch_uid='update_last_login')
+def update_last_login(sender, request, user, **kwargs):
+    # SignupForm has just created the user with it
+    if not getattr(user, 'last_login_saved', False):
+        auth_models.update_last_login(sender, user, **kwargs)
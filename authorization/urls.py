@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('registration/', views.user_registration, name='registration'),
-]
\ No newline at end of file
+    path('tokens/', views.TokenListCreateAPIView.as_view(), name='token-list'),
+    path('tokens/<int:pk>/', views.TokenDestroyAPIView.as_view(), name='token-detail'),
+]
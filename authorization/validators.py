@@ -0,0 +1,37 @@
+import functools
+import gzip
+
+from django.contrib.auth import password_validation
+
+
+@functools.lru_cache(maxsize=None)
+def load_passwords(path):
+    """
+    The lowercased passwords in the list at ``path``, which may be gzipped,
+    read once per process whichever validators use it.
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return frozenset(line.strip() for line in lines)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """
+    Django's validator without its list read in ``__init__``: the list is
+    loaded at the first validation and shared by every instance, so
+    processes that never validate a password don't pay for it, nor does
+    rebuilding the validators.
+    """
+
+    def __init__(self, password_list_path=password_validation.CommonPasswordValidator.DEFAULT_PASSWORD_LIST_PATH):
+        if password_list_path is password_validation.CommonPasswordValidator.DEFAULT_PASSWORD_LIST_PATH:
+            password_list_path = self.DEFAULT_PASSWORD_LIST_PATH
+        self.password_list_path = str(password_list_path)
+
+    @property
+    def passwords(self):
+        return load_passwords(self.password_list_path)
@@ -1,9 +1,16 @@
-from django.contrib.auth import login
+from django.contrib.auth import authenticate, login
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from authorization.forms import SignupForm
+from authorization.models import AuthToken
+from authorization.serializers import AuthTokenSerializer, IssueTokenSerializer
 
 
 def user_registration(request):
@@ -11,10 +18,46 @@ def user_registration(request):
         form = SignupForm(request.POST)
         if form.is_valid():
             user = form.save()
-            login(request, user)
-            return HttpResponseRedirect(reverse('events-list'))
+            if user is not None:
+                login(request, user)
+                return HttpResponseRedirect(reverse('event-list'))
 
     else:
         form = SignupForm()
     context = {"form": form, 'title': 'Registration', 'button': 'Register'}
     return render(request, "registration.html", context)
+
+
+class TokenListCreateAPIView(APIView):
+    def get_permissions(self):
+        # issuing is how an API client logs in, so it takes credentials instead
+        if self.request.method == 'POST':
+            return [AllowAny()]
+        return [IsAuthenticated()]
+
+    def get(self, request):
+        tokens = request.user.auth_tokens.active().order_by('-created_at')
+        return Response(AuthTokenSerializer(tokens, many=True).data)
+
+    def post(self, request):
+        serializer = IssueTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        user = request.user
+        if not user.is_authenticated:
+            # the one password check; the token replaces it on later requests
+            user = authenticate(request, email=data.get('email'), password=data.get('password'))
+            if user is None:
+                return Response({'error': 'Invalid email or password'}, status=status.HTTP_400_BAD_REQUEST)
+        token, key = AuthToken.issue(user, name=data['name'], lifetime=data.get('expires_in'))
+        return Response(dict(AuthTokenSerializer(token).data, token=key), status=status.HTTP_201_CREATED)
+
+
+class TokenDestroyAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, pk):
+        token = get_object_or_404(AuthToken, pk=pk, user=request.user)
+        token.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
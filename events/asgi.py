@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'events.settings')
+# serve the event API from the async views instead of the thread-bound sync ones
+os.environ.setdefault('ROOT_URLCONF', 'events.urls_async')
 
 application = get_asgi_application()
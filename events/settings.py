@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import os
+from datetime import timedelta
 from pathlib import Path
 
 import dj_database_url
@@ -46,16 +47,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its wall time covers the rest of the stack
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'events.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'events.urls')
 
 TEMPLATES = [
     {
@@ -79,12 +83,84 @@ WSGI_APPLICATION = 'events.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before reuse, or with DB_POOL=true
+# (PostgreSQL with psycopg 3) taken from a pool in each process; see api.checks for the startup check
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+DB_POOL = os.getenv('DB_POOL', 'false').lower() == 'true'
+DB_POOL_OPTIONS = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    # seconds a request waits for a free connection before failing
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+}
+
+
+def database_config(url):
+    config = dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS)
+    if DB_POOL and config['ENGINE'] == 'django.db.backends.postgresql':
+        # the pool replaces persistent connections; Django refuses to use both
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS'] = dict(config.get('OPTIONS', {}), pool=DB_POOL_OPTIONS)
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.parse(os.environ.get('DATABASE_URL')),
+    'default': database_config(os.environ.get('DATABASE_URL')),
 }
+if os.getenv('TEST_DATABASE_NAME'):
+    # SQLite tests default to an in-memory database, which threads can't share;
+    # point this at a file to run the concurrency tests
+    DATABASES['default']['TEST'] = {'NAME': os.getenv('TEST_DATABASE_NAME')}
+
+# read replicas for the event list and detail, e.g. DATABASE_REPLICA_URLS="postgres://... postgres://..."
+DATABASE_REPLICAS = []
+for number, url in enumerate(os.getenv('DATABASE_REPLICA_URLS', '').split(), start=1):
+    DATABASES[f'replica{number}'] = dict(database_config(url), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# how long a user's reads stay on the primary after they write; should exceed the replication lag
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+# how long a replica that refused a connection is left out
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+EVENTS_CACHE_ALIAS = 'default'
+EVENTS_CACHE_TIMEOUT = int(os.getenv('EVENTS_CACHE_TIMEOUT', 300))
+# default and longest window recurring events are expanded for
+EVENTS_OCCURRENCE_DAYS = int(os.getenv('EVENTS_OCCURRENCE_DAYS', 90))
+EVENTS_OCCURRENCE_MAX_DAYS = int(os.getenv('EVENTS_OCCURRENCE_MAX_DAYS', 366))
+# organizer dashboards are not invalidated by writes, only expire
+ORGANIZER_STATS_CACHE_TIMEOUT = int(os.getenv('ORGANIZER_STATS_CACHE_TIMEOUT', 30))
+ORGANIZER_STATS_DAYS = int(os.getenv('ORGANIZER_STATS_DAYS', 30))
+ORGANIZER_STATS_MAX_OFFSET = int(os.getenv('ORGANIZER_STATS_MAX_OFFSET', 100000))
 
 AUTH_USER_MODEL = 'authorization.CustomUser'
 
+# sessions are read from the cache, falling back to the database table; with
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies they live in the cookie instead,
+# which needs no storage but can't be revoked before SESSION_COOKIE_AGE
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'default'
+
+# the session's user is cached too, so an authenticated request makes no query before the view
+AUTHENTICATION_BACKENDS = ['authorization.backends.CachedModelBackend']
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 300))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -97,20 +173,65 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        # loads the list of 20,000 passwords once per process, at the first signup
+        'NAME': 'authorization.validators.CommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
 
+PASSWORD_HASHERS = [
+    'authorization.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# CPU per signup and login; password hashes made with another count are redone at login
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 1_000_000))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        # instead of BasicAuthentication, which ran the password hasher on every request
+        'authorization.authentication.BearerTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # token buckets in THROTTLE_CACHE_ALIAS; shared by all workers when that cache is Redis
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.AnonThrottle',
+        'api.throttling.UserThrottle',
+        'api.throttling.EndpointThrottle',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON_RATE', '120/min'),
+        'user': os.getenv('THROTTLE_USER_RATE', '1200/min'),
+        'events': os.getenv('THROTTLE_EVENTS_RATE', '600/min'),
+        'register': os.getenv('THROTTLE_REGISTER_RATE', '30/min'),
+    },
 }
 
+THROTTLE_CACHE_ALIAS = 'default'
+
+# apps whose views RequestTimingMiddleware times, and the wall time from which it logs a request's SQL
+REQUEST_TIMING_APPS = ('api', 'authorization')
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1.0))
+# metrics are added up in each process and written to the cache at most this often
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 10))
+
+AUTH_TOKEN_LIFETIME = timedelta(days=int(os.getenv('AUTH_TOKEN_LIFETIME_DAYS', 30)))
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+
+EVENTS_PAGE_SIZE = int(os.getenv('EVENTS_PAGE_SIZE', 50))
+EVENTS_MAX_PAGE_SIZE = int(os.getenv('EVENTS_MAX_PAGE_SIZE', 500))
+# build list pages from .values() rows instead of running EventSerializer per event
+EVENTS_FAST_SERIALIZER = os.getenv('EVENTS_FAST_SERIALIZER', 'true').lower() == 'true'
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -141,5 +262,11 @@ EMAIL_PORT = 587
 EMAIL_HOST_USER = os.getenv('EMAIL_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_PASSWORD')
 
+# Registration emails are queued in the outbox and sent by `manage.py send_outbox`
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('OUTBOX_RETRY_BASE_SECONDS', 30))
+OUTBOX_RETRY_MAX_SECONDS = int(os.getenv('OUTBOX_RETRY_MAX_SECONDS', 3600))
+
 
 
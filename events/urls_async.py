@@ -0,0 +1,13 @@
+"""
+URL configuration for the ASGI deployment (events.asgi).
+
+The hot event endpoints are routed to the native async views in
+api.async_views; every other URL falls through to events.urls.
+"""
+from django.urls import path, include
+
+from . import urls
+
+urlpatterns = [
+    path('api/', include('api.urls_async')),
+] + urls.urlpatterns
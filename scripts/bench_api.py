@@ -0,0 +1,205 @@
+"""
+Throughput and latency percentiles of the event API over HTTP, printed as
+JSON so runs can be compared across commits:
+    python manage.py seed_events --users 100000 --events 1000000 --attendances 5000000
+    python manage.py runscript bench_api --script-args http://localhost:8000 2000 50 > bench.json
+
+Arguments are the base URL, the number of requests per scenario, the
+number of concurrent clients and optionally the scenarios to run (list,
+search, detail, register, update; all by default). Each client is one of
+the seeded users with a bearer token, and updates are sent by the event's
+organizer, so the script needs the same database as the server. The
+requests come from a fixed seed, so runs against the same dataset send
+the same requests; registrations and tokens made by a run are removed
+at the end.
+
+Clients are rate limited like any other; start the server with higher
+THROTTLE_USER_RATE, THROTTLE_EVENTS_RATE and THROTTLE_REGISTER_RATE to
+measure the views rather than the 429 responses, which are counted under
+"throttled".
+"""
+import http.client
+import json
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from api.models import Event
+from api.registration import RegistrationError, unregister_attendee
+from api.synthetic import LOCATIONS, WORDS
+from authorization.models import AuthToken, CustomUser
+
+SCENARIOS = ['list', 'search', 'detail', 'register', 'update']
+SEEDED_USERS = 'seed-user'
+# untimed requests per read scenario, so caches and the search index are warm
+WARMUP = 20
+PERCENTILES = [50, 90, 95, 99]
+
+
+def sample_events(count, rng):
+    """
+    ``(id, organizer_id, title)`` of up to ``count`` random events.
+    """
+    bounds = Event.objects.aggregate(low=Min('id'), high=Max('id'))
+    candidates = {rng.randint(bounds['low'], bounds['high']) for _ in range(count * 2)}
+    events = list(Event.objects.filter(pk__in=candidates).order_by('id').values_list('id', 'organizer_id', 'title'))
+    return events[:count]
+
+
+def bearer(key):
+    return {'Authorization': f'Bearer {key}'}
+
+
+def make_requests(scenario, count, events, client_keys, organizer_keys, rng):
+    """
+    ``(method, path, headers, body)`` for ``count`` requests of ``scenario``.
+    """
+    requests = []
+    for i in range(count):
+        headers = bearer(client_keys[i % len(client_keys)])
+        event_id, organizer_id, title = rng.choice(events)
+        if scenario == 'list':
+            params = rng.choice([{}, {'location': rng.choice(LOCATIONS)}, {'ordering': '-attendee_count'},
+                                 {'upcoming': 'true'}])
+            requests.append(('GET', f'/api/events/?{urlencode(dict(page_size=50, **params))}', headers, None))
+        elif scenario == 'search':
+            search = ' '.join(rng.sample(WORDS, rng.randint(1, 2)))
+            requests.append(('GET', f'/api/events/?{urlencode({"search": search})}', headers, None))
+        elif scenario == 'detail':
+            requests.append(('GET', f'/api/events/{event_id}/', headers, None))
+        elif scenario == 'register':
+            requests.append(('POST', f'/api/events/{event_id}/registration/', headers, None))
+        elif scenario == 'update':
+            # the same title again: a real write, but the dataset stays as it was
+            requests.append(('PATCH', f'/api/events/{event_id}/',
+                             dict(bearer(organizer_keys[organizer_id]), **{'Content-Type': 'application/json'}),
+                             json.dumps({'title': title})))
+    return requests
+
+
+def send_all(base_url, requests, clients):
+    target = urlsplit(base_url)
+    local = threading.local()
+
+    def send(request):
+        method, path, headers, body = request
+        if not hasattr(local, 'connection'):
+            local.connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+        started = time.perf_counter()
+        try:
+            local.connection.request(method, path, body=body, headers=headers)
+            response = local.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            del local.connection
+            status = None
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(send, requests))
+    return time.perf_counter() - started, results
+
+
+def percentile(ordered, p):
+    # nearest rank
+    return ordered[min(len(ordered) - 1, max(0, round(len(ordered) * p / 100) - 1))]
+
+
+def summarize(elapsed, results):
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    statuses = Counter(status for _, status in results)
+    return {
+        'requests': len(results),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(results) / elapsed, 1),
+        'latency_ms': dict({f'p{p}': round(percentile(latencies, p), 2) for p in PERCENTILES},
+                           mean=round(statistics.fmean(latencies), 2), max=round(latencies[-1], 2)),
+        'status': {str(status): n for status, n in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        'errors': sum(n for status, n in statuses.items() if status is None or status >= 500),
+        'throttled': statuses[429],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def clean_up(registrations, tokens):
+    for event_id, user_id in registrations:
+        try:
+            unregister_attendee(Event.objects.get(pk=event_id), CustomUser.objects.get(pk=user_id))
+        except (Event.DoesNotExist, RegistrationError):
+            pass
+    AuthToken.objects.filter(pk__in=[token.pk for token in tokens]).delete()
+
+
+def run(*args):
+    base_url = next((arg for arg in args if '://' in arg), 'http://localhost:8000')
+    numbers = [int(arg) for arg in args if arg.isdigit()]
+    count, clients = (numbers + [2000, 50][len(numbers):])[:2]
+    scenarios = [arg for arg in args if arg in SCENARIOS] or SCENARIOS
+
+    rng = random.Random(0)
+    users = list(CustomUser.objects.filter(email__startswith=SEEDED_USERS).order_by('id')[:clients])
+    if not users or not Event.objects.exists():
+        print('No seeded dataset; run "manage.py seed_events" first', file=sys.stderr)
+        return
+    events = sample_events(min(count, 1000), rng)
+
+    tokens = []
+
+    def issue(user):
+        token, key = AuthToken.issue(user, name='bench_api')
+        tokens.append(token)
+        return key
+
+    client_keys = [issue(user) for user in users]
+    organizer_keys = {}
+    if 'update' in scenarios:
+        for organizer in CustomUser.objects.filter(pk__in={organizer_id for _, organizer_id, _ in events}):
+            organizer_keys[organizer.pk] = issue(organizer)
+    users_by_key = {key: user.pk for key, user in zip(client_keys, users)}
+
+    report = {
+        'commit': git_commit(),
+        'date': timezone.now().isoformat(),
+        'base_url': base_url,
+        'database': connection.vendor,
+        'dataset': {'users': CustomUser.objects.count(), 'events': Event.objects.count(),
+                    'attendances': Event.attendees.through.objects.count()},
+        'requests': count,
+        'concurrency': clients,
+        'scenarios': {},
+    }
+    registrations = []
+    try:
+        for scenario in scenarios:
+            requests = make_requests(scenario, count, events, client_keys, organizer_keys, rng)
+            if scenario in ('list', 'search', 'detail'):
+                send_all(base_url, requests[:WARMUP], clients)
+            elapsed, results = send_all(base_url, requests, clients)
+            report['scenarios'][scenario] = summarize(elapsed, results)
+            if scenario == 'register':
+                registrations = [(int(path.split('/')[3]), users_by_key[headers['Authorization'].split()[1]])
+                                 for (_, path, headers, _), (_, status) in zip(requests, results) if status == 201]
+    finally:
+        clean_up(registrations, tokens)
+    print(json.dumps(report, indent=2))
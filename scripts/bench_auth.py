@@ -0,0 +1,80 @@
+"""
+Per-request authentication cost: HTTP Basic (a full password hash each
+time) against bearer tokens, with and without the cached lookup, and
+sessions, from the session to ``request.user`` as
+``AuthenticationMiddleware`` does it, for each session engine and user
+backend.
+
+Runs against a throwaway test database:
+    python manage.py runscript bench_auth --script-args 200
+"""
+import base64
+import statistics
+import time
+from importlib import import_module
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpRequest
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.test import APIRequestFactory
+
+from authorization.authentication import BearerTokenAuthentication
+from authorization.models import AuthToken, CustomUser
+
+
+def median_ms(authentication, header, repeat, before=None):
+    request = APIRequestFactory().get('/api/events/', HTTP_AUTHORIZATION=header)
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        user, _ = authentication.authenticate(request)
+        samples.append((time.perf_counter() - started) * 1000)
+    assert user.email == 'bench@example.com'
+    return statistics.median(samples)
+
+
+def session_ms(engine, backend, user, repeat):
+    with override_settings(SESSION_ENGINE=engine, AUTHENTICATION_BACKENDS=[backend]):
+        store = import_module(engine).SessionStore()
+        store.update({SESSION_KEY: str(user.pk), BACKEND_SESSION_KEY: backend,
+                      HASH_SESSION_KEY: user.get_session_auth_hash()})
+        store.save()
+        samples = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                request = HttpRequest()
+                request.session = import_module(engine).SessionStore(store.session_key)
+                request_user = get_user(request)
+                samples.append((time.perf_counter() - started) * 1000)
+        assert request_user.pk == user.pk
+        return statistics.median(samples), len(queries) / repeat
+
+
+def run(*args):
+    repeat = int(args[0]) if args else 200
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = CustomUser.objects.create_user(email='bench@example.com', password='bench-password')
+        _, key = AuthToken.issue(user)
+        basic = 'Basic ' + base64.b64encode(b'bench@example.com:bench-password').decode()
+        bearer = f'Bearer {key}'
+        print(f'{"scheme":<22} {"median ms":>10}')
+        print(f'{"basic":<22} {median_ms(BasicAuthentication(), basic, repeat):>10.3f}')
+        print(f'{"bearer, cache miss":<22} '
+              f'{median_ms(BearerTokenAuthentication(), bearer, repeat, before=cache.clear):>10.3f}')
+        print(f'{"bearer, cache hit":<22} {median_ms(BearerTokenAuthentication(), bearer, repeat):>10.3f}')
+
+        print(f'\n{"session":<22} {"user backend":<20} {"median ms":>10} {"queries":>8}')
+        for engine in ('db', 'cached_db', 'signed_cookies'):
+            for backend in ('django.contrib.auth.backends.ModelBackend', 'authorization.backends.CachedModelBackend'):
+                median, queries = session_ms(f'django.contrib.sessions.backends.{engine}', backend, user, repeat)
+                print(f'{engine:<22} {backend.rsplit(".", 1)[1]:<20} {median:>10.3f} {queries:>8.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
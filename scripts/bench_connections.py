@@ -0,0 +1,61 @@
+"""
+Per-request cost of getting a database connection: a new connection for
+every request (DB_CONN_MAX_AGE=0), a persistent one with health checks,
+and, on PostgreSQL with psycopg 3, one from a pool (DB_POOL):
+    python manage.py runscript bench_connections --script-args 500
+
+Each request is simulated by Django's request_started and
+request_finished signals, which open and close connections as a real
+request does, around one small query against the configured database.
+"""
+import importlib.util
+import statistics
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+def bench(alias, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request_started.send(sender=None)
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        request_finished.send(sender=None)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def run(*args):
+    repeat = int(args[0]) if args else 500
+    base = connections.settings['default']
+    options = {key: value for key, value in base.get('OPTIONS', {}).items() if key != 'pool'}
+    modes = {
+        'new connection': dict(base, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False, OPTIONS=options),
+        'persistent': dict(base, CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True, OPTIONS=options),
+    }
+    if base['ENGINE'] == 'django.db.backends.postgresql' and importlib.util.find_spec('psycopg_pool'):
+        modes['pool'] = dict(base, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False,
+                             OPTIONS=dict(options, pool={'min_size': 1, 'max_size': 2}))
+    else:
+        print('No pool: it needs PostgreSQL and psycopg 3 with psycopg-pool')
+
+    print(f'{repeat} requests against {base["ENGINE"].rsplit(".", 1)[-1]}')
+    print(f'{"connections":<16} {"p50 ms":>8} {"p99 ms":>8}')
+    for name, config in modes.items():
+        alias = f'bench_{name.replace(" ", "_")}'
+        connections.settings[alias] = config
+        try:
+            bench(alias, 10)
+            p50, p99 = bench(alias, repeat)
+            print(f'{name:<16} {p50:>8.3f} {p99:>8.3f}')
+        finally:
+            connections[alias].close()
+            if config['OPTIONS'].get('pool'):
+                connections[alias].close_pool()
+            del connections[alias]
+            del connections.settings[alias]
@@ -0,0 +1,56 @@
+"""
+Serialization time of an event list page with EventListSerializer against
+the .values() fast path, rendering included and the database left out.
+
+Runs against a throwaway test database:
+    python manage.py runscript bench_fast_serializer --script-args 100 1000 10000
+"""
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import FastEventListSerializer
+from api.models import Event
+from api.serializers import EventListSerializer
+from api.synthetic import make_events, make_organizers
+
+REPEAT = 10
+
+
+def median_ms(func):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(*args):
+    sizes = [int(size) for size in args] or [100, 1000, 10000]
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        make_events(max(sizes), make_organizers(10))
+        names = EventListSerializer.field_names(None)
+        fast = FastEventListSerializer(EventListSerializer, names)
+        renderer = JSONRenderer()
+        print(f'{"rows":>6} {"serializer ms":>14} {"fast path ms":>13} {"speedup":>8}')
+        for size in sizes:
+            instances = list(Event.objects.only(*EventListSerializer.columns(names))[:size])
+            rows = list(Event.objects.values(*fast.columns)[:size])
+
+            def drf():
+                return renderer.render(EventListSerializer(instances, many=True).data)
+
+            def fast_path():
+                return renderer.render(fast.to_representation(rows))
+
+            assert drf() == fast_path()
+            slow_ms, fast_ms = median_ms(drf), median_ms(fast_path)
+            print(f'{size:>6} {slow_ms:>14.2f} {fast_ms:>13.2f} {slow_ms / fast_ms:>7.1f}x')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
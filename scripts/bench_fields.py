@@ -0,0 +1,55 @@
+"""
+Payload size and time per 1k events for the list representations: the
+full serializer, the compact list default and a sparse ?fields= calendar
+view.
+
+Runs against a throwaway test database:
+    python manage.py runscript bench_fields --script-args 20
+"""
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.synthetic import make_events, make_organizers
+from api.views import EventListCreateAPIView
+from authorization.models import CustomUser
+
+PAGE_SIZE = 1000
+VARIANTS = [
+    ('full', {'fields': 'id,title,description,date,location,organizer,capacity,attendee_count,seats_remaining'}),
+    ('compact (default)', {}),
+    ('fields=id,title,date', {'fields': 'id,title,date'}),
+]
+
+
+def measure(view, user, params, repeat):
+    factory = APIRequestFactory()
+    samples = []
+    for _ in range(repeat):
+        request = factory.get('/api/events/', dict(params, page_size=PAGE_SIZE))
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = view(request)
+        response.render()
+        samples.append((time.perf_counter() - started) * 1000)
+    return len(response.content), statistics.median(samples)
+
+
+def run(*args):
+    repeat = int(args[0]) if args else 20
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        organizer_ids = make_organizers(10)
+        make_events(PAGE_SIZE, organizer_ids)
+        user = CustomUser.objects.get(pk=organizer_ids[0])
+        view = EventListCreateAPIView.as_view()
+        print(f'{"representation":<24} {"bytes/1k":>10} {"ms/1k":>8}')
+        for name, params in VARIANTS:
+            size, ms = measure(view, user, params, repeat)
+            print(f'{name:<24} {size:>10} {ms:>8.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
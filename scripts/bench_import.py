@@ -0,0 +1,39 @@
+"""
+Throughput of the bulk import path in events per second.
+
+Runs against a throwaway test database:
+    python manage.py runscript bench_import --script-args 100000 1000
+"""
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from api.importing import import_events
+from api.models import Event
+from authorization.models import CustomUser
+
+
+def make_rows(count):
+    start = timezone.now() + timedelta(days=1)
+    for i in range(count):
+        yield {'title': f'Imported event {i}', 'description': 'Loaded by bench_import',
+               'location': 'Kyiv', 'date': (start + timedelta(minutes=i)).isoformat()}
+
+
+def run(*args):
+    count, chunk_size = (list(map(int, args)) + [100000, 1000][len(args):])[:2]
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        organizer = CustomUser.objects.create(email='import@example.com', username='import@example.com')
+        started = time.perf_counter()
+        result = import_events(make_rows(count), organizer, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+        assert Event.objects.count() == result.created == count, result.as_dict()
+        print(f'{count} events in chunks of {chunk_size}, {connection.vendor}: '
+              f'{elapsed:.2f}s ({count / elapsed:.0f} events/s)')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
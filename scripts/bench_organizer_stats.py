@@ -0,0 +1,76 @@
+"""
+Organizer dashboard for an organizer with many events (10,000 by
+default): the SQL aggregates of ``api.stats``, uncached and cached,
+against what a client paging through the events and counting attendees
+had to load:
+    python manage.py runscript bench_organizer_stats --script-args 10000 200000
+
+Runs against a throwaway test database.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from api.models import Event
+from api.signals import recount_attendees
+from api.stats import cached_organizer_stats, organizer_stats
+from api.synthetic import make_attendance, make_events, make_organizers
+
+
+def client_side(organizer_id):
+    # every event with its attendee ids, as the paged event list gave them
+    now = timezone.now()
+    events = list(Event.objects.filter(organizer_id=organizer_id).with_attendees().order_by('date', 'id'))
+    attendees = sum(len(event.attendees.all()) for event in events)
+    upcoming = sum(event.date >= now for event in events)
+    return {'events': len(events), 'upcoming': upcoming, 'attendees': attendees}
+
+
+def bench(func, repeat, before=None):
+    samples = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            if before:
+                before()
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), len(queries) / repeat
+
+
+def run(*args):
+    event_count = int(args[0]) if args else 10000
+    attendances = int(args[1]) if len(args) > 1 else 20 * event_count
+    repeat = int(args[2]) if len(args) > 2 else 20
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        organizer_id, = make_organizers(1, prefix='bench-organizer')
+        user_ids = make_organizers(1000, prefix='bench-attendee')
+        # a year of events, half of them already past
+        make_events(event_count, [organizer_id], start=timezone.now() - timedelta(days=182), capacity_share=0.5)
+        events = list(Event.objects.values_list('id', 'organizer_id', 'capacity'))
+        make_attendance(events, user_ids, attendances, signup_days=30)
+        recount_attendees(Event.objects.all())
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        data, _ = organizer_stats(organizer_id)
+        assert data['totals']['attendees'] == client_side(organizer_id)['attendees']
+        print(f'{event_count} events, {data["totals"]["attendees"]} attendees')
+        print(f'{"dashboard":<22} {"median ms":>10} {"queries":>8}')
+        for name, func, before in [
+            ('client side', lambda: client_side(organizer_id), None),
+            ('sql aggregates', lambda: cached_organizer_stats(organizer_id), cache.clear),
+            ('sql aggregates, cached', lambda: cached_organizer_stats(organizer_id), None),
+        ]:
+            median, queries = bench(func, repeat, before)
+            print(f'{name:<22} {median:>10.2f} {queries:>8.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
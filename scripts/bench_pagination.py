@@ -0,0 +1,59 @@
+"""
+Page latency of the event list as the table grows.
+
+Runs against a throwaway test database:
+    python manage.py runscript bench_pagination --script-args 1000 100000 1000000
+"""
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Event
+from api.pagination import KeysetPagination
+from api.synthetic import make_events, make_organizers
+from api.views import EventListCreateAPIView
+from authorization.models import CustomUser
+
+REPEAT = 20
+
+
+def time_page(view, user, params):
+    factory = APIRequestFactory()
+    samples = []
+    for _ in range(REPEAT):
+        request = factory.get('/api/events/', params)
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = view(request)
+        response.render()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(*args):
+    sizes = [int(size) for size in args] or [1000, 10000, 100000, 1000000]
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        organizer_ids = make_organizers(100)
+        user = CustomUser.objects.get(pk=organizer_ids[0])
+        view = EventListCreateAPIView.as_view()
+        print(f'{"events":>10} {"first page ms":>14} {"deep page ms":>14}')
+        for size in sorted(sizes):
+            make_events(size - Event.objects.count(), organizer_ids, seed=size)
+            first_ms = time_page(view, user, {})
+            # seek to the middle of the table to show the cost doesn't depend on depth
+            middle = Event.objects.order_by('date', 'id')[size // 2]
+            deep_ms = time_page(view, user, {'cursor': _cursor_for(middle)})
+            print(f'{size:>10} {first_ms:>14.2f} {deep_ms:>14.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def _cursor_for(event):
+    paginator = KeysetPagination()
+    paginator.base_url = 'http://testserver/api/events/'
+    return paginator.encode_cursor(event, reverse=False).split('cursor=')[1]
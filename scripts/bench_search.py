@@ -0,0 +1,59 @@
+"""
+Search latency of the full-text backend against the old icontains filter.
+
+Runs against a throwaway test database; on PostgreSQL this measures the
+GIN-indexed search_vector, elsewhere the in-process inverted index:
+    python manage.py runscript bench_search --script-args 1000000
+"""
+import statistics
+import time
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment
+
+from api.models import Event
+from api.search import get_search_backend
+from api.synthetic import make_events, make_organizers
+
+QUERIES = ['yoga', 'tech conf', 'kyiv', 'music festival lviv', 'nonexistent']
+REPEAT = 10
+PAGE_SIZE = 50
+
+
+def icontains(text):
+    return list(Event.objects.filter(Q(title__icontains=text) |
+                                     Q(location__icontains=text)).distinct().order_by('date', 'id')[:PAGE_SIZE])
+
+
+def full_text(text):
+    return list(get_search_backend().search(Event.objects.all(), text).order_by('-rank', 'date', 'id')[:PAGE_SIZE])
+
+
+def median_ms(func, text):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(text)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(*args):
+    size = int(args[0]) if args else 1000000
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        make_events(size, make_organizers(100))
+        if connection.vendor == 'postgresql':
+            # the trigger filled search_vector during the bulk insert; refresh planner stats
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_event')
+        # build the index up front so the first query isn't charged for it
+        full_text('warmup')
+        print(f'{size} events, {connection.vendor}')
+        print(f'{"query":<22} {"icontains ms":>13} {"full-text ms":>13}')
+        for text in QUERIES:
+            print(f'{text:<22} {median_ms(icontains, text):>13.2f} {median_ms(full_text, text):>13.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
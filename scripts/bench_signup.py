@@ -0,0 +1,64 @@
+"""
+Signup throughput through ``user_registration``, the whole request stack
+included, and the password hash that dominates it. The second argument
+is a CPU budget per hash in milliseconds, for which the PBKDF2 iteration
+count to set as PASSWORD_HASH_ITERATIONS is worked out:
+    python manage.py runscript bench_signup --script-args 50 100
+
+Runs against a throwaway test database.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+
+from authorization.models import CustomUser
+
+
+def hash_ms(hasher, iterations, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hasher.encode('bench-password', hasher.salt(), iterations)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(*args):
+    repeat = int(args[0]) if args else 50
+    budget_ms = float(args[1]) if len(args) > 1 else 100
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        url = reverse('registration')
+        samples, queries = [], 0
+        for i in range(repeat):
+            # a new client per signup, as each is a new visitor without a session
+            client = Client()
+            data = {'email': f'bench-{i}@example.com', 'password1': 'bench-passphrase',
+                    'password2': 'bench-passphrase'}
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.post(url, data)
+                samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 302, response.status_code
+            queries += len(captured)
+        assert CustomUser.objects.count() == repeat
+
+        samples.sort()
+        print(f'{repeat} signups, PASSWORD_HASH_ITERATIONS={settings.PASSWORD_HASH_ITERATIONS}')
+        print(f'{"signups/s":>10} {"p50 ms":>8} {"p99 ms":>8} {"queries":>8}')
+        print(f'{1000 / statistics.mean(samples):>10.1f} {statistics.median(samples):>8.1f} '
+              f'{samples[int(len(samples) * 0.99)]:>8.1f} {queries / repeat:>8.1f}')
+
+        hasher = get_hasher()
+        per_iteration = hash_ms(hasher, 100_000) / 100_000
+        print(f'\n{hasher.algorithm}: {hash_ms(hasher, settings.PASSWORD_HASH_ITERATIONS):.1f} ms a hash now; '
+              f'{int(budget_ms / per_iteration):,} iterations for {budget_ms:g} ms')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,108 @@
+"""
+Requests/s and latency percentiles of the event API over HTTP, to compare
+the WSGI (web) and ASGI (asgi) deployments from docker-compose:
+    python manage.py runscript load_http --script-args http://localhost:8000 http://localhost:8001 2000 100
+
+Arguments are base URLs followed by the number of requests and the number
+of concurrent clients. Requests are spread over the event list, event
+detail and registration endpoints and sent with a session cookie for a
+throwaway user, so the script needs the same database as the servers.
+That user is rate limited like any other; start the servers with higher
+THROTTLE_USER_RATE, THROTTLE_EVENTS_RATE and THROTTLE_REGISTER_RATE to
+measure the views rather than the 429 responses.
+"""
+import http.client
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.utils.crypto import get_random_string
+
+from api.models import Event
+from authorization.models import CustomUser
+
+
+def auth_headers():
+    """
+    Session and CSRF cookies for a throwaway user, plus the matching CSRF
+    header so registrations pass the check.
+    """
+    user, _ = CustomUser.objects.get_or_create(email='load@example.com', defaults={'username': 'load@example.com'})
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    csrf_token = get_random_string(32)
+    return {'Cookie': f'{settings.SESSION_COOKIE_NAME}={session.session_key}; '
+                      f'{settings.CSRF_COOKIE_NAME}={csrf_token}',
+            'X-CSRFToken': csrf_token}
+
+
+def make_paths(count, event_ids, rng):
+    paths = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.5:
+            paths.append(('GET', '/api/events/'))
+        elif roll < 0.9:
+            paths.append(('GET', f'/api/events/{rng.choice(event_ids)}/'))
+        else:
+            paths.append(('POST', f'/api/events/{rng.choice(event_ids)}/registration/'))
+    return paths
+
+
+def load(base_url, paths, clients, headers):
+    target = urlsplit(base_url)
+    local = threading.local()
+
+    def send(request):
+        method, path = request
+        if not hasattr(local, 'connection'):
+            local.connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+        started = time.perf_counter()
+        try:
+            local.connection.request(method, path, headers=headers)
+            response = local.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            del local.connection
+            status = None
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(send, paths))
+    elapsed = time.perf_counter() - started
+    return elapsed, results
+
+
+def run(*args):
+    urls = [arg for arg in args if '://' in arg] or ['http://localhost:8000', 'http://localhost:8001']
+    numbers = [int(arg) for arg in args if '://' not in arg]
+    count, clients = (numbers + [2000, 100][len(numbers):])[:2]
+    event_ids = list(Event.objects.values_list('id', flat=True)[:1000])
+    if not event_ids:
+        print('No events; run "manage.py runscript load_db" first')
+        return
+    paths = make_paths(count, event_ids, random.Random(0))
+    headers = auth_headers()
+
+    print(f'{count} requests, {clients} concurrent clients')
+    print(f'{"deployment":<28} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7} {"429s":>7}')
+    for url in urls:
+        elapsed, results = load(url, paths, clients, headers)
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, status in results if status is None or status >= 500)
+        throttled = sum(1 for _, status in results if status == 429)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f'{url:<28} {count / elapsed:>8.0f} {statistics.median(latencies):>8.1f} {p99:>8.1f} {errors:>7} '
+              f'{throttled:>7}')
@@ -0,0 +1,59 @@
+"""
+Concurrent signups for one popular event; checks nothing is overbooked.
+
+Runs against a throwaway test database. Threads need real connections, so
+on SQLite set TEST_DATABASE_NAME to a file path:
+    python manage.py runscript load_registration --script-args <signups> <capacity> <threads>
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from api.models import Event
+from api.registration import RegistrationError, register_attendee
+from authorization.models import CustomUser
+
+
+def run(*args):
+    signups, capacity, threads = (list(map(int, args)) + [5000, 1000, 32][len(args):])[:3]
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        CustomUser.objects.bulk_create([CustomUser(email=f'load{i}@example.com', username=f'load{i}@example.com')
+                                        for i in range(signups)], batch_size=1000)
+        users = list(CustomUser.objects.order_by('id'))
+        event = Event.objects.create(title='Popular Event', description='', location='Kyiv',
+                                     date=timezone.now() + timedelta(days=30),
+                                     organizer=users.pop(), capacity=capacity)
+        # a tenth of the users try a second time, to exercise the duplicate path as well
+        attempts = users + users[:len(users) // 10]
+
+        def attempt(user):
+            try:
+                register_attendee(event, user)
+                return 'registered'
+            except RegistrationError as e:
+                return type(e).__name__
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outcomes = list(executor.map(attempt, attempts))
+        elapsed = time.perf_counter() - started
+
+        event.refresh_from_db()
+        rows = event.attendees.count()
+        print(f'{len(attempts)} attempts by {threads} threads in {elapsed:.2f}s '
+              f'({len(attempts) / elapsed:.0f}/s)')
+        for outcome in sorted(set(outcomes)):
+            print(f'  {outcome}: {outcomes.count(outcome)}')
+        print(f'capacity={capacity} attendee_count={event.attendee_count} attendee rows={rows}')
+        ok = outcomes.count('registered') == rows == event.attendee_count <= capacity
+        print('OK' if ok else 'OVERBOOKED OR INCONSISTENT')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)